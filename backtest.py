@@ -0,0 +1,43 @@
+#!./venv/bin/python
+import argparse
+import logging
+import time
+
+from src.cryptach_screener.backtest.replay import load_history_dir, make_params_grid, run_backtest, \
+    summarize_backtest
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s",
+)
+logger = logging.getLogger('cryptach_screener')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Бэктест стратегии NWE + Supertrend на сохранённой истории свечей')
+    parser.add_argument('data_dir', help='каталог с файлами <SYMBOL>_<timeframe>.csv')
+    parser.add_argument('--timeframe', default='1h')
+    parser.add_argument('--length', type=int, default=500, help='число свечей в окне, как ohlcv_limit скринера')
+    parser.add_argument('--h', type=float, nargs='+', default=[8])
+    parser.add_argument('--mult', type=float, nargs='+', default=[3])
+    parser.add_argument('--supertrend-length', type=int, nargs='+', default=[7])
+    parser.add_argument('--horizons', type=int, nargs='+', default=[1, 4, 12, 24],
+                        help='горизонты форвардной доходности в барах')
+    parser.add_argument('--workers', type=int, default=0, help='0 - по числу ядер')
+    parser.add_argument('--output', default='backtest_signals.csv')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    histories = load_history_dir(args.data_dir, args.timeframe)
+    params_grid = make_params_grid(args.h, args.mult, args.supertrend_length)
+    logger.info(f'Backtest of {len(histories)} symbols with {len(params_grid)} parameter sets')
+
+    started_at = time.perf_counter()
+    signals = run_backtest(histories, params_grid, length=args.length, horizons=tuple(args.horizons),
+                           workers=args.workers)
+    logger.info(f'Backtest completed in {time.perf_counter() - started_at:.1f}s, {len(signals)} signals')
+
+    signals.to_csv(args.output, index=False)
+    print(summarize_backtest(signals, horizons=tuple(args.horizons)).to_string())
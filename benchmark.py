@@ -0,0 +1,58 @@
+#!./venv/bin/python
+import argparse
+import logging
+import os
+import sys
+
+from src.cryptach_screener.benchmark.cases import get_cases
+from src.cryptach_screener.benchmark.suite import run_benchmarks, compare_with_baseline, format_report, \
+    BenchmarkReport
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s",
+)
+logger = logging.getLogger('cryptach_screener')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Замеры производительности скринера на синтетических данных')
+    parser.add_argument('--filter', help='регулярное выражение для имён замеров, например "^dom/"')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='минимальная длительность замера в секундах')
+    parser.add_argument('--no-chart', action='store_true', help='не замерять отрисовку графиков')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default='benchmark_baseline.json')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='допустимое замедление относительно базовых замеров')
+    parser.add_argument('--save-baseline', action='store_true', help='записать результаты как новые базовые')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    report = run_benchmarks(get_cases(chart=not args.no_chart), pattern=args.filter, repeat=args.repeat,
+                            min_time=args.min_time)
+    with open(args.output, 'wb') as file:
+        file.write(report.to_json())
+
+    if args.save_baseline:
+        with open(args.baseline, 'wb') as file:
+            file.write(report.to_json())
+        logger.info(f'Baseline saved to {args.baseline}')
+        sys.exit(0)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'rb') as file:
+            baseline = BenchmarkReport.from_json(file.read())
+    print(format_report(report, baseline))
+
+    if baseline is None:
+        logger.warning(f'No baseline {args.baseline}, run with --save-baseline to create it')
+        sys.exit(0)
+    regressions = compare_with_baseline(report, baseline, tolerance=args.tolerance)
+    for regression in regressions:
+        logger.error(f'Regression {regression.name}: {regression.baseline * 1000:.3f}ms -> '
+                     f'{regression.current * 1000:.3f}ms (x{regression.ratio:.2f})')
+    sys.exit(1 if regressions else 0)
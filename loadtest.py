@@ -0,0 +1,57 @@
+#!./venv/bin/python
+import argparse
+import dataclasses
+import logging
+
+import orjson
+
+from src.cryptach_screener.loadtest.harness import LoadTestOptions, run_scenario, format_results
+from src.cryptach_screener.loadtest.mock_server import MockSettings
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s",
+)
+logger = logging.getLogger('cryptach_screener')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест итерации скринера против локальной подмены '
+                                                 'Binance и Telegram')
+    parser.add_argument('--symbols', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--timeframes', nargs='+', default=['1h'])
+    parser.add_argument('--base-timeframe', default='30m', help='пусто - загружать каждый таймфрейм отдельно')
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка ответа Binance в секундах')
+    parser.add_argument('--jitter', type=float, default=0.05, help='случайная добавка к задержке до jitter секунд')
+    parser.add_argument('--error-rate', type=float, default=0., help='доля ответов 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0., help='доля ответов 429')
+    parser.add_argument('--retry-after', type=float, default=1.)
+    parser.add_argument('--weight-limit', type=int, default=1000000,
+                        help='лимит веса в минуту у подмены и скринера, 2400 - как у Binance')
+    parser.add_argument('--telegram-latency', type=float, default=0.1)
+    parser.add_argument('--telegram-rate-limit-rate', type=float, default=0.)
+    parser.add_argument('--max-concurrent-requests', type=int, default=20)
+    parser.add_argument('--indicator-executor', default='process')
+    parser.add_argument('--output', default='loadtest_results.json')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    options = LoadTestOptions(timeframes=args.timeframes, base_timeframe=args.base_timeframe,
+                              weight_limit=args.weight_limit, max_concurrent_requests=args.max_concurrent_requests,
+                              indicator_executor=args.indicator_executor)
+    results = []
+    for symbols in args.symbols:
+        settings = MockSettings(symbols=symbols, latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                                retry_after=args.retry_after, weight_limit=args.weight_limit,
+                                telegram_latency=args.telegram_latency,
+                                telegram_rate_limit_rate=args.telegram_rate_limit_rate)
+        logger.info(f'Load test of {symbols} symbols')
+        results.append(run_scenario(settings, options))
+        logger.info(f'{symbols} symbols checked in {results[-1].wall_time:.1f}s')
+
+    with open(args.output, 'wb') as file:
+        file.write(orjson.dumps([dataclasses.asdict(result) for result in results], option=orjson.OPT_INDENT_2))
+    print(format_results(results))
@@ -4,7 +4,11 @@ import dataclasses
 import datetime
 import logging
 
-from src.cryptach_screener.screener.screener import Screener
+from src.cryptach_screener.startup import startup_timer
+
+with startup_timer.measure('import screener'):
+    from src.cryptach_screener.screener.screener import Screener
+    from src.cryptach_screener.screener.sharding import run_shard_coordinator, run_shard_worker
 from src.cryptach_screener.config.loader import load_config
 from src.hammer_alert_system.structs import DOM
 
@@ -19,6 +23,15 @@ logger.addHandler(logging.StreamHandler())
 
 if __name__ == '__main__':
     logger.info("Start Cryptach Screener")
-    config = load_config()
-    analyzer = Screener(config)
-    asyncio.run(analyzer.enter_loop())
+    with startup_timer.measure('load config'):
+        config = load_config()
+    if config.shard_role == 'coordinator':
+        run_shard_coordinator(config)
+    elif config.shard_role == 'worker':
+        run_shard_worker(config)
+    elif config.stream_mode:
+        analyzer = Screener(config)
+        asyncio.run(analyzer.enter_stream_loop())
+    else:
+        analyzer = Screener(config)
+        asyncio.run(analyzer.enter_loop())
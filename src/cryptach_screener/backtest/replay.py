@@ -0,0 +1,154 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.cryptach_screener.indicators.nadaraya_watson import nadaraya_watson_estimate
+from src.cryptach_screener.indicators.supertrend import supertrend_batch
+from src.cryptach_screener.screener.panel import get_signal_masks, PANEL_COLUMNS
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+@dataclass(frozen=True)
+class BacktestParams(object):
+    h: float = 8
+    mult: float = 3
+    supertrend_length: int = 7
+
+
+def make_params_grid(h_values: list[float], mult_values: list[float],
+                     supertrend_lengths: list[int]) -> list[BacktestParams]:
+    return [BacktestParams(h=h, mult=mult, supertrend_length=supertrend_length)
+            for h, mult, supertrend_length in itertools.product(h_values, mult_values, supertrend_lengths)]
+
+
+def load_history(path: str) -> pd.DataFrame:
+    """
+    Загружает историю свечей из CSV: первые шесть столбцов как в ответе /fapi/v1/klines
+    (время открытия в мс, Open, High, Low, Close, Volume), строка заголовка необязательна
+    """
+    df = pd.read_csv(path, header=None, usecols=range(6), dtype=str)
+    if not df.iloc[0, 0].isdigit():
+        df = df.iloc[1:]
+    df.columns = ['Time'] + OHLCV_COLUMNS
+    df[OHLCV_COLUMNS] = df[OHLCV_COLUMNS].astype(np.float64)
+    df['Time'] = pd.to_datetime(df['Time'].astype(np.int64), unit='ms')
+    return df.set_index('Time')
+
+
+def load_history_dir(directory: str, timeframe: str) -> dict[str, pd.DataFrame]:
+    """
+    Загружает файлы вида <SYMBOL>_<timeframe>.csv из каталога
+    """
+    suffix = f'_{timeframe}.csv'
+    return {file_name[:-len(suffix)]: load_history(os.path.join(directory, file_name))
+            for file_name in sorted(os.listdir(directory)) if file_name.endswith(suffix)}
+
+
+def replay_symbol(symbol: str, times: np.ndarray, ohlcv: np.ndarray, params_grid: list[BacktestParams],
+                  length: int = 500, horizons: tuple[int, ...] = (1, 4, 12, 24),
+                  chunk_size: int = 512) -> list[dict]:
+    """
+    Прогоняет историю одного символа бар за баром: на каждом баре индикаторы считаются по окну
+    из length последних свечей, как в Screener.calculate_market_data, а сигналы проверяются
+    теми же условиями, что в check_to_long / check_to_short. Окна обрабатываются пачками
+    через общие ядра NWE и Supertrend
+    """
+    bars = len(ohlcv)
+    if bars < length:
+        return []
+
+    signals = []
+    windows = {column: sliding_window_view(ohlcv[:, index], length) for index, column in enumerate(OHLCV_COLUMNS)}
+    steps = bars - length + 1
+    close = ohlcv[:, 3]
+
+    for start in range(0, steps, chunk_size):
+        stop = min(start + chunk_size, steps)
+        chunk = {column: window[start:stop] for column, window in windows.items()}
+        last_bar = np.arange(start, stop) + length - 1
+
+        # NWE: одна матрица весов на h, множитель mult меняет только ширину полос
+        nwe = {}
+        for h in sorted({params.h for params in params_grid}):
+            estimation, mae = nadaraya_watson_estimate(chunk['Close'], h=h, length=length)
+            nwe[h] = (estimation[:, -1], mae[:, 0])
+
+        supertrends = {}
+        for supertrend_length in sorted({params.supertrend_length for params in params_grid}):
+            _, _, s_long, s_short = supertrend_batch(chunk['High'], chunk['Low'], chunk['Close'],
+                                                     length=supertrend_length)
+            supertrends[supertrend_length] = (s_long[:, -1], s_short[:, -1])
+
+        for params in params_grid:
+            estimation, mae = nwe[params.h]
+            s_long, s_short = supertrends[params.supertrend_length]
+            panel = pd.DataFrame({
+                'Open': chunk['Open'][:, -1],
+                'Close': chunk['Close'][:, -1],
+                'NWE_upper': estimation + mae * params.mult,
+                'NWE_lower': estimation - mae * params.mult,
+                's_long': s_long,
+                's_short': s_short,
+            }, columns=PANEL_COLUMNS)
+            long_mask, short_mask = get_signal_masks(panel)
+
+            for direction, mask in (('LONG', long_mask), ('SHORT', short_mask)):
+                sign = 1 if direction == 'LONG' else -1
+                for bar in last_bar[mask]:
+                    signal = {
+                        'symbol': symbol,
+                        'time': pd.Timestamp(times[bar], unit='ms'),
+                        'direction': direction,
+                        'close': close[bar],
+                        **asdict(params),
+                    }
+                    for horizon in horizons:
+                        target = bar + horizon
+                        signal[f'return_{horizon}'] = sign * (close[target] / close[bar] - 1) \
+                            if target < bars else np.nan
+                    signals.append(signal)
+    return signals
+
+
+def replay_symbol_task(args):
+    return replay_symbol(*args)
+
+
+def run_backtest(histories: dict[str, pd.DataFrame], params_grid: list[BacktestParams], length: int = 500,
+                 horizons: tuple[int, ...] = (1, 4, 12, 24), workers: int = 0) -> pd.DataFrame:
+    """
+    Бэктест по всем символам и наборам параметров. Символы распределяются по пулу процессов
+    """
+    tasks = [
+        (symbol, history.index.asi8 // 1_000_000,
+         history[OHLCV_COLUMNS].to_numpy(dtype=np.float64), params_grid, length, horizons)
+        for symbol, history in histories.items()
+    ]
+
+    if workers == 1:
+        results = map(replay_symbol_task, tasks)
+        signals = list(itertools.chain.from_iterable(results))
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            signals = list(itertools.chain.from_iterable(executor.map(replay_symbol_task, tasks)))
+
+    columns = ['symbol', 'time', 'direction', 'close', 'h', 'mult', 'supertrend_length'] + \
+              [f'return_{horizon}' for horizon in horizons]
+    return pd.DataFrame(signals, columns=columns)
+
+
+def summarize_backtest(signals: pd.DataFrame, horizons: tuple[int, ...] = (1, 4, 12, 24)) -> pd.DataFrame:
+    """
+    Сводка по наборам параметров: число сигналов, средняя доходность и доля прибыльных по горизонтам
+    """
+    aggregations = {'signals': ('symbol', 'size')}
+    for horizon in horizons:
+        aggregations[f'mean_return_{horizon}'] = (f'return_{horizon}', 'mean')
+        aggregations[f'hit_rate_{horizon}'] = (f'return_{horizon}', lambda returns: (returns.dropna() > 0).mean())
+    return signals.groupby(['h', 'mult', 'supertrend_length', 'direction']).agg(**aggregations)
@@ -0,0 +1,126 @@
+import importlib.util
+
+from src.cryptach_screener.benchmark.suite import BenchmarkCase
+from src.cryptach_screener.benchmark.synthetic import make_ohlcv, make_market_data, make_klines_payload, \
+    make_array_dom
+
+NWE_LENGTHS = (100, 250, 500, 1000)
+SUPERTREND_BARS = (500, 5000)
+KLINES_ROWS = (500, 1500)
+DOM_DEPTHS = (100, 1000, 5000)
+
+
+def nwe_case(length: int):
+    def setup():
+        from src.cryptach_screener.indicators.nadaraya_watson import nadaraya_watson_bands
+
+        # то же ядро, что в compute_indicators, без сборки датафрейма
+        close = make_ohlcv(length)['Close'].to_numpy()
+        return lambda: nadaraya_watson_bands(close, h=8, mult=3, length=length)
+    return setup
+
+
+def supertrend_case(bars: int):
+    def setup():
+        from src.cryptach_screener.indicators.supertrend import supertrend_batch
+
+        df = make_ohlcv(bars)
+        high, low, close = df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy()
+        return lambda: supertrend_batch(high=high, low=low, close=close, length=7)
+    return setup
+
+
+def pandas_ta_supertrend_case(bars: int):
+    def setup():
+        import pandas_ta
+
+        df = make_ohlcv(bars)
+        return lambda: pandas_ta.supertrend(high=df['High'], low=df['Low'], close=df['Close'], length=7)
+    return setup
+
+
+def klines_case(rows: int):
+    def setup():
+        from src.cryptach_screener.data_loader.klines import parse_klines, make_candles_frame
+
+        payload = make_klines_payload(rows)
+        return lambda: make_candles_frame(*parse_klines(payload))
+    return setup
+
+
+def check_signals_case(bars: int):
+    def setup():
+        from src.cryptach_screener.screener.screener import Screener
+
+        market_data = make_market_data(bars)
+        return lambda: (Screener.check_to_long(market_data), Screener.check_to_short(market_data))
+    return setup
+
+
+def session_cols_case(bars: int):
+    def setup():
+        from src.cryptach_screener.screener.chart import add_session_cols
+
+        df = make_market_data(500).tail(bars)
+        return lambda: add_session_cols(df.copy())
+    return setup
+
+
+def draw_chart_case(bars: int):
+    def setup():
+        from src.cryptach_screener.screener.chart import add_session_cols, draw_chart
+
+        df = add_session_cols(make_market_data(500).tail(bars).copy())
+        return lambda: draw_chart('BTCUSDT 1h', df)
+    return setup
+
+
+def write_image_case(bars: int):
+    def setup():
+        from src.cryptach_screener.screener.chart import add_session_cols, draw_chart
+
+        fig = draw_chart('BTCUSDT 1h', add_session_cols(make_market_data(500).tail(bars).copy()))
+        return lambda: fig.to_image(format='jpg')
+    return setup
+
+
+def dom_case(checker_name: str, depth: int):
+    def setup():
+        from src.hammer_alert_system.checker.profiles import CheckProfile, ProfileChecker
+        from src.hammer_alert_system.checker.rolling_sum import AggSumChecker
+        from src.hammer_alert_system.checker.strict import StrictChecker
+
+        checkers = {
+            'strict': lambda: StrictChecker(threshold_quantity=50),
+            'agg_sum': lambda: AggSumChecker(threshold_quantity=150, agg_frame=5, bid_emoji='', ask_emoji=''),
+            'profiles': lambda: ProfileChecker({ProfileChecker.DEFAULT: [
+                CheckProfile(f'profile{number}', 50 + number * 20, agg_frame=1 + number % 4)
+                for number in range(8)]}),
+        }
+        checker = checkers[checker_name]()
+        book = make_array_dom(depth)
+        return lambda: checker.get_big_levels(book)
+    return setup
+
+
+def get_cases(chart: bool = True) -> list[BenchmarkCase]:
+    """
+    Все замеры набора. chart=False пропускает отрисовку графиков: она самая долгая и требует kaleido
+    """
+    cases = [BenchmarkCase(f'nwe/length={length}', nwe_case(length), 'indicators') for length in NWE_LENGTHS]
+    cases += [BenchmarkCase(f'supertrend/bars={bars}', supertrend_case(bars), 'indicators')
+              for bars in SUPERTREND_BARS]
+    # pandas_ta больше не зависимость скринера, но его можно сравнить со своей реализацией, если он установлен
+    if importlib.util.find_spec('pandas_ta') is not None:
+        cases += [BenchmarkCase(f'supertrend_pandas_ta/bars={bars}', pandas_ta_supertrend_case(bars), 'indicators')
+                  for bars in SUPERTREND_BARS]
+    cases += [BenchmarkCase(f'klines/rows={rows}', klines_case(rows), 'klines') for rows in KLINES_ROWS]
+    cases.append(BenchmarkCase('signals/check_to_long_short', check_signals_case(500), 'signals'))
+    cases.append(BenchmarkCase('chart/add_session_cols', session_cols_case(50), 'chart'))
+    if chart:
+        cases.append(BenchmarkCase('chart/draw_chart', draw_chart_case(50), 'chart'))
+        cases.append(BenchmarkCase('chart/write_image', write_image_case(50), 'chart'))
+    for checker_name in ('strict', 'agg_sum', 'profiles'):
+        cases += [BenchmarkCase(f'dom/{checker_name}/depth={depth}', dom_case(checker_name, depth), 'dom')
+                  for depth in DOM_DEPTHS]
+    return cases
@@ -0,0 +1,148 @@
+import logging
+import platform
+import re
+import statistics
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Callable
+
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_FORMAT = 1
+
+
+@dataclass
+class BenchmarkCase(object):
+    """
+    Один замер: setup готовит данные (не входит в замер) и возвращает функцию без аргументов
+    """
+    name: str
+    setup: Callable[[], Callable[[], object]]
+    group: str = ''
+
+
+@dataclass
+class BenchmarkResult(object):
+    name: str
+    group: str
+    # время одного вызова в секундах
+    best: float
+    median: float
+    mean: float
+    calls: int
+    repeat: int
+
+
+@dataclass
+class Regression(object):
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline
+
+
+@dataclass
+class BenchmarkReport(object):
+    results: list[BenchmarkResult]
+    environment: dict = field(default_factory=dict)
+
+    def to_json(self) -> bytes:
+        return orjson.dumps({'format': BENCHMARK_FORMAT, 'environment': self.environment,
+                             'results': [asdict(result) for result in self.results]},
+                            option=orjson.OPT_INDENT_2)
+
+    @classmethod
+    def from_json(cls, body: bytes) -> 'BenchmarkReport':
+        data = orjson.loads(body)
+        return cls(results=[BenchmarkResult(**result) for result in data['results']],
+                   environment=data.get('environment', {}))
+
+
+def get_environment() -> dict:
+    import pandas as pd
+
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(), 'system': platform.system()}
+
+
+def measure(func: Callable[[], object], repeat: int = 5, min_time: float = 0.2) -> tuple[list[float], int]:
+    """
+    Как timeit.autorange: подбирает число вызовов, чтобы один замер длился не меньше min_time / repeat,
+    и возвращает время одного вызова в каждом из repeat замеров
+    """
+    func()
+    calls = 1
+    target = min_time / repeat
+    while True:
+        started_at = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - started_at
+        if elapsed >= target:
+            break
+        calls = calls * 2 if elapsed == 0 else max(calls * 2, int(calls * target / elapsed) + 1)
+
+    timings = [elapsed / calls]
+    for _ in range(repeat - 1):
+        started_at = time.perf_counter()
+        for _ in range(calls):
+            func()
+        timings.append((time.perf_counter() - started_at) / calls)
+    return timings, calls
+
+
+def run_benchmarks(cases: list[BenchmarkCase], pattern: str = None, repeat: int = 5,
+                   min_time: float = 0.2) -> BenchmarkReport:
+    results = []
+    for case in cases:
+        if pattern and not re.search(pattern, case.name):
+            continue
+        func = case.setup()
+        timings, calls = measure(func, repeat=repeat, min_time=min_time)
+        result = BenchmarkResult(name=case.name, group=case.group, best=min(timings),
+                                 median=statistics.median(timings), mean=statistics.fmean(timings),
+                                 calls=calls, repeat=repeat)
+        logger.info(f'{case.name}: {format_seconds(result.best)} (median {format_seconds(result.median)}, '
+                    f'{calls} calls x {repeat})')
+        results.append(result)
+    return BenchmarkReport(results=results, environment=get_environment())
+
+
+def compare_with_baseline(report: BenchmarkReport, baseline: BenchmarkReport,
+                          tolerance: float = 0.25) -> list[Regression]:
+    """
+    Замеры, которые стали медленнее базовых больше чем на tolerance. Сравнивается лучшее время:
+    оно меньше всего зависит от фоновой нагрузки
+    """
+    baseline_results = {result.name: result for result in baseline.results}
+    regressions = []
+    for result in report.results:
+        baseline_result = baseline_results.get(result.name)
+        if baseline_result is not None and result.best > baseline_result.best * (1 + tolerance):
+            regressions.append(Regression(result.name, baseline_result.best, result.best))
+    return regressions
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f}{unit}'
+    return f'{seconds / 1e-9:.0f}ns'
+
+
+def format_report(report: BenchmarkReport, baseline: BenchmarkReport = None) -> str:
+    baseline_results = {result.name: result for result in baseline.results} if baseline else {}
+    width = max((len(result.name) for result in report.results), default=0)
+    lines = []
+    for result in report.results:
+        line = f'{result.name:<{width}}  {format_seconds(result.best):>10}  {format_seconds(result.median):>10}'
+        if result.name in baseline_results:
+            line += f'  x{result.best / baseline_results[result.name].best:.2f}'
+        lines.append(line)
+    return '\n'.join(lines)
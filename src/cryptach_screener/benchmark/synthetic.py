@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from src.cryptach_screener.data_loader.candle_store import timeframe_to_ms
+from src.cryptach_screener.data_loader.klines import make_candles_frame
+from src.cryptach_screener.indicators.executor import compute_indicators, INDICATOR_COLUMNS
+from src.cryptach_screener.loadtest.exchange_data import format_klines, make_ohlcv_values
+from src.hammer_alert_system.structs import ArrayDOM
+
+# фиксированное начало истории, чтобы данные не зависели от времени запуска
+START_TIME = 1672531200000
+
+
+def make_ohlcv(bars: int, seed: int = 0, timeframe: str = '1h') -> pd.DataFrame:
+    """
+    Свечи в том же виде, что отдаёт OHLCVLoader.get_ohlcv
+    """
+    times = START_TIME + np.arange(bars, dtype=np.int64) * timeframe_to_ms(timeframe)
+    return make_candles_frame(times, make_ohlcv_values(bars, seed))
+
+
+def make_market_data(bars: int, seed: int = 0, timeframe: str = '1h') -> pd.DataFrame:
+    """
+    Свечи с индикаторами, как их проверяет скринер
+    """
+    market_data = make_ohlcv(bars, seed, timeframe)
+    market_data[INDICATOR_COLUMNS] = compute_indicators(market_data.to_numpy(), nwe_length=bars, h=8, mult=3,
+                                                        supertrend_length=7)
+    return market_data
+
+
+def make_klines_payload(bars: int, seed: int = 0, timeframe: str = '1h') -> bytes:
+    """
+    Тело ответа /fapi/v1/klines: числа в виде строк, как у Binance
+    """
+    timeframe_ms = timeframe_to_ms(timeframe)
+    open_times = START_TIME + np.arange(bars, dtype=np.int64) * timeframe_ms
+    return format_klines(open_times, make_ohlcv_values(bars, seed), timeframe_ms)
+
+
+def make_array_dom(levels: int, seed: int = 0, symbol: str = 'BTCUSDT', tick: float = 0.1) -> ArrayDOM:
+    """
+    Стакан с levels уровнями на сторону: мелкие заявки и редкие крупные
+    """
+    rng = np.random.default_rng(seed)
+    quantities = rng.choice([0., 1., 5., 20., 60.], size=(2, levels), p=[0.4, 0.3, 0.2, 0.08, 0.02])
+    quantities += rng.uniform(0, 1, size=(2, levels))
+    return ArrayDOM(
+        ask_prices=100. + np.arange(levels) * tick,
+        ask_quantities=quantities[0],
+        bid_prices=100. - tick - np.arange(levels) * tick,
+        bid_quantities=quantities[1],
+        symbol=symbol,
+    )
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -6,4 +6,29 @@ class Config(object):
     token: str
     admins: list[int]
     channel_id: str
-    rate_limit: str
+    rate_limit: int
+    max_concurrent_requests: int = 20
+    # адреса API, для нагрузочного теста их можно направить на локальную подмену
+    binance_url: str = 'https://fapi.binance.com'
+    telegram_api_url: str = ''
+    timeframes: list[str] = field(default_factory=lambda: ['1h'])
+    settle_delay: float = 5
+    stream_mode: bool = False
+    base_timeframe: str = '30m'
+    candle_cache_dir: str = 'cache/candles'
+    symbols_ttl: float = 3600
+    indicator_executor: str = 'process'
+    indicator_workers: int = 0
+    chart_workers: int = 2
+    # лимит памяти рассчитанных рыночных данных в конвейере проверки, МБ (0 - без лимита)
+    market_data_memory_mb: float = 64
+    # эндпоинт /metrics для Prometheus, 0 - выключен
+    metrics_port: int = 0
+    metrics_host: str = '127.0.0.1'
+    # шардированная проверка: '' - один процесс, coordinator или worker
+    shard_role: str = ''
+    shard_workers: int = 2
+    shard_broker_address: str = '127.0.0.1:50555'
+    # ключ брокера обязателен, если он слушает не loopback
+    shard_authkey: str = ''
+    shard_worker_id: str = ''
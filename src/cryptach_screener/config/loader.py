@@ -7,10 +7,33 @@ from src.cryptach_screener.config.config import Config
 
 def load_config():
     load_dotenv()
+    timeframes = [timeframe.strip() for timeframe in (os.getenv('TIMEFRAMES') or '1h').split(',') if timeframe.strip()]
+    if not timeframes:
+        raise ValueError('TIMEFRAMES must contain at least one timeframe')
     config = Config(
         token=os.getenv('BOT_TOKEN'),
         admins=[int(admin) for admin in os.getenv('ADMINS').split(', ')],
-        rate_limit=os.getenv('RATE_LIMIT'),
+        rate_limit=int(os.getenv('RATE_LIMIT') or 2400),
+        max_concurrent_requests=int(os.getenv('MAX_CONCURRENT_REQUESTS') or 20),
+        binance_url=os.getenv('BINANCE_URL', 'https://fapi.binance.com'),
+        telegram_api_url=os.getenv('TELEGRAM_API_URL', ''),
+        timeframes=timeframes,
+        settle_delay=float(os.getenv('SETTLE_DELAY') or 5),
+        stream_mode=os.getenv('STREAM_MODE', 'false').lower() in ('1', 'true', 'yes'),
+        base_timeframe=os.getenv('BASE_TIMEFRAME', '30m'),
+        candle_cache_dir=os.getenv('CANDLE_CACHE_DIR', 'cache/candles'),
+        symbols_ttl=float(os.getenv('SYMBOLS_TTL') or 3600),
+        indicator_executor=os.getenv('INDICATOR_EXECUTOR', 'process'),
+        indicator_workers=int(os.getenv('INDICATOR_WORKERS') or 0),
+        chart_workers=int(os.getenv('CHART_WORKERS') or 2),
+        market_data_memory_mb=float(os.getenv('MARKET_DATA_MEMORY_MB') or 64),
+        metrics_port=int(os.getenv('METRICS_PORT') or 0),
+        metrics_host=os.getenv('METRICS_HOST', '127.0.0.1'),
+        shard_role=os.getenv('SHARD_ROLE', ''),
+        shard_workers=int(os.getenv('SHARD_WORKERS') or 2),
+        shard_broker_address=os.getenv('SHARD_BROKER_ADDRESS', '127.0.0.1:50555'),
+        shard_authkey=os.getenv('SHARD_AUTHKEY', ''),
+        shard_worker_id=os.getenv('SHARD_WORKER_ID', ''),
         channel_id=os.getenv('CHANNEL_ID')
     )
     return config
@@ -0,0 +1,211 @@
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TIMEFRAME_UNITS_MS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """
+    Длительность свечи таймфрейма Binance ('30m', '1h', '4h', ...) в миллисекундах
+    """
+    amount, unit = timeframe[:-1], timeframe[-1]
+    if unit not in TIMEFRAME_UNITS_MS or not amount.isdigit():
+        raise ValueError(f'Unsupported timeframe: {timeframe}')
+    return int(amount) * TIMEFRAME_UNITS_MS[unit]
+
+
+class CandleBuffer(object):
+    """
+    Кольцевой буфер свечей одного символа на одном таймфрейме.
+    Хранит время открытия (мс) и OHLCV, старые свечи вытесняются новыми
+    """
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError('Capacity of candle buffer must be is larger than zero')
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, 5), dtype=np.float64)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def last_open_time(self) -> int | None:
+        if self.size == 0:
+            return None
+        return int(self.times[(self.start + self.size - 1) % self.capacity])
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+    def merge(self, times: np.ndarray, values: np.ndarray):
+        """
+        Добавляет свечи в буфер. Свеча с временем последней сохранённой заменяет её
+        (это ещё формирующаяся свеча), более старые свечи игнорируются
+        """
+        last_open_time = self.last_open_time
+        for open_time, row in zip(times, values):
+            if last_open_time is not None and open_time < last_open_time:
+                continue
+            if last_open_time is not None and open_time == last_open_time:
+                position = (self.start + self.size - 1) % self.capacity
+            elif self.size < self.capacity:
+                position = (self.start + self.size) % self.capacity
+                self.size += 1
+            else:
+                position = self.start
+                self.start = (self.start + 1) % self.capacity
+            self.times[position] = open_time
+            self.values[position] = row
+            last_open_time = open_time
+
+    def tail(self, limit: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Последние limit свечей в хронологическом порядке (копии массивов)
+        """
+        count = min(limit, self.size)
+        positions = (self.start + self.size - count + np.arange(count)) % self.capacity
+        return self.times[positions], self.values[positions]
+
+
+class MappedCandleBuffer(CandleBuffer):
+    """
+    Кольцевой буфер свечей в файле, отображённом в память (np.memmap).
+    Файл: заголовок из HEADER_SIZE int64 (метка формата, capacity, start, size),
+    затем время открытия int64[capacity] и OHLCV float64[capacity, 5].
+    Данные живут в page cache, после перезапуска буфер открывается без загрузки с биржи
+    """
+    MAGIC = 0x43414e444c453031  # 'CANDLE01'
+    HEADER_SIZE = 4
+
+    def __init__(self, path: str, capacity: int):
+        if capacity <= 0:
+            raise ValueError('Capacity of candle buffer must be is larger than zero')
+        self.path = path
+        self.capacity = capacity
+        self.file = np.memmap(path, dtype=np.int64, mode='w+', shape=(self.get_file_length(capacity),))
+        self.file[:2] = [self.MAGIC, capacity]
+        self.map_arrays()
+
+    @classmethod
+    def get_file_length(cls, capacity: int) -> int:
+        return cls.HEADER_SIZE + capacity * 6
+
+    @classmethod
+    def open(cls, path: str) -> 'MappedCandleBuffer | None':
+        """
+        Открывает сохранённый буфер, None - если файла нет или он повреждён
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            # пустой файл или файл с длиной не кратной 8 байтам memmap не открывает
+            file = np.memmap(path, dtype=np.int64, mode='r+')
+            capacity = int(file[1]) if len(file) >= cls.HEADER_SIZE else 0
+            if file[0] != cls.MAGIC or capacity <= 0 or len(file) != cls.get_file_length(capacity):
+                del file
+                raise ValueError('unexpected header or length')
+        except (OSError, ValueError) as e:
+            logger.warning(f'Candle cache file {path} is corrupted, ignore it: {e}')
+            return None
+
+        buffer = cls.__new__(cls)
+        buffer.path = path
+        buffer.capacity = capacity
+        buffer.file = file
+        buffer.map_arrays()
+        if not 0 <= buffer.start < capacity or not 0 <= buffer.size <= capacity:
+            buffer.clear()
+        times, _ = buffer.tail(buffer.size)
+        if np.any(np.diff(times) <= 0):
+            # запись прервалась посреди обновления
+            logger.warning(f'Candle cache file {path} is inconsistent, clear it')
+            buffer.clear()
+        return buffer
+
+    def map_arrays(self):
+        self.times = self.file[self.HEADER_SIZE:self.HEADER_SIZE + self.capacity]
+        self.values = self.file[self.HEADER_SIZE + self.capacity:].view(np.float64).reshape(self.capacity, 5)
+
+    @property
+    def start(self) -> int:
+        return int(self.file[2])
+
+    @start.setter
+    def start(self, value: int):
+        self.file[2] = value
+
+    @property
+    def size(self) -> int:
+        return int(self.file[3])
+
+    @size.setter
+    def size(self, value: int):
+        self.file[3] = value
+
+    def tail(self, limit: int) -> tuple[np.ndarray, np.ndarray]:
+        times, values = super().tail(limit)
+        return np.asarray(times), np.asarray(values)
+
+    def flush(self):
+        self.file.flush()
+
+
+class CandleStore(object):
+    """
+    Буферы свечей по парам (символ, таймфрейм).
+    С cache_dir буферы хранятся в файлах <cache_dir>/<timeframe>/<symbol>.candles
+    и лениво открываются при первом обращении
+    """
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = cache_dir
+        self.buffers: dict[tuple[str, str], CandleBuffer] = {}
+
+    def get_cache_path(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.cache_dir, timeframe, f'{symbol}.candles')
+
+    def get(self, symbol: str, timeframe: str) -> CandleBuffer | None:
+        buffer = self.buffers.get((symbol, timeframe))
+        if buffer is None and self.cache_dir is not None:
+            buffer = MappedCandleBuffer.open(self.get_cache_path(symbol, timeframe))
+            if buffer is not None:
+                self.buffers[(symbol, timeframe)] = buffer
+        return buffer
+
+    def get_or_create(self, symbol: str, timeframe: str, capacity: int) -> CandleBuffer:
+        buffer = self.get(symbol, timeframe)
+        if buffer is None or buffer.capacity < capacity:
+            buffer = self.create_buffer(symbol, timeframe, capacity, previous=buffer)
+            self.buffers[(symbol, timeframe)] = buffer
+        return buffer
+
+    def create_buffer(self, symbol: str, timeframe: str, capacity: int,
+                      previous: CandleBuffer = None) -> CandleBuffer:
+        if self.cache_dir is None:
+            return CandleBuffer(capacity)
+
+        # свечи из буфера меньшего размера переносятся, чтобы не загружать их заново
+        candles = previous.tail(previous.size) if previous is not None else None
+        path = self.get_cache_path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        buffer = MappedCandleBuffer(path, capacity)
+        if candles is not None:
+            buffer.merge(*candles)
+        return buffer
+
+    def flush(self):
+        for buffer in self.buffers.values():
+            if isinstance(buffer, MappedCandleBuffer):
+                buffer.flush()
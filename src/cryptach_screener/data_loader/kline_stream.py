@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+import aiohttp
+import numpy as np
+
+from src.cryptach_screener.data_loader.candle_store import timeframe_to_ms
+from src.cryptach_screener.data_loader.ohlcv_loader import OHLCVLoader
+
+logger = logging.getLogger(__name__)
+
+
+class KlineStream(object):
+    """
+    Потоковая загрузка свечей через комбинированные WebSocket-стримы
+    <symbol>@kline_<timeframe>. Держит буферы свечей OHLCVLoader в актуальном
+    состоянии и вызывает on_candle_close(symbol, timeframe, open_time) сразу после закрытия свечи.
+    После (пере)подключения и при пропуске свечей дозагружает историю через REST
+    """
+    streams_per_connection: int
+    reconnect_delay: float
+    max_reconnect_delay: float
+
+    def __init__(self, loader: OHLCVLoader, symbols: list[str], timeframe: str, limit: int,
+                 on_candle_close: Callable[[str, str, int], Awaitable],
+                 url: str = 'wss://fstream.binance.com', streams_per_connection: int = 200,
+                 reconnect_delay: float = 1, max_reconnect_delay: float = 60):
+        self.loader = loader
+        self.symbols = symbols
+        self.timeframe = timeframe
+        self.timeframe_ms = timeframe_to_ms(timeframe)
+        self.limit = limit
+        self.on_candle_close = on_candle_close
+        self.url = url
+        self.streams_per_connection = streams_per_connection
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        # символы, по которым идёт дозагрузка через REST, и отложенные на это время сообщения
+        self.backfilling: dict[str, list[dict]] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+        self.messages_received = 0
+        self.candles_closed = 0
+        self.reconnects = 0
+        self.last_latency: float | None = None
+
+    def get_batches(self) -> list[list[str]]:
+        return [self.symbols[pos:pos + self.streams_per_connection]
+                for pos in range(0, len(self.symbols), self.streams_per_connection)]
+
+    def get_stream_url(self, batch: list[str]) -> str:
+        streams = '/'.join(f'{symbol.lower()}@kline_{self.timeframe}' for symbol in batch)
+        return f'{self.url}/stream?streams={streams}'
+
+    async def run(self):
+        await asyncio.gather(*[self.run_connection(batch) for batch in self.get_batches()])
+
+    async def run_connection(self, batch: list[str]):
+        delay = self.reconnect_delay
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    async with session.ws_connect(self.get_stream_url(batch), heartbeat=30) as ws:
+                        logger.info(f'Kline stream connected: {len(batch)} streams on {self.timeframe}')
+                        delay = self.reconnect_delay
+                        for symbol in batch:
+                            self.start_backfill(symbol)
+                        async for message in ws:
+                            if message.type == aiohttp.WSMsgType.TEXT:
+                                self.handle_message(message.json())
+                            elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f'Kline stream error on {self.timeframe}: {e}')
+
+                self.reconnects += 1
+                logger.warning(f'Kline stream disconnected, reconnect in {delay}s')
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    def start_backfill(self, symbol: str):
+        if symbol in self.backfilling:
+            return
+        self.backfilling[symbol] = []
+        self.spawn(self.backfill(symbol))
+
+    async def backfill(self, symbol: str):
+        """
+        Дозагружает пропущенные свечи через REST и применяет сообщения, пришедшие за это время.
+        Пока дозагрузка не удалась, сообщения копятся: без истории они легли бы поверх пропуска
+        """
+        delay = self.reconnect_delay
+        while True:
+            try:
+                if await self.loader.update_candles(symbol, self.timeframe, self.limit):
+                    break
+                logger.error(f'Failed to backfill {symbol} {self.timeframe}, retry in {delay}s')
+            except Exception as e:
+                logger.error(f'Error on backfilling {symbol} {self.timeframe}: {e}, retry in {delay}s')
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+        for payload in self.backfilling.pop(symbol, []):
+            self.apply_kline(payload)
+
+    def handle_message(self, message: dict):
+        payload = message.get('data', message)
+        if payload.get('e') != 'kline':
+            return
+        self.messages_received += 1
+        self.last_latency = time.time() - payload['E'] / 1000
+
+        symbol = payload['s']
+        if symbol in self.backfilling:
+            self.backfilling[symbol].append(payload)
+            return
+
+        buffer = self.loader.candle_store.get(symbol, self.timeframe)
+        last_open_time = None if buffer is None else buffer.last_open_time
+        if last_open_time is None or payload['k']['t'] > last_open_time + self.timeframe_ms:
+            # пропущены свечи между буфером и стримом
+            self.start_backfill(symbol)
+            self.backfilling[symbol].append(payload)
+            return
+
+        self.apply_kline(payload)
+
+    def apply_kline(self, payload: dict):
+        kline = payload['k']
+        symbol = payload['s']
+        buffer = self.loader.candle_store.get_or_create(symbol, self.timeframe, self.limit)
+        buffer.merge(
+            np.array([kline['t']], dtype=np.int64),
+            np.array([[kline['o'], kline['h'], kline['l'], kline['c'], kline['v']]], dtype=np.float64)
+        )
+        if kline['x']:
+            self.candles_closed += 1
+            self.spawn(self.on_candle_close(symbol, self.timeframe, kline['t']))
+
+    def spawn(self, coroutine: Awaitable):
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
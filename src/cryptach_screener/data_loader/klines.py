@@ -0,0 +1,37 @@
+import numpy as np
+import orjson
+import pandas as pd
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def empty_klines() -> tuple[np.ndarray, np.ndarray]:
+    return np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64)
+
+
+def parse_klines(body: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Разбирает ответ /fapi/v1/klines сразу в столбцы: время открытия в мс (int64) и OHLCV (float64).
+    Цены в ответе - строки, они переводятся в числа одним astype по всей таблице
+    """
+    rows = orjson.loads(body)
+    if not rows:
+        return empty_klines()
+    table = np.array(rows, dtype=object)
+    return table[:, 0].astype(np.int64), table[:, 1:6].astype(np.float64)
+
+
+def concat_klines(pages: list[tuple[np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray]:
+    if not pages:
+        return empty_klines()
+    if len(pages) == 1:
+        return pages[0]
+    return np.concatenate([times for times, _ in pages]), np.concatenate([values for _, values in pages])
+
+
+def make_candles_frame(times: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+    """
+    DataFrame свечей с индексом Time по времени открытия (UTC, без таймзоны)
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(times, unit='ms'), name='Time')
+    return pd.DataFrame(values, index=index, columns=OHLCV_COLUMNS)
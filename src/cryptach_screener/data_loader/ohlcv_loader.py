@@ -1,19 +1,34 @@
 import asyncio
 import logging
+import time
 
 import aiohttp
-import ccxt.async_support as ccxt
-from datetime import datetime
+import numpy as np
 import pandas as pd
 
+from src.cryptach_screener.data_loader.candle_store import CandleStore, timeframe_to_ms
+from src.cryptach_screener.data_loader.klines import parse_klines, concat_klines, make_candles_frame
+from src.cryptach_screener.data_loader.symbol_registry import SymbolRegistry
+from src.cryptach_screener.data_loader.resample import get_resample_ratio, resample_candles
+from src.cryptach_screener.data_loader.rate_limiter import WeightRateLimiter, RateLimitExceeded, \
+    klines_request_weight
+
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.StreamHandler())
 
 
 class OHLCVLoader(object):
-    def __init__(self):
+    max_retries = 3
+    max_klines_per_request = 1500
+
+    def __init__(self, rate_limit: int = 2400, max_concurrent_requests: int = 20,
+                 base_url: str = 'https://fapi.binance.com', cache_dir: str = None, symbols_ttl: float = 3600):
+        self.base_url = base_url
         self.session: aiohttp.ClientSession = None
-        self.exchange = ccxt.binanceusdm()
+        # с cache_dir свечи хранятся на диске и после перезапуска догружается только разрыв
+        self.candle_store = CandleStore(cache_dir)
+        self.rate_limiter = WeightRateLimiter(weight_limit=rate_limit, max_concurrency=max_concurrent_requests)
+        self.symbol_registry = SymbolRegistry(self.rate_limiter, base_url=base_url, ttl=symbols_ttl)
 
     def start_session(self):
         self.session = aiohttp.ClientSession()
@@ -21,45 +36,138 @@ class OHLCVLoader(object):
     async def close_session(self):
         if self.session is not None:
             await self.session.close()
+        self.candle_store.flush()
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close_session()
-        await self.exchange.close()
 
-    async def make_request_ohlcv(self, symbol: str, timeframe: str, limit: int):
-        url = f'https://fapi.binance.com/fapi/v1/klines' \
+    async def make_request_ohlcv(self, symbol: str, timeframe: str, limit: int,
+                                 start_time: int = None) -> tuple[np.ndarray, np.ndarray] | None:
+        """
+        Один запрос свечей, возвращает время открытия и OHLCV массивами
+        """
+        url = f'{self.base_url}/fapi/v1/klines' \
               f'?symbol={symbol}&interval={timeframe}&limit={limit}'
+        if start_time is not None:
+            url += f'&startTime={start_time}'
         if self.session is None:
             self.start_session()
-        async with self.session.get(url) as resp:
-            if resp.status == 200:
-                raw_ohclv = await resp.json()
-                sliced_ohlcv = [row[:6] for row in raw_ohclv]
-                converted_ohlcv = [[float(item) for item in row] for row in sliced_ohlcv]
-                return converted_ohlcv
-            else:
-                logger.error(f"Error while fetching data {symbol} {timeframe}: {await resp.text()}")
-        return None
-
 
-    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int) -> pd.DataFrame | None:
-        ohlcv = await self.make_request_ohlcv(symbol=symbol, timeframe=timeframe, limit=limit)
-
-        # convert it into Pandas DataFrame
-        if ohlcv is None:
+        retry_after = 0
+        for attempt in range(self.max_retries):
+            async with self.rate_limiter.request(klines_request_weight(limit)):
+                async with self.session.get(url) as resp:
+                    self.rate_limiter.update_used_weight(resp.headers)
+                    if resp.status == 200:
+                        return parse_klines(await resp.read())
+                    elif resp.status in (429, 418):
+                        # 429 - превышен лимит, 418 - IP забанен; ждём столько, сколько просит биржа
+                        retry_after = float(resp.headers.get('Retry-After', 2 ** (attempt + 1)))
+                        self.rate_limiter.pause(retry_after)
+                        logger.warning(f"Rate limit on fetching {symbol} {timeframe}: HTTP {resp.status},"
+                                       f" retry after {retry_after}s")
+                    else:
+                        logger.error(f"Error while fetching data {symbol} {timeframe}: {await resp.text()}")
+                        return None
+        raise RateLimitExceeded(f'Rate limit on fetching {symbol} {timeframe}', retry_after)
+
+    async def request_candles(self, symbol: str, timeframe: str, limit: int,
+                              start_time: int = None) -> tuple[np.ndarray, np.ndarray] | None:
+        """
+        Запрашивает limit свечей, при необходимости несколькими запросами по max_klines_per_request
+        """
+        if limit <= self.max_klines_per_request:
+            return await self.make_request_ohlcv(symbol=symbol, timeframe=timeframe, limit=limit,
+                                                 start_time=start_time)
+
+        timeframe_ms = timeframe_to_ms(timeframe)
+        if start_time is None:
+            start_time = int(time.time() * 1000) // timeframe_ms * timeframe_ms - (limit - 1) * timeframe_ms
+        pages = []
+        received = 0
+        while received < limit:
+            page_limit = min(limit - received, self.max_klines_per_request)
+            page = await self.make_request_ohlcv(symbol=symbol, timeframe=timeframe, limit=page_limit,
+                                                 start_time=start_time)
+            if page is None:
+                return None
+            pages.append(page)
+            times, _ = page
+            received += len(times)
+            if len(times) < page_limit:
+                break
+            start_time = int(times[-1]) + timeframe_ms
+        return concat_klines(pages)
+
+    async def update_candles(self, symbol: str, timeframe: str, limit: int) -> bool:
+        """
+        Обновляет буфер свечей символа, возвращает False, если данные загрузить не удалось
+        """
+        buffer = self.candle_store.get_or_create(symbol, timeframe, limit)
+
+        # догружаю только свечи начиная с последней сохранённой (она могла ещё формироваться)
+        start_time = buffer.last_open_time
+        request_limit = limit
+        if start_time is not None:
+            missed_candles = (int(time.time() * 1000) - start_time) // timeframe_to_ms(timeframe) + 1
+            if missed_candles >= limit:
+                buffer.clear()
+                start_time = None
+            else:
+                request_limit = missed_candles + 1
+
+        candles = await self.request_candles(symbol=symbol, timeframe=timeframe, limit=request_limit,
+                                             start_time=start_time)
+
+        if candles is None:
+            return False
+
+        buffer.merge(*candles)
+        return True
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int,
+                          base_timeframe: str = None) -> pd.DataFrame | None:
+        """
+        Последние limit свечей. Если задан base_timeframe, загружается только он,
+        а свечи timeframe собираются из него локально
+        """
+        if base_timeframe is not None and base_timeframe != timeframe:
+            base_limit = (limit + 1) * get_resample_ratio(base_timeframe, timeframe)
+            if not await self.update_candles(symbol, base_timeframe, base_limit):
+                return None
+        elif not await self.update_candles(symbol, timeframe, limit):
             return None
 
-        df = pd.DataFrame(ohlcv, columns=['Time', 'Open', 'High', 'Low', 'Close', 'Volume'])
-        df['Time'] = [datetime.fromtimestamp(float(time) / 1000) for time in df['Time']]
-        df.set_index('Time', inplace=True)
-
-        return df
+        return self.get_ohlcv(symbol, timeframe, limit, base_timeframe)
+
+    def get_ohlcv(self, symbol: str, timeframe: str, limit: int, base_timeframe: str = None,
+                  closed_only: bool = False) -> pd.DataFrame | None:
+        """
+        Последние limit свечей из буфера без запроса к бирже.
+        closed_only - без ещё формирующейся свечи
+        """
+        tail_limit = limit + 1 if closed_only else limit
+        if base_timeframe is not None and base_timeframe != timeframe:
+            ratio = get_resample_ratio(base_timeframe, timeframe)
+            buffer = self.candle_store.get(symbol, base_timeframe)
+            if buffer is None:
+                return None
+            times, values = resample_candles(*buffer.tail((tail_limit + 1) * ratio), timeframe)
+        else:
+            buffer = self.candle_store.get(symbol, timeframe)
+            if buffer is None:
+                return None
+            times, values = buffer.tail(tail_limit)
+
+        if closed_only and len(times) and times[-1] + timeframe_to_ms(timeframe) > time.time() * 1000:
+            times, values = times[:-1], values[:-1]
+        times, values = times[-limit:], values[-limit:]
+
+        return make_candles_frame(times, values)
 
     async def fetch_futures_usdt_symbols(self) -> list[str]:
-        markets = await self.exchange.fetch_markets()
-        symbols: list[str] = [market['info']['symbol'] for market in markets]
-        symbols = [symbol for symbol in symbols if symbol[-4:] == 'USDT']
-        return symbols
+        # список кэшируется в реестре и обновляется в фоне раз в symbols_ttl
+        return await self.symbol_registry.get_symbols()
 
 
 if __name__ == '__main__':
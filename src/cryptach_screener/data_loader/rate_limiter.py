@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """
+    Биржа ответила 429/418 и попытки запроса исчерпаны
+    """
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def klines_request_weight(limit: int) -> int:
+    """
+    Вес запроса /fapi/v1/klines в зависимости от limit по документации Binance
+    """
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class WeightRateLimiter(object):
+    """
+    Ограничитель запросов к Binance: ограничивает число одновременных запросов
+    и следит за израсходованным весом (X-MBX-USED-WEIGHT-1M) в пределах минутного окна
+    """
+    weight_limit: int
+    weight_budget: int
+
+    def __init__(self, weight_limit: int, max_concurrency: int, safety_ratio: float = 0.9):
+        self.weight_limit = weight_limit
+        # оставляю запас на запросы, которые уже в пути и ещё не учтены в заголовке
+        self.weight_budget = max(1, int(weight_limit * safety_ratio))
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.used_weight = 0
+        self.window = self.current_window()
+        self.paused_until = 0.
+
+    @staticmethod
+    def current_window(now: float = None) -> int:
+        return int((time.time() if now is None else now) // 60)
+
+    def roll_window(self, now: float):
+        window = self.current_window(now)
+        if window != self.window:
+            self.window = window
+            self.used_weight = 0
+
+    async def wait_for_budget(self, weight: int):
+        while True:
+            now = time.time()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.roll_window(now)
+            if self.used_weight + weight <= self.weight_budget:
+                return
+            logger.debug(f'Request weight budget exhausted: {self.used_weight} / {self.weight_budget}')
+            await asyncio.sleep(60 - now % 60 + 0.1)
+
+    @asynccontextmanager
+    async def request(self, weight: int):
+        async with self.semaphore:
+            await self.wait_for_budget(weight)
+            self.used_weight += weight
+            yield
+
+    def update_used_weight(self, headers):
+        """
+        Синхронизирует израсходованный вес с заголовком ответа Binance
+        """
+        used_weight = headers.get('X-MBX-USED-WEIGHT-1M') or headers.get('X-MBX-USED-WEIGHT')
+        if used_weight is None:
+            return
+        self.roll_window(time.time())
+        self.used_weight = max(self.used_weight, int(used_weight))
+
+    def pause(self, seconds: float):
+        """
+        Приостанавливает все запросы, например после ответа 429/418
+        """
+        self.paused_until = max(self.paused_until, time.time() + seconds)
+        logger.warning(f'Requests paused for {seconds:.1f}s by rate limit')
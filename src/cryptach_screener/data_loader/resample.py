@@ -0,0 +1,40 @@
+import numpy as np
+
+from src.cryptach_screener.data_loader.candle_store import timeframe_to_ms
+
+
+def get_resample_ratio(base_timeframe: str, timeframe: str) -> int:
+    """
+    Сколько свечей базового таймфрейма входит в одну свечу старшего
+    """
+    base_ms, target_ms = timeframe_to_ms(base_timeframe), timeframe_to_ms(timeframe)
+    if timeframe.endswith('w') or target_ms < base_ms or target_ms % base_ms:
+        raise ValueError(f'Timeframe {timeframe} can not be built from {base_timeframe}')
+    return target_ms // base_ms
+
+
+def resample_candles(times: np.ndarray, values: np.ndarray, timeframe: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Собирает свечи старшего таймфрейма из свечей базового (время открытия в мс и OHLCV по столбцам).
+    Свечи выравниваются по UTC, как на Binance. Неполная первая свеча отбрасывается,
+    неполная последняя остаётся - это ещё формирующаяся свеча
+    """
+    if len(times) == 0:
+        return times, values
+
+    target_ms = timeframe_to_ms(timeframe)
+    keys = times // target_ms * target_ms
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+    if times[0] != keys[0]:
+        starts = starts[1:]
+        if len(starts) == 0:
+            return times[:0], values[:0]
+    ends = np.concatenate([starts[1:], [len(times)]])
+
+    resampled = np.empty((len(starts), 5), dtype=values.dtype)
+    resampled[:, 0] = values[starts, 0]
+    resampled[:, 1] = np.maximum.reduceat(values[starts[0]:, 1], starts - starts[0])
+    resampled[:, 2] = np.minimum.reduceat(values[starts[0]:, 2], starts - starts[0])
+    resampled[:, 3] = values[ends - 1, 3]
+    resampled[:, 4] = np.add.reduceat(values[starts[0]:, 4], starts - starts[0])
+    return keys[starts], resampled
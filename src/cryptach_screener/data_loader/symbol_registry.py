@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+import orjson
+
+from src.cryptach_screener.data_loader.rate_limiter import WeightRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# вес запроса /fapi/v1/exchangeInfo по документации Binance
+EXCHANGE_INFO_WEIGHT = 1
+
+
+def parse_exchange_info(body: bytes, quote_asset: str = 'USDT', contract_type: str = 'PERPETUAL',
+                        status: str = 'TRADING') -> list[str]:
+    """
+    Символы из ответа /fapi/v1/exchangeInfo, которые торгуются и подходят по типу контракта и валюте котировки
+    """
+    return [market['symbol'] for market in orjson.loads(body)['symbols']
+            if market.get('status') == status and market.get('contractType') == contract_type
+            and market.get('quoteAsset') == quote_asset]
+
+
+class SymbolRegistry(object):
+    """
+    Список торгуемых бессрочных USDT-контрактов. Загружается один раз и обновляется в фоне
+    по истечении ttl, проверки получают уже готовый список без запросов к бирже.
+    Если обновить список не удалось, используется предыдущий
+    """
+    ttl: float
+
+    def __init__(self, rate_limiter: WeightRateLimiter, base_url: str = 'https://fapi.binance.com',
+                 ttl: float = 3600):
+        self.rate_limiter = rate_limiter
+        self.base_url = base_url
+        self.ttl = ttl
+        self.symbols: list[str] = []
+        self.updated_at: float | None = None
+        self.refresh_task: asyncio.Task | None = None
+        self.requests = 0
+
+    @property
+    def expired(self) -> bool:
+        return self.updated_at is None or time.monotonic() - self.updated_at >= self.ttl
+
+    async def get_symbols(self) -> list[str]:
+        if self.updated_at is None:
+            await self.refresh()
+        elif self.expired and (self.refresh_task is None or self.refresh_task.done()):
+            self.refresh_task = asyncio.create_task(self.refresh())
+        return list(self.symbols)
+
+    async def refresh(self):
+        try:
+            async with self.rate_limiter.request(EXCHANGE_INFO_WEIGHT):
+                self.requests += 1
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f'{self.base_url}/fapi/v1/exchangeInfo') as resp:
+                        self.rate_limiter.update_used_weight(resp.headers)
+                        resp.raise_for_status()
+                        symbols = parse_exchange_info(await resp.read())
+        except Exception as e:
+            if not self.symbols:
+                raise
+            logger.error(f'Error on refreshing symbols, keep {len(self.symbols)} known symbols: {e}')
+            return
+
+        added, removed = set(symbols) - set(self.symbols), set(self.symbols) - set(symbols)
+        if self.updated_at is not None and (added or removed):
+            logger.info(f'Symbols updated: +{sorted(added)} -{sorted(removed)}')
+        self.symbols = symbols
+        self.updated_at = time.monotonic()
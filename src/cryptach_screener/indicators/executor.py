@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from src.cryptach_screener.indicators.nadaraya_watson import nadaraya_watson_bands
+
+logger = logging.getLogger(__name__)
+
+INDICATOR_COLUMNS = ['NWE_upper', 'NWE_lower', 's_trend', 's_direction', 's_long', 's_short']
+
+
+def compute_indicators(ohlcv: np.ndarray, nwe_length: int, h: float, mult: float,
+                       supertrend_length: int) -> np.ndarray:
+    """
+    Считает индикаторы по массиву OHLCV (bars x 5: Open, High, Low, Close, Volume).
+    Возвращает массив bars x 6 в порядке INDICATOR_COLUMNS
+    """
+    # numba импортируется только там, где считаются индикаторы: в пуле процессов главному процессу он не нужен
+    from src.cryptach_screener.indicators.supertrend import supertrend_batch
+
+    nwe_upper, nwe_lower = nadaraya_watson_bands(ohlcv[:, 3], h=h, mult=mult, length=nwe_length)
+    supertrend_result = supertrend_batch(high=ohlcv[:, 1], low=ohlcv[:, 2], close=ohlcv[:, 3],
+                                         length=supertrend_length)
+
+    result = np.empty((len(ohlcv), len(INDICATOR_COLUMNS)), dtype=np.float64)
+    result[:, 0] = nwe_upper
+    result[:, 1] = nwe_lower
+    for column, values in enumerate(supertrend_result, start=2):
+        result[:, column] = values
+    return result
+
+
+def warm_up_indicators() -> tuple[float, int, int]:
+    """
+    Импортирует numba и компилирует ядра (или загружает их из дискового кэша) на маленьком примере.
+    Возвращает время в секундах, число ядер, загруженных из кэша, и число ядер
+    """
+    started_at = time.perf_counter()
+    from src.cryptach_screener.indicators import supertrend
+
+    bars = 16
+    close = np.linspace(100., 101., bars)
+    ohlcv = np.column_stack([close, close + 1, close - 1, close, np.ones(bars)])
+    compute_indicators(ohlcv, nwe_length=bars, h=8, mult=3, supertrend_length=7)
+    # учитываются только ядра, вызванные напрямую: вложенные компилируются вместе с вызывающим
+    kernels = [kernel for kernel in (supertrend.advance_supertrend, supertrend.advance_supertrend_batch)
+               if kernel.stats.cache_hits or kernel.stats.cache_misses]
+    cache_hits = sum(1 for kernel in kernels if sum(kernel.stats.cache_hits.values()))
+    return time.perf_counter() - started_at, cache_hits, len(kernels)
+
+
+# результат прогрева в процессе воркера пула
+_warm_up_result: tuple[float, int, int] | None = None
+
+
+def init_indicator_worker():
+    """
+    Инициализатор процесса пула: воркер прогревает JIT до первой задачи, даже если пул поднимет его позже
+    """
+    global _warm_up_result
+    _warm_up_result = warm_up_indicators()
+
+
+def get_warm_up_result() -> tuple[float, int, int] | None:
+    return _warm_up_result
+
+
+class IndicatorExecutor(object):
+    """
+    Выносит расчёт индикаторов из event loop в пул процессов или потоков.
+    В пул передаются только numpy-массивы, а не датафреймы
+    """
+    modes = ('process', 'thread', 'inline')
+
+    def __init__(self, mode: str = 'process', workers: int = 0):
+        if mode not in self.modes:
+            raise ValueError(f'Unknown indicator executor mode: {mode}')
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.executor: Executor | None = None
+
+    def get_executor(self) -> Executor | None:
+        if self.executor is None and self.mode != 'inline':
+            if self.mode == 'process':
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_indicator_worker)
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='indicators')
+            logger.info(f'Started indicator {self.mode} pool with {self.workers} workers')
+        return self.executor
+
+    async def warm_up(self) -> tuple[float, int, int]:
+        """
+        Прогревает JIT до первой проверки, возвращает худший результат warm_up_indicators.
+        Процессы пула прогреваются в инициализаторе, здесь только собираются их результаты;
+        потоки делят JIT с главным процессом, поэтому им достаточно одного прогрева
+        """
+        executor = self.get_executor()
+        if executor is None:
+            return warm_up_indicators()
+        loop = asyncio.get_running_loop()
+        if self.mode == 'thread':
+            return await loop.run_in_executor(executor, warm_up_indicators)
+        results = await asyncio.gather(*[loop.run_in_executor(executor, get_warm_up_result)
+                                         for _ in range(self.workers)])
+        return max(results)
+
+    async def compute(self, ohlcv: np.ndarray, nwe_length: int, h: float, mult: float,
+                      supertrend_length: int) -> np.ndarray:
+        executor = self.get_executor()
+        if executor is None:
+            return compute_indicators(ohlcv, nwe_length, h, mult, supertrend_length)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, compute_indicators, ohlcv, nwe_length, h, mult,
+                                          supertrend_length)
+
+    def shutdown(self, wait: bool = False):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=True)
+            self.executor = None
@@ -1,6 +1,5 @@
 from functools import lru_cache
 
-import numba as numba
 import numpy as np
 import pandas as pd
 
@@ -12,46 +11,52 @@ def nadaraya_watson_envelope(data: pd.DataFrame, h: float = 5, mult: float = 3,
         h: bandwidth, controls the degree of smoothness of the envelopes , with higher values returning smoother results.
         mult: multiplier, controls the envelope width
         length: determines the number of recent price observations to be used to fit the Nadaraya-Watson Estimator.
+    Возвращает новый датафрейм с полосами, входной не изменяется
     """
+    upper, lower = nadaraya_watson_bands(data.Close.to_numpy(), h=h, mult=mult, length=length)
 
-    # calculate the Nadaraya-Watson envelope on the last bar
-    y = np.zeros(length)
+    return data.assign(NWE_upper=upper,  # upper band
+                       NWE_lower=lower)  # lower band
 
-    # calculate the kernel function
-    estimation = calculate_estimation(data.Close.to_numpy(), h, length, y)
 
-    # calculate the mean absolute error
-    mae = estimation / length * mult
-
-    data['NWE_upper'] = y + mae  # upper band
-    data['NWE_lower'] = y - mae  # lower band
+def nadaraya_watson_bands(close: np.ndarray, h: float = 5, mult: float = 3, length: int = 500):
+    """
+    Верхняя и нижняя полосы NWE для одного ряда цен (shape (bars,)) или
+    для стопки рядов по символам (shape (symbols, bars)) за один вызов
+    """
+    y, mae = nadaraya_watson_estimate(close, h=h, length=length)
+    mae = mae * mult
+    return y + mae, y - mae
 
-    return data
 
+def nadaraya_watson_estimate(close: np.ndarray, h: float = 5, length: int = 500):
+    """
+    Оценка NWE по всем барам и средняя абсолютная ошибка без множителя полос
+    """
+    close = np.asarray(close, dtype=np.float64)
+    weights = get_nwe_weights(h, close.shape[-1])
 
-# @numba.njit
-def calculate_estimation(close_array, h, length, y):
-    estimation = 0
-    for i, close in enumerate(close_array):
-        cumulative_weight, current_weight = calculate_nwe_weights(close_array, h, i, length)
-        y2 = current_weight / cumulative_weight
-        estimation += np.abs(y2 - close)
-        y[i] = y2
-    return estimation
+    # оценка для всех баров (и всех символов) одним матричным умножением
+    y = close @ weights.T
 
+    # средняя абсолютная ошибка, как и раньше, делится на length
+    mae = np.abs(y - close).sum(axis=-1, keepdims=True) / length
+    if close.ndim == 1:
+        mae = mae[0]
 
-# @numba.njit
-def calculate_nwe_weights(close_array, h, i, length):
-    current_weight = 0
-    cumulative_weight = 0
-    for j, close in enumerate(close_array):
-        w = calculate_weight(h, i, j)
-        current_weight += close * w
-        cumulative_weight += w
-    return cumulative_weight, current_weight
+    return y, mae
 
 
-@lru_cache(maxsize=None)
-@numba.njit()
-def calculate_weight(h, i, j):
-    return np.exp(-(np.power(i - j, 2) / (h * h * 2)))
+@lru_cache(maxsize=16)
+def get_nwe_weights(h: float, length: int) -> np.ndarray:
+    """
+    Нормированная матрица гауссовых весов length x length: строка i содержит
+    веса всех баров j для оценки бара i. Считается один раз на пару (h, length)
+    """
+    distance = np.arange(length, dtype=np.float64)
+    distance = distance[:, np.newaxis] - distance[np.newaxis, :]
+    weights = np.exp(-(np.power(distance, 2) / (h * h * 2)))
+    weights /= weights.sum(axis=1, keepdims=True)
+    # матрица общая для всех вызовов, защищаем её от случайной записи
+    weights.setflags(write=False)
+    return weights
@@ -0,0 +1,159 @@
+import sys
+
+import numba
+import numpy as np
+
+# состояние одного символа между свечами
+STATE_PREV_CLOSE = 0
+STATE_ATR = 1
+STATE_ATR_WEIGHT = 2
+STATE_ATR_OBSERVATIONS = 3
+STATE_UPPER = 4
+STATE_LOWER = 5
+STATE_DIRECTION = 6
+STATE_BARS = 7
+STATE_SIZE = 8
+
+
+def new_state(symbols: int) -> np.ndarray:
+    state = np.zeros((symbols, STATE_SIZE), dtype=np.float64)
+    state[:, STATE_ATR] = np.nan
+    state[:, STATE_ATR_WEIGHT] = 1.
+    state[:, STATE_DIRECTION] = 1.
+    return state
+
+
+@numba.njit(cache=True)
+def advance_supertrend(high, low, close, length, multiplier, epsilon, state, trend, direction, long, short):
+    """
+    Продвигает состояние Supertrend по свечам одного символа. Повторяет pandas_ta.supertrend:
+    ATR - это RMA (ewm(alpha=1/length, adjust=True, min_periods=length)) от true range
+    """
+    old_weight_factor = 1. - 1. / length
+    for i in range(close.shape[0]):
+        prev_close = state[STATE_PREV_CLOSE]
+        atr = state[STATE_ATR]
+        atr_weight = state[STATE_ATR_WEIGHT]
+        observations = state[STATE_ATR_OBSERVATIONS]
+        first_bar = state[STATE_BARS] == 0
+
+        # true range, у первой свечи его нет
+        if first_bar:
+            true_range = np.nan
+        else:
+            true_range = max(abs(high[i] - low[i] + epsilon),
+                             abs(high[i] - prev_close),
+                             abs(prev_close - low[i]))
+
+        # RMA так же, как её считает pandas ewm
+        is_observation = true_range == true_range
+        observations += is_observation
+        if first_bar:
+            atr = true_range
+            atr_weight = 1.
+        elif atr == atr:
+            atr_weight *= old_weight_factor
+            if is_observation:
+                if atr != true_range:
+                    atr = (atr_weight * atr + true_range) / (atr_weight + 1.)
+                atr_weight += 1.
+        elif is_observation:
+            atr = true_range
+
+        band_width = multiplier * atr if observations >= length else np.nan
+        hl2 = (high[i] + low[i]) / 2
+        upper = hl2 + band_width
+        lower = hl2 - band_width
+
+        if first_bar:
+            bar_direction = 1.
+            trend[i] = 0.
+            long[i] = np.nan
+            short[i] = np.nan
+        else:
+            if close[i] > state[STATE_UPPER]:
+                bar_direction = 1.
+            elif close[i] < state[STATE_LOWER]:
+                bar_direction = -1.
+            else:
+                bar_direction = state[STATE_DIRECTION]
+                if bar_direction > 0 and lower < state[STATE_LOWER]:
+                    lower = state[STATE_LOWER]
+                if bar_direction < 0 and upper > state[STATE_UPPER]:
+                    upper = state[STATE_UPPER]
+            if bar_direction > 0:
+                trend[i] = lower
+                long[i] = lower
+                short[i] = np.nan
+            else:
+                trend[i] = upper
+                long[i] = np.nan
+                short[i] = upper
+        direction[i] = bar_direction
+
+        state[STATE_PREV_CLOSE] = close[i]
+        state[STATE_ATR] = atr
+        state[STATE_ATR_WEIGHT] = atr_weight
+        state[STATE_ATR_OBSERVATIONS] = observations
+        state[STATE_UPPER] = upper
+        state[STATE_LOWER] = lower
+        state[STATE_DIRECTION] = bar_direction
+        state[STATE_BARS] += 1
+
+
+@numba.njit(cache=True)
+def advance_supertrend_batch(high, low, close, length, multiplier, epsilons, state, trend, direction, long, short):
+    for symbol in range(close.shape[0]):
+        advance_supertrend(high[symbol], low[symbol], close[symbol], length, multiplier, epsilons[symbol],
+                           state[symbol], trend[symbol], direction[symbol], long[symbol], short[symbol])
+
+
+class SupertrendState(object):
+    """
+    Состояние Supertrend по набору символов для инкрементального расчёта:
+    update добавляет новые свечи без пересчёта всей истории
+    """
+    def __init__(self, symbols: int, length: int = 7, multiplier: float = 3.0):
+        self.length = length
+        self.multiplier = multiplier
+        self.values = new_state(symbols)
+
+    def update(self, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+        """
+        Принимает новые свечи формы (symbols,) или (symbols, bars),
+        возвращает trend, direction, long, short той же формы
+        """
+        high, low, close = [np.asarray(array, dtype=np.float64) for array in (high, low, close)]
+        squeeze = close.ndim == 1
+        if squeeze:
+            high, low, close = high[:, np.newaxis], low[:, np.newaxis], close[:, np.newaxis]
+
+        result = tuple(np.empty_like(close) for _ in range(4))
+        advance_supertrend_batch(high, low, close, self.length, self.multiplier, np.zeros(close.shape[0]),
+                                 self.values, *result)
+        if squeeze:
+            return tuple(column[:, 0] for column in result)
+        return result
+
+
+def supertrend_batch(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 7,
+                     multiplier: float = 3.0, return_state: bool = False):
+    """
+    Supertrend по одному ряду (bars,) или по стопке символов (symbols, bars).
+    Возвращает trend, direction, long, short - те же столбцы, что и pandas_ta.supertrend
+    """
+    high, low, close = [np.asarray(array, dtype=np.float64) for array in (high, low, close)]
+    squeeze = close.ndim == 1
+    high, low, close = np.atleast_2d(high), np.atleast_2d(low), np.atleast_2d(close)
+
+    # pandas_ta добавляет epsilon к high - low по всему ряду, если где-то диапазон нулевой
+    epsilons = np.where((high - low == 0).any(axis=1), sys.float_info.epsilon, 0.)
+
+    state = SupertrendState(close.shape[0], length=length, multiplier=multiplier)
+    result = tuple(np.empty_like(close) for _ in range(4))
+    advance_supertrend_batch(high, low, close, length, multiplier, epsilons, state.values, *result)
+    if squeeze:
+        result = tuple(column[0] for column in result)
+    if return_state:
+        return result, state
+    return result
@@ -0,0 +1,59 @@
+import time
+import zlib
+
+import numpy as np
+import orjson
+
+
+def make_market(symbol: str, status: str = 'TRADING', contract_type: str = 'PERPETUAL',
+                quote_asset: str = 'USDT') -> dict:
+    """
+    Описание символа в ответе /fapi/v1/exchangeInfo
+    """
+    return {'symbol': symbol, 'status': status, 'contractType': contract_type, 'quoteAsset': quote_asset}
+
+
+def get_klines_range(timeframe_ms: int, limit: int, start_time: int | None = None,
+                     now_ms: int | None = None) -> tuple[int, int]:
+    """
+    Время открытия первой и последней свечи ответа /fapi/v1/klines. Как на Binance: limit свечей,
+    заканчивая текущей, а если задан start_time - limit свечей начиная с него
+    """
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    last_open_time = now_ms // timeframe_ms * timeframe_ms
+    first_open_time = last_open_time - (limit - 1) * timeframe_ms
+    if start_time is not None:
+        first_open_time = -(-start_time // timeframe_ms) * timeframe_ms
+        last_open_time = min(last_open_time, first_open_time + (limit - 1) * timeframe_ms)
+    return first_open_time, last_open_time
+
+
+def make_ohlcv_values(bars: int, seed: int | list[int] = 0) -> np.ndarray:
+    """
+    Случайное блуждание цены: массив bars x 5 (Open, High, Low, Close, Volume)
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    open_price = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_price, close) * (1 + rng.uniform(0, 0.005, bars))
+    low = np.minimum(open_price, close) * (1 - rng.uniform(0, 0.005, bars))
+    volume = rng.lognormal(3, 1, bars)
+    return np.column_stack([open_price, high, low, close, volume])
+
+
+def make_symbol_ohlcv_values(symbol: str, first_open_time: int, timeframe_ms: int, bars: int) -> np.ndarray:
+    """
+    Случайное блуждание, одинаковое для одного символа и одного начала окна
+    """
+    return make_ohlcv_values(bars, [zlib.crc32(symbol.encode()), first_open_time // timeframe_ms])
+
+
+def format_klines(open_times: np.ndarray, values: np.ndarray, timeframe_ms: int) -> bytes:
+    """
+    Тело ответа /fapi/v1/klines: числа в виде строк, как у Binance
+    """
+    klines = [[open_time, f'{open_price:.4f}', f'{high:.4f}', f'{low:.4f}', f'{close:.4f}', f'{volume:.3f}',
+               open_time + timeframe_ms - 1, '0', 100, '0', '0', '0']
+              for open_time, (open_price, high, low, close, volume) in zip(open_times.tolist(), values.tolist())]
+    return orjson.dumps(klines)
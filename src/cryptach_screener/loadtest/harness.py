@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import resource
+import time
+from dataclasses import dataclass, field
+
+import aiohttp
+
+from src.cryptach_screener.config.config import Config
+from src.cryptach_screener.loadtest.mock_server import MockSettings, run_mock_server
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoadTestOptions(object):
+    """
+    Настройки скринера на время теста. Лимит веса по умолчанию не сдерживает запросы,
+    чтобы замерялся сам скринер; 2400 повторяет лимит Binance
+    """
+    timeframes: list[str] = field(default_factory=lambda: ['1h'])
+    base_timeframe: str = '30m'
+    weight_limit: int = 1000000
+    max_concurrent_requests: int = 20
+    indicator_executor: str = 'process'
+    indicator_workers: int = 0
+    chart_workers: int = 2
+
+
+@dataclass
+class LoadTestResult(object):
+    symbols: int
+    wall_time: float
+    # пик RSS процесса скринера и самого большого воркера пулов индикаторов и графиков, МБ
+    peak_rss_mb: float
+    worker_peak_rss_mb: float
+    # пик памяти рассчитанных рыночных данных в конвейере и самые большие данные одного символа, байты
+    market_data_peak_bytes: int
+    market_data_symbol_bytes: int
+    checked: int
+    signals: int
+    skipped: int
+    timeouts: int
+    errors: int
+    klines_requests: int
+    exchange_info_requests: int
+    telegram_requests: int
+    rate_limited: int
+    server_errors: int
+
+
+def make_config(url: str, options: LoadTestOptions) -> Config:
+    return Config(
+        token='123456:loadtest',
+        admins=[1],
+        channel_id='-1001',
+        rate_limit=options.weight_limit,
+        max_concurrent_requests=options.max_concurrent_requests,
+        binance_url=url,
+        telegram_api_url=url,
+        timeframes=options.timeframes,
+        base_timeframe=options.base_timeframe,
+        # кэш на диске отключён: каждый прогон загружает свечи с нуля
+        candle_cache_dir='',
+        indicator_executor=options.indicator_executor,
+        indicator_workers=options.indicator_workers,
+        chart_workers=options.chart_workers,
+    )
+
+
+def get_peak_rss_mb(who: int) -> float:
+    # ru_maxrss в Linux - в килобайтах
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+async def run_screener_iteration(url: str, options: LoadTestOptions) -> dict:
+    """
+    Одна итерация Screener.make_checking_iteration против подмены по адресу url.
+    Прогрев пулов и доставка сообщений в Telegram во время итерации не входят
+    """
+    # скринер импортируется здесь, чтобы главный процесс теста не тянул pandas и numba
+    from src.cryptach_screener.screener.screener import Screener
+
+    screener = Screener(make_config(url, options))
+    # ограничения Telegram на частоту подмена не соблюдает, 429 от неё выдерживаются как обычно
+    screener.telegram_outbox.chat_interval = screener.telegram_outbox.channel_interval = 0.
+    screener.telegram_outbox.global_rate = 1000.
+    await screener.warm_up()
+    screener.telegram_outbox.start()
+
+    started_at = time.perf_counter()
+    summary = await screener.make_checking_iteration(options.timeframes)
+    wall_time = time.perf_counter() - started_at
+
+    await screener.telegram_outbox.stop()
+    await (await screener.telegram_poster.bot.get_session()).close()
+    screener.chart_renderer.shutdown(wait=True)
+    screener.indicator_executor.shutdown(wait=True)
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f'{url}/stats') as resp:
+            stats = await resp.json()
+    return {'wall_time': wall_time, 'summary': summary, 'stats': stats,
+            'peak_rss_mb': get_peak_rss_mb(resource.RUSAGE_SELF),
+            'worker_peak_rss_mb': get_peak_rss_mb(resource.RUSAGE_CHILDREN)}
+
+
+def run_screener_process(url: str, options: LoadTestOptions, result_queue):
+    logging.basicConfig(level=logging.WARNING)
+    result_queue.put(asyncio.run(run_screener_iteration(url, options)))
+
+
+def run_scenario(settings: MockSettings, options: LoadTestOptions, timeout: float = 1800) -> LoadTestResult:
+    """
+    Поднимает подмену и скринер в отдельных процессах, чтобы пик памяти каждого прогона
+    не зависел от предыдущих и от самой подмены
+    """
+    context = multiprocessing.get_context('spawn')
+    port_queue, result_queue = context.Queue(), context.Queue()
+    stop_event = context.Event()
+    mock = context.Process(target=run_mock_server, args=(settings, port_queue, stop_event), daemon=True)
+    mock.start()
+    screener = None
+    try:
+        url = f'http://127.0.0.1:{port_queue.get(timeout=60)}'
+        screener = context.Process(target=run_screener_process, args=(url, options, result_queue))
+        screener.start()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                result = result_queue.get(timeout=1)
+                break
+            except queue.Empty:
+                if not screener.is_alive():
+                    raise RuntimeError(f'Screener process exited with code {screener.exitcode}')
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f'Load test of {settings.symbols} symbols did not finish in {timeout}s')
+        screener.join()
+    finally:
+        if screener is not None and screener.is_alive():
+            screener.terminate()
+        stop_event.set()
+        mock.join(10)
+
+    summary, stats = result['summary'], result['stats']
+    return LoadTestResult(
+        symbols=settings.symbols,
+        wall_time=result['wall_time'],
+        peak_rss_mb=result['peak_rss_mb'],
+        worker_peak_rss_mb=result['worker_peak_rss_mb'],
+        market_data_peak_bytes=summary['memory']['peak_bytes'],
+        market_data_symbol_bytes=summary['memory']['max_symbol_bytes'],
+        checked=summary['checked'],
+        signals=summary['signals'],
+        skipped=summary['skipped'],
+        timeouts=summary['timeouts'],
+        errors=summary['errors'],
+        klines_requests=stats['klines_requests'],
+        exchange_info_requests=stats['exchange_info_requests'],
+        telegram_requests=stats['telegram_requests'],
+        rate_limited=stats['rate_limited'],
+        server_errors=stats['errors'],
+    )
+
+
+def format_results(results: list[LoadTestResult]) -> str:
+    lines = [f"{'symbols':>8} {'wall, s':>8} {'rss, MB':>8} {'worker':>8} {'md, KiB':>8} {'B/sym':>6}"
+             f" {'checked':>8} {'signals':>8}"
+             f" {'klines':>8} {'429':>6} {'500':>6} {'telegram':>9}"]
+    for result in results:
+        lines.append(f'{result.symbols:>8} {result.wall_time:>8.2f} {result.peak_rss_mb:>8.0f}'
+                     f' {result.worker_peak_rss_mb:>8.0f} {result.market_data_peak_bytes / 1024:>8.0f}'
+                     f' {result.market_data_symbol_bytes:>6} {result.checked:>8} {result.signals:>8}'
+                     f' {result.klines_requests:>8} {result.rate_limited:>6} {result.server_errors:>6}'
+                     f' {result.telegram_requests:>9}')
+    return '\n'.join(lines)
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, asdict
+
+import numpy as np
+from aiohttp import web
+
+from src.cryptach_screener.data_loader.candle_store import timeframe_to_ms
+from src.cryptach_screener.data_loader.rate_limiter import klines_request_weight
+from src.cryptach_screener.data_loader.symbol_registry import EXCHANGE_INFO_WEIGHT
+from src.cryptach_screener.loadtest.exchange_data import format_klines, get_klines_range, make_market, \
+    make_symbol_ohlcv_values
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MockSettings(object):
+    """
+    Поведение подмены: число символов, задержка ответа (latency плюс равномерная добавка до jitter),
+    доли ответов с ошибкой 500 и с 429, лимит веса запросов в минуту, как у Binance
+    """
+    symbols: int = 100
+    latency: float = 0.
+    jitter: float = 0.
+    error_rate: float = 0.
+    rate_limit_rate: float = 0.
+    retry_after: float = 1.
+    weight_limit: int = 1000000
+    telegram_latency: float = 0.
+    telegram_rate_limit_rate: float = 0.
+    seed: int = 0
+
+
+@dataclass
+class MockStats(object):
+    klines_requests: int = 0
+    exchange_info_requests: int = 0
+    telegram_requests: int = 0
+    photos: int = 0
+    messages: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    telegram_rate_limited: int = 0
+    used_weight: int = 0
+    max_used_weight: int = 0
+
+
+class MockExchange(object):
+    """
+    Локальная подмена Binance USDM и Telegram Bot API для нагрузочного теста: /fapi/v1/exchangeInfo,
+    /fapi/v1/klines, sendPhoto и sendMessage. Свечи генерируются по времени запроса, поэтому
+    последняя свеча всегда текущая. Счётчики запросов отдаются по /stats
+    """
+    def __init__(self, settings: MockSettings, host: str = '127.0.0.1', port: int = 0):
+        self.settings = settings
+        self.host = host
+        self.port = port
+        self.stats = MockStats()
+        self.symbols = [f'SYM{number}USDT' for number in range(settings.symbols)]
+        self.random = random.Random(settings.seed)
+        self.weight_window = 0
+        self.message_id = 0
+        # последняя загруженная картинка, для проверки отправки графиков
+        self.last_photo: bytes | None = None
+        self.runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    async def start(self):
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_get('/fapi/v1/exchangeInfo', self.handle_exchange_info)
+        app.router.add_get('/fapi/v1/klines', self.handle_klines)
+        app.router.add_post('/bot{token}/{method}', self.handle_telegram)
+        app.router.add_get('/stats', self.handle_stats)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        self.port = self.runner.addresses[0][1]
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def delay(self, latency: float, jitter: float = 0.):
+        seconds = latency + self.random.uniform(0, jitter) if jitter else latency
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def use_weight(self, weight: int) -> dict:
+        window = int(time.time() // 60)
+        if window != self.weight_window:
+            self.weight_window = window
+            self.stats.used_weight = 0
+        self.stats.used_weight += weight
+        self.stats.max_used_weight = max(self.stats.max_used_weight, self.stats.used_weight)
+        return {'X-MBX-USED-WEIGHT-1M': str(self.stats.used_weight)}
+
+    def get_binance_error(self, headers: dict) -> web.Response | None:
+        """
+        Ответ с ошибкой, если запрос превысил лимит веса или попал в долю ошибок
+        """
+        settings = self.settings
+        if self.stats.used_weight > settings.weight_limit or self.random.random() < settings.rate_limit_rate:
+            self.stats.rate_limited += 1
+            return web.json_response({'code': -1003, 'msg': 'Too many requests'}, status=429,
+                                     headers={**headers, 'Retry-After': str(settings.retry_after)})
+        if self.random.random() < settings.error_rate:
+            self.stats.errors += 1
+            return web.json_response({'code': -1000, 'msg': 'An unknown error occurred'}, status=500,
+                                     headers=headers)
+        return None
+
+    async def handle_exchange_info(self, request: web.Request) -> web.Response:
+        self.stats.exchange_info_requests += 1
+        headers = self.use_weight(EXCHANGE_INFO_WEIGHT)
+        await self.delay(self.settings.latency, self.settings.jitter)
+        markets = [make_market(symbol) for symbol in self.symbols]
+        return web.json_response({'timezone': 'UTC', 'symbols': markets}, headers=headers)
+
+    async def handle_klines(self, request: web.Request) -> web.Response:
+        self.stats.klines_requests += 1
+        limit = int(request.query.get('limit', 500))
+        headers = self.use_weight(klines_request_weight(limit))
+        await self.delay(self.settings.latency, self.settings.jitter)
+        if (error := self.get_binance_error(headers)) is not None:
+            return error
+
+        symbol = request.query['symbol']
+        timeframe_ms = timeframe_to_ms(request.query['interval'])
+        start_time = int(request.query['startTime']) if 'startTime' in request.query else None
+        first_open_time, last_open_time = get_klines_range(timeframe_ms, limit, start_time)
+        body = self.make_klines(symbol, first_open_time, last_open_time, timeframe_ms)
+        return web.Response(body=body, content_type='application/json', headers=headers)
+
+    @staticmethod
+    def make_klines(symbol: str, first_open_time: int, last_open_time: int, timeframe_ms: int) -> bytes:
+        open_times = np.arange(first_open_time, last_open_time + 1, timeframe_ms, dtype=np.int64)
+        if not len(open_times):
+            return b'[]'
+        values = make_symbol_ohlcv_values(symbol, first_open_time, timeframe_ms, len(open_times))
+        return format_klines(open_times, values, timeframe_ms)
+
+    async def handle_telegram(self, request: web.Request) -> web.Response:
+        self.stats.telegram_requests += 1
+        method = request.match_info['method']
+        await self.delay(self.settings.telegram_latency)
+        if self.random.random() < self.settings.telegram_rate_limit_rate:
+            self.stats.telegram_rate_limited += 1
+            retry_after = max(1, int(self.settings.retry_after))
+            return web.json_response({'ok': False, 'error_code': 429,
+                                      'description': f'Too Many Requests: retry after {retry_after}',
+                                      'parameters': {'retry_after': retry_after}}, status=429)
+
+        data = await request.post()
+        if method.lower() == 'sendphoto':
+            self.stats.photos += 1
+            if isinstance(data.get('photo'), web.FileField):
+                self.last_photo = data['photo'].file.read()
+        elif method.lower() == 'sendmessage':
+            self.stats.messages += 1
+        else:
+            return web.json_response({'ok': False, 'error_code': 404, 'description': 'Not Found'}, status=404)
+
+        self.message_id += 1
+        chat_id = data.get('chat_id', '0')
+        message = {'message_id': self.message_id, 'date': int(time.time()),
+                   'chat': {'id': int(chat_id) if str(chat_id).lstrip('-').isdigit() else 0, 'type': 'channel'}}
+        if 'caption' in data:
+            message['caption'] = data['caption']
+        if 'text' in data:
+            message['text'] = data['text']
+        return web.json_response({'ok': True, 'result': message})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(asdict(self.stats))
+
+
+def run_mock_server(settings: MockSettings, port_queue, stop_event):
+    """
+    Точка входа процесса подмены: сообщает порт в port_queue и работает до stop_event
+    """
+    async def serve():
+        exchange = MockExchange(settings)
+        await exchange.start()
+        port_queue.put(exchange.port)
+        while not stop_event.is_set():
+            await asyncio.sleep(0.1)
+        await exchange.stop()
+
+    asyncio.run(serve())
@@ -0,0 +1,204 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# границы по умолчанию для длительностей в секундах: от миллисекунды до минуты
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10., 30., 60.)
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: tuple[str, ...], values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric(ABC):
+    """
+    Метрика с набором меток. Значения по меткам хранятся в словаре по кортежу значений меток,
+    поэтому обновление - это поиск в словаре и сложение
+    """
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        lines += self.render_samples()
+        return lines
+
+    @abstractmethod
+    def render_samples(self) -> list[str]:
+        """
+        Строки с отсчётами метрики в текстовом формате Prometheus
+        """
+        ...
+
+
+class Counter(Metric):
+    """
+    Растущий счётчик. Если задана функция, значение считывается из неё в момент сбора метрик:
+    так выводятся счётчики, которые уже ведут другие объекты
+    """
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = (),
+                 function: Callable[[], float] = None):
+        super().__init__(name, help_text, labelnames)
+        self.values: dict[tuple, float] = {} if labelnames else {(): 0.}
+        self.function = function
+
+    def inc(self, amount: float = 1, labels: tuple = ()):
+        self.values[labels] = self.values.get(labels, 0.) + amount
+
+    def get(self, labels: tuple = ()) -> float:
+        return self.values.get(labels, 0.)
+
+    def render_samples(self) -> list[str]:
+        if self.function is not None:
+            self.values[()] = self.function()
+        return [f'{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}'
+                for labels, value in self.values.items()]
+
+
+class Gauge(Counter):
+    """
+    Текущее значение
+    """
+    kind = 'gauge'
+
+    def set(self, value: float, labels: tuple = ()):
+        self.values[labels] = value
+
+
+class HistogramSeries(object):
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, buckets: int):
+        # последняя ячейка - значения больше последней границы
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.
+        self.count = 0
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: dict[tuple, HistogramSeries] = {}
+
+    def get_series(self, labels: tuple = ()) -> HistogramSeries:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = HistogramSeries(len(self.buckets))
+        return series
+
+    def observe(self, value: float, labels: tuple = ()):
+        series = self.get_series(labels)
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    @contextmanager
+    def time(self, labels: tuple = ()):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, labels)
+
+    def render_samples(self) -> list[str]:
+        lines = []
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), series.counts):
+                cumulative += count
+                bucket_labels = format_labels(self.labelnames, labels, f'le="{format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(self.labelnames, labels)} {format_value(series.sum)}')
+            lines.append(f'{self.name}_count{format_labels(self.labelnames, labels)} {series.count}')
+        return lines
+
+
+class MetricsRegistry(object):
+    """
+    Набор метрик процесса и их вывод в текстовом формате Prometheus
+    """
+    def __init__(self, prefix: str = ''):
+        self.prefix = prefix
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = (),
+                function: Callable[[], float] = None) -> Counter:
+        return self.register(Counter(self.prefix + name, help_text, labelnames, function))
+
+    def gauge(self, name: str, help_text: str, labelnames: tuple[str, ...] = (),
+              function: Callable[[], float] = None) -> Gauge:
+        return self.register(Gauge(self.prefix + name, help_text, labelnames, function))
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(self.prefix + name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer(object):
+    """
+    HTTP-эндпоинт /metrics для Prometheus. Метрики собираются в момент запроса
+    """
+    def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.runner: web.AppRunner | None = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        # порт 0 - свободный порт, выбранный системой
+        self.port = self.runner.addresses[0][1]
+        logger.info(f'Metrics are served on http://{self.host}:{self.port}/metrics')
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.registry.render().encode(), headers={'Content-Type': CONTENT_TYPE})
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.cryptach_screener.screener.market_data import MarketData
+
+logger = logging.getLogger(__name__)
+
+CHART_COLUMNS = ['Open', 'High', 'Low', 'Close', 'NWE_upper', 'NWE_lower', 's_long', 's_short']
+CHART_BARS = 50
+
+
+def add_session_cols(df):
+    hour = df.index.hour
+    df.loc[:, 'Hour'] = hour
+    df.loc[:, 'SessionNY'] = np.where((13 <= hour) & (hour < 22), 'NY', None)
+    df.loc[:, 'SessionLondon'] = np.where((7 <= hour) & (hour < 16), 'London', None)
+    df.loc[:, 'SessionTokyo'] = np.where((0 <= hour) & (hour < 9), 'Tokyo', None)
+    df.loc[:, 'SessionSydney'] = np.where((21 <= hour) | (hour < 6), 'Sydney', None)
+
+    return df
+
+
+def draw_chart(chart_title, df):
+    # plotly нужен только воркерам пула графиков, главный процесс его не импортирует
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=2, cols=1,
+                        row_heights=[0.15, 0.85],
+                        shared_xaxes=True,
+                        vertical_spacing=0.02)
+    fig.add_traces(data=[
+        go.Scatter(name='Sydney', x=df.index, y=df['SessionSydney'], showlegend=False, line={'width': 7}),
+        go.Scatter(name='Tokyo', x=df.index, y=df['SessionTokyo'], showlegend=False, line={'width': 7}),
+        go.Scatter(name='London', x=df.index, y=df['SessionLondon'], showlegend=False, line={'width': 7}),
+        go.Scatter(name='NY', x=df.index, y=df['SessionNY'], showlegend=False, line={'width': 7}),
+    ])
+    fig.add_traces(data=[
+        go.Candlestick(name=chart_title, x=df.index,
+                       open=df['Open'], high=df['High'],
+                       low=df['Low'], close=df['Close']),
+        go.Scatter(name='NWE upper', x=df.index, y=df['NWE_upper'],
+                   line=dict(color='lime', width=1, dash='dash')),
+        go.Scatter(name='NWE lower', x=df.index, y=df['NWE_lower'], line=dict(color='red', width=1, dash='dash')),
+        go.Scatter(name='Supertrend Long', x=df.index, y=df['s_long'], line=dict(color='lime', width=2)),
+        go.Scatter(name='Supertrend Short', x=df.index, y=df['s_short'], line=dict(color='red', width=2)),
+    ], rows=2, cols=1)
+    for i in range(1, 3):
+        fig.update_xaxes(row=i, col=1, rangeslider_visible=False)
+    fig.update_layout(
+        width=1280,
+        height=720,
+        title=chart_title,
+        xaxis_rangeslider_visible=False,
+        template='plotly_dark',
+        margin=go.layout.Margin(
+            l=50,
+            r=50,
+            b=30,
+            t=70,
+            pad=4
+        ),
+    )
+    return fig
+
+
+def render_chart(chart_title: str, times: np.ndarray, values: np.ndarray) -> bytes:
+    """
+    Рисует график по массивам (время в нс и столбцы CHART_COLUMNS) и возвращает JPEG в памяти
+    """
+    df = pd.DataFrame(values, index=pd.DatetimeIndex(times), columns=CHART_COLUMNS)
+    df = add_session_cols(df)
+    fig = draw_chart(chart_title, df)
+    return fig.to_image(format='jpg')
+
+
+def warm_up_renderer():
+    """
+    Запускает kaleido в процессе воркера заранее, чтобы первый сигнал не ждал его старта
+    """
+    import plotly.graph_objects as go
+
+    go.Figure(go.Scatter(y=[0, 1])).to_image(format='jpg', width=64, height=64)
+
+
+class ChartRenderer(object):
+    """
+    Пул процессов с прогретым kaleido: графики рисуются параллельно и не блокируют event loop
+    """
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self.executor: ProcessPoolExecutor | None = None
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up_renderer)
+            logger.info(f'Started chart render pool with {self.workers} workers')
+        return self.executor
+
+    def warm_up(self):
+        """
+        Поднимает все воркеры пула до первого сигнала
+        """
+        executor = self.get_executor()
+        for _ in range(self.workers):
+            executor.submit(int)
+
+    async def render(self, market_data: MarketData, chart_title: str) -> bytes:
+        times = market_data.times[-CHART_BARS:] * 10 ** 6
+        values = market_data.get_columns(CHART_COLUMNS)[-CHART_BARS:]
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.get_executor(), render_chart, chart_title, times, values)
+
+    def shutdown(self, wait: bool = False):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,132 @@
+import time
+from contextlib import contextmanager
+
+from src.cryptach_screener.metrics import MetricsRegistry
+from src.cryptach_screener.screener.pipeline import PipelineMetrics
+from src.cryptach_screener.telegram.outbox import TelegramOutbox
+
+# этапы проверки: список символов, загрузка свечей символа, индикаторы, проверка пачки сигналов,
+# отрисовка графика, доставка сообщения в Telegram (от постановки в очередь до отправки)
+STAGES = ('symbols', 'fetch', 'compute', 'evaluate', 'render', 'post')
+ITERATION_BUCKETS = (1., 2.5, 5., 10., 20., 30., 60., 120., 300., 600.)
+
+
+class ScreenerMetrics(object):
+    """
+    Метрики скринера для Prometheus: время этапов, таймауты, ошибки и пропущенные символы.
+    На горячем пути только поиск в словаре и сложение, а сбор и форматирование - в момент запроса /metrics
+    """
+    def __init__(self, registry: MetricsRegistry = None):
+        self.registry = registry or MetricsRegistry(prefix='screener_')
+        registry = self.registry
+        self.stage_seconds = registry.histogram('stage_duration_seconds',
+                                                'Duration of a scan stage per symbol, market data or batch',
+                                                ('stage',))
+        self.iterations = registry.counter('iterations_total', 'Completed checking iterations')
+        self.iteration_seconds = registry.histogram('iteration_duration_seconds', 'Duration of checking iterations',
+                                                    buckets=ITERATION_BUCKETS)
+        self.symbols = registry.counter('symbols_total', 'Symbols listed for checking')
+        self.checked = registry.counter('checked_total', 'Market data checked for signals')
+        self.signals = registry.counter('signals_total', 'Signals found', ('timeframe', 'direction'))
+        self.timeouts = registry.counter('timeouts_total', 'Timeouts on fetching candles')
+        self.errors = registry.counter('errors_total', 'Errors by stage', ('stage',))
+        self.skipped = registry.counter('skipped_total', 'Skipped symbol timeframes by reason', ('reason',))
+        self.last_iteration = registry.gauge('last_iteration_timestamp_seconds',
+                                             'Unix time of the last completed iteration')
+        self.market_data_peak = registry.gauge('market_data_peak_bytes',
+                                               'Peak memory of market data held by the last iteration')
+        self.market_data_symbol = registry.gauge('market_data_symbol_bytes',
+                                                 'Largest market data of one symbol in the last iteration')
+        self.memory_waits = registry.counter('market_data_budget_waits_total',
+                                             'Waits for the market data memory budget')
+
+    def observe_stage(self, stage: str, seconds: float):
+        self.stage_seconds.observe(seconds, (stage,))
+
+    @contextmanager
+    def measure(self, stage: str):
+        """
+        Замеряет этап и считает его ошибки
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors.inc(labels=(stage,))
+            raise
+        finally:
+            self.stage_seconds.observe(time.perf_counter() - started_at, (stage,))
+
+    def add_outbox(self, outbox: TelegramOutbox):
+        """
+        Выводит счётчики очереди Telegram и замеряет доставку сообщений как этап post
+        """
+        registry = self.registry
+        registry.gauge('telegram_queue_depth', 'Messages waiting in Telegram queues', function=lambda: outbox.depth)
+        registry.counter('telegram_sent_total', 'Messages sent to Telegram', function=lambda: outbox.metrics.sent)
+        registry.counter('telegram_dropped_total', 'Messages dropped by Telegram outbox',
+                         function=lambda: outbox.metrics.dropped)
+        registry.counter('telegram_retries_total', 'Telegram send retries', function=lambda: outbox.metrics.retries)
+        registry.counter('telegram_flood_waits_total', 'Telegram flood control waits',
+                         function=lambda: outbox.metrics.flood_waits)
+        outbox.on_delivered = lambda latency: self.observe_stage('post', latency)
+
+    def snapshot(self) -> dict:
+        """
+        Текущие значения, от которых считается сводка итерации
+        """
+        stages = {}
+        for stage in STAGES:
+            series = self.stage_seconds.series.get((stage,))
+            stages[stage] = (series.count, series.sum) if series else (0, 0.)
+        return {
+            'stages': stages,
+            'timeouts': self.timeouts.get(),
+            'errors': sum(self.errors.values.values()),
+            'skipped': sum(self.skipped.values.values()),
+        }
+
+    def finish_iteration(self, started: dict, pipeline_metrics: PipelineMetrics, timeframes: list[str],
+                         duration: float) -> dict:
+        """
+        Учитывает итерацию и возвращает её сводку: что изменилось с момента снимка started
+        """
+        self.iterations.inc()
+        self.iteration_seconds.observe(duration)
+        self.symbols.inc(pipeline_metrics.symbols)
+        self.checked.inc(pipeline_metrics.checked)
+        if pipeline_metrics.skipped:
+            self.skipped.inc(pipeline_metrics.skipped, ('rate_limit',))
+        self.last_iteration.set(time.time())
+        self.market_data_peak.set(pipeline_metrics.peak_memory)
+        self.market_data_symbol.set(pipeline_metrics.max_symbol_memory)
+        self.memory_waits.inc(pipeline_metrics.memory_waits)
+
+        current = self.snapshot()
+        stages = {}
+        for stage, (count, seconds) in current['stages'].items():
+            count -= started['stages'][stage][0]
+            seconds -= started['stages'][stage][1]
+            if count:
+                stages[stage] = {'count': count, 'seconds': round(seconds, 3),
+                                 'avg_ms': round(seconds / count * 1000, 2)}
+        return {
+            'timeframes': timeframes,
+            'duration': round(duration, 3),
+            'symbols': pipeline_metrics.symbols,
+            'fetched': pipeline_metrics.fetched,
+            'checked': pipeline_metrics.checked,
+            'signals': pipeline_metrics.signals,
+            'first_signal_latency': pipeline_metrics.first_signal_latency,
+            'requeued': pipeline_metrics.requeued,
+            'timeouts': int(current['timeouts'] - started['timeouts']),
+            'errors': int(current['errors'] - started['errors']),
+            'skipped': int(current['skipped'] - started['skipped']),
+            'memory': {
+                'peak_bytes': pipeline_metrics.peak_memory,
+                'peak_items': pipeline_metrics.peak_memory_items,
+                'max_symbol_bytes': pipeline_metrics.max_symbol_memory,
+                'budget_waits': pipeline_metrics.memory_waits,
+            },
+            'stages': stages,
+        }
@@ -0,0 +1,157 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.cryptach_screener.indicators.executor import INDICATOR_COLUMNS
+
+# столбцы, которые нужны после расчёта индикаторов: проверке сигналов и графику
+MARKET_DATA_COLUMNS = ['Open', 'High', 'Low', 'Close', 'NWE_upper', 'NWE_lower', 's_long', 's_short']
+_OHLCV_POSITIONS = [0, 1, 2, 3]
+_INDICATOR_POSITIONS = [INDICATOR_COLUMNS.index(column) for column in MARKET_DATA_COLUMNS[4:]]
+_COLUMN_POSITIONS = {column: position for position, column in enumerate(MARKET_DATA_COLUMNS)}
+
+
+@dataclass
+class MarketData(object):
+    """
+    Компактные рыночные данные символа на одном таймфрейме после расчёта индикаторов:
+    хвост из bars свечей в float32 для графика и последний закрытый бар в float64,
+    по которому проверяются сигналы. Время открытия (мс) общее для символов с одинаковыми свечами
+    """
+    times: np.ndarray
+    values: np.ndarray
+    last: np.ndarray
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def last_time(self) -> int:
+        return int(self.times[-1])
+
+    @property
+    def nbytes(self) -> int:
+        # общий массив времени учитывается в SharedTimes, а не у каждого символа
+        return self.values.nbytes + self.last.nbytes
+
+    def get_columns(self, columns: list[str]) -> np.ndarray:
+        """
+        Столбцы хвоста в float64, последний бар - без потери точности
+        """
+        positions = [_COLUMN_POSITIONS[column] for column in columns]
+        result = self.values[:, positions].astype(np.float64)
+        result[-1] = self.last[positions]
+        return result
+
+    def get_last(self, columns: list[str]) -> np.ndarray:
+        return self.last[[_COLUMN_POSITIONS[column] for column in columns]]
+
+    def to_frame(self) -> pd.DataFrame:
+        index = pd.DatetimeIndex(pd.to_datetime(self.times, unit='ms'), name='Time')
+        return pd.DataFrame(self.get_columns(MARKET_DATA_COLUMNS), index=index, columns=MARKET_DATA_COLUMNS)
+
+
+class SharedTimes(object):
+    """
+    Общие массивы времени открытия: в одной итерации у всех символов таймфрейма хвосты свечей
+    заканчиваются на одной и той же свече, поэтому хранить их время отдельно у каждого символа незачем.
+    Держит max_size последних массивов, символ с пропусками свечей получает свой массив
+    """
+    def __init__(self, max_size: int = 16):
+        self.max_size = max_size
+        self.arrays: OrderedDict[tuple[int, int, int], np.ndarray] = OrderedDict()
+
+    def share(self, times: np.ndarray) -> np.ndarray:
+        if not len(times):
+            return times
+        key = (int(times[0]), int(times[-1]), len(times))
+        shared = self.arrays.get(key)
+        if shared is not None:
+            self.arrays.move_to_end(key)
+            return shared if np.array_equal(shared, times) else times
+
+        shared = np.array(times, dtype=np.int64)
+        # массив общий для многих символов, защищаем его от случайной записи
+        shared.setflags(write=False)
+        self.arrays[key] = shared
+        if len(self.arrays) > self.max_size:
+            self.arrays.popitem(last=False)
+        return shared
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays.values())
+
+
+def make_market_data(times: np.ndarray, ohlcv: np.ndarray, indicators: np.ndarray, bars: int,
+                     shared_times: SharedTimes = None) -> MarketData:
+    """
+    Собирает MarketData из времени открытия (мс), OHLCV и результата compute_indicators,
+    оставляя только последние bars свечей. Входные массивы не изменяются
+    """
+    times, ohlcv, indicators = times[-bars:], ohlcv[-bars:], indicators[-bars:]
+    values = np.empty((len(times), len(MARKET_DATA_COLUMNS)), dtype=np.float64)
+    values[:, :4] = ohlcv[:, _OHLCV_POSITIONS]
+    values[:, 4:] = indicators[:, _INDICATOR_POSITIONS]
+    if shared_times is not None:
+        times = shared_times.share(times)
+    return MarketData(times=times, values=values.astype(np.float32), last=values[-1].copy())
+
+
+def get_market_data_size(market_data) -> int:
+    """
+    Сколько байт занимают рыночные данные символа: MarketData или DataFrame
+    """
+    if isinstance(market_data, MarketData):
+        return market_data.nbytes
+    return int(market_data.memory_usage(index=True).sum())
+
+
+def get_last_values(market_data, columns: list[str]) -> np.ndarray:
+    """
+    Последний бар рыночных данных в float64: MarketData или DataFrame
+    """
+    if isinstance(market_data, MarketData):
+        return market_data.get_last(columns)
+    return market_data[columns].to_numpy(dtype=np.float64)[-1]
+
+
+class MemoryBudget(object):
+    """
+    Учёт памяти рыночных данных, которые держит конвейер от расчёта индикаторов до проверки
+    сигналов или отправки графика. Если лимит (в байтах, 0 - без лимита) превышен, расчёт ждёт,
+    пока проверка или отправка освободят память. Одни данные пропускаются всегда, даже больше лимита
+    """
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self.used = 0
+        self.items = 0
+        self.peak = 0
+        self.peak_items = 0
+        self.max_item = 0
+        self.waits = 0
+        self.released = asyncio.Event()
+
+    def fits(self, size: int) -> bool:
+        return not self.limit or not self.items or self.used + size <= self.limit
+
+    async def acquire(self, size: int):
+        if not self.fits(size):
+            self.waits += 1
+            while not self.fits(size):
+                self.released.clear()
+                await self.released.wait()
+        self.used += size
+        self.items += 1
+        self.max_item = max(self.max_item, size)
+        if self.used > self.peak:
+            self.peak = self.used
+            self.peak_items = self.items
+
+    def release(self, size: int):
+        self.used -= size
+        self.items -= 1
+        self.released.set()
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from src.cryptach_screener.screener.market_data import MarketData, get_last_values
+
+PANEL_COLUMNS = ['Open', 'Close', 'NWE_upper', 'NWE_lower', 's_long', 's_short']
+
+
+def make_signal_panel(market_data: dict[str, MarketData | pd.DataFrame]) -> pd.DataFrame:
+    """
+    Собирает последние бары всех символов в одну таблицу: строки - символы, столбцы - PANEL_COLUMNS
+    """
+    symbols = [symbol for symbol, data in market_data.items() if data is not None and len(data)]
+    if not symbols:
+        return pd.DataFrame(columns=PANEL_COLUMNS, dtype=np.float64)
+    last_rows = np.stack([get_last_values(market_data[symbol], PANEL_COLUMNS) for symbol in symbols])
+    return pd.DataFrame(last_rows, index=symbols, columns=PANEL_COLUMNS)
+
+
+def get_signal_masks(panel: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Векторная версия Screener.check_to_long / check_to_short для всех символов сразу.
+    Лонговый сигнал имеет приоритет над шортовым, как в Screener.handle_signals
+    """
+    open_price = panel['Open'].to_numpy()
+    close = panel['Close'].to_numpy()
+    nwe_upper = panel['NWE_upper'].to_numpy()
+    nwe_lower = panel['NWE_lower'].to_numpy()
+    s_long = panel['s_long'].to_numpy()
+    s_short = panel['s_short'].to_numpy()
+
+    with np.errstate(invalid='ignore'):
+        # supertrend подошел близко к NWE, а цена - на расстояние меньше тела свечи
+        long_difference = close - nwe_lower
+        long_mask = (s_long != 0) & (nwe_lower != 0) & (s_long < nwe_lower) \
+            & (0 < long_difference) & (long_difference < open_price - close)
+
+        short_difference = nwe_upper - close
+        short_mask = (s_short != 0) & (nwe_upper != 0) & (s_short > nwe_upper) \
+            & (0 < short_difference) & (short_difference < close - open_price)
+
+    return long_mask, short_mask & ~long_mask
+
+
+def evaluate_signal_panel(panel: pd.DataFrame) -> tuple[list[str], list[str]]:
+    """
+    Возвращает символы с лонговым и шортовым сигналами
+    """
+    long_mask, short_mask = get_signal_masks(panel)
+    return panel.index[long_mask].tolist(), panel.index[short_mask].tolist()
@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import pandas as pd
+
+from src.cryptach_screener.data_loader.rate_limiter import RateLimitExceeded
+from src.cryptach_screener.screener.market_data import MarketData, MemoryBudget, get_market_data_size
+from src.cryptach_screener.screener.panel import make_signal_panel, evaluate_signal_panel
+
+logger = logging.getLogger(__name__)
+
+# конец потока для воркеров следующей стадии
+STOP = None
+
+
+@dataclass
+class PipelineMetrics(object):
+    symbols: int = 0
+    # символы, прошедшие загрузку (успешно или нет)
+    processed: int = 0
+    fetched: int = 0
+    computed: int = 0
+    checked: int = 0
+    batches: int = 0
+    signals: int = 0
+    requeued: int = 0
+    skipped: int = 0
+    first_signal_latency: float | None = None
+    duration: float = 0.
+    # память рыночных данных между расчётом индикаторов и проверкой или отправкой, байты
+    peak_memory: int = 0
+    peak_memory_items: int = 0
+    max_symbol_memory: int = 0
+    memory_waits: int = 0
+
+
+class ScanPipeline(object):
+    """
+    Потоковая проверка символов: загрузка -> индикаторы -> проверка сигналов -> график и отправка.
+    Каждый символ идёт дальше, как только загружены его свечи. Стадии связаны ограниченными
+    очередями, поэтому быстрая стадия ждёт медленную, а в памяти держится не больше
+    queue_size датафреймов на стадию. Сигналы проверяются векторно пачками до batch_size.
+    Рассчитанные рыночные данные дополнительно ограничены memory_limit байт
+    """
+    fetch_workers: int
+    compute_workers: int
+    render_workers: int
+    queue_size: int
+    batch_size: int
+    batch_timeout: float
+    max_fetch_rounds: int
+    memory_limit: int
+
+    def __init__(self,
+                 fetch: Callable[[str], Awaitable[dict[str, pd.DataFrame]]],
+                 compute: Callable[[pd.DataFrame], Awaitable[MarketData]],
+                 handle_signal: Callable[[str, str, MarketData, bool], Awaitable],
+                 fetch_workers: int = 20, compute_workers: int = 4, render_workers: int = 2,
+                 queue_size: int = 64, batch_size: int = 32, batch_timeout: float = 0.05,
+                 max_fetch_rounds: int = 3, observe_stage: Callable[[str, float], None] = None,
+                 memory_limit: int = 0):
+        self.fetch = fetch
+        self.compute = compute
+        self.handle_signal = handle_signal
+        self.fetch_workers = fetch_workers
+        self.compute_workers = compute_workers
+        self.render_workers = render_workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.max_fetch_rounds = max_fetch_rounds
+        # замер этапа проверки сигналов, по пачке
+        self.observe_stage = observe_stage
+        self.memory_limit = memory_limit
+        self.metrics = PipelineMetrics()
+        self.memory = MemoryBudget(memory_limit)
+
+    async def run(self, symbols: list[str]) -> PipelineMetrics:
+        metrics = self.metrics = PipelineMetrics(symbols=len(symbols))
+        memory = self.memory = MemoryBudget(self.memory_limit)
+        started_at = time.monotonic()
+
+        symbol_queue = asyncio.Queue()
+        for symbol in symbols:
+            symbol_queue.put_nowait((symbol, 1))
+        compute_queue = asyncio.Queue(maxsize=self.queue_size)
+        check_queue = asyncio.Queue(maxsize=self.queue_size)
+        signal_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        fetchers = [asyncio.create_task(self.run_fetcher(symbol_queue, compute_queue, metrics))
+                    for _ in range(self.fetch_workers)]
+        computers = [asyncio.create_task(self.run_computer(compute_queue, check_queue, metrics))
+                     for _ in range(self.compute_workers)]
+        checker = asyncio.create_task(self.run_checker(check_queue, signal_queue, metrics, started_at))
+        renderers = [asyncio.create_task(self.run_renderer(signal_queue))
+                     for _ in range(self.render_workers)]
+
+        try:
+            # символы, упёршиеся в лимит, возвращаются в symbol_queue, поэтому ждём её опустошения
+            await self.watch(symbol_queue.join(), [*fetchers, *computers, checker, *renderers])
+            await self.stop_stage(fetchers, None, [])
+            await self.stop_stage(computers, compute_queue, [*computers, checker, *renderers])
+            await self.stop_stage([checker], check_queue, [checker, *renderers])
+            await self.stop_stage(renderers, signal_queue, renderers)
+        finally:
+            for task in [*fetchers, *computers, checker, *renderers]:
+                task.cancel()
+
+        metrics.duration = time.monotonic() - started_at
+        metrics.peak_memory = memory.peak
+        metrics.peak_memory_items = memory.peak_items
+        metrics.max_symbol_memory = memory.max_item
+        metrics.memory_waits = memory.waits
+        return metrics
+
+    @staticmethod
+    async def watch(awaitable: Awaitable, workers: list[asyncio.Task]):
+        """
+        Ждёт awaitable, следя за воркерами: воркер, упавший с исключением, больше не разбирает
+        свою очередь, и конвейер повис бы. Поэтому его исключение прерывает прогон
+        """
+        waiter = asyncio.ensure_future(awaitable)
+        pending = {waiter, *workers}
+        try:
+            while not waiter.done():
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is not waiter and not task.cancelled() and task.exception() is not None:
+                        logger.error(f'Pipeline worker failed: {task.exception()}')
+                        raise task.exception()
+            return waiter.result()
+        finally:
+            waiter.cancel()
+
+    async def stop_stage(self, workers: list[asyncio.Task], queue: asyncio.Queue | None,
+                         watched: list[asyncio.Task]):
+        """
+        Останавливает воркеры стадии: STOP в очередь или отмена, если очереди нет.
+        watched - воркеры этой и следующих стадий, без которых STOP не будет разобран
+        """
+        if queue is None:
+            for worker in workers:
+                worker.cancel()
+        else:
+            await self.watch(self.put_stops(queue, len(workers)), watched)
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    @staticmethod
+    async def put_stops(queue: asyncio.Queue, count: int):
+        for _ in range(count):
+            await queue.put(STOP)
+
+    async def run_fetcher(self, symbol_queue: asyncio.Queue, compute_queue: asyncio.Queue,
+                          metrics: PipelineMetrics):
+        while True:
+            symbol, fetch_round = await symbol_queue.get()
+            try:
+                candles = await self.fetch(symbol)
+            except RateLimitExceeded:
+                if fetch_round < self.max_fetch_rounds:
+                    metrics.requeued += 1
+                    symbol_queue.put_nowait((symbol, fetch_round + 1))
+                    symbol_queue.task_done()
+                    continue
+                metrics.skipped += 1
+                logger.error(f'Skip {symbol} after {self.max_fetch_rounds} rate limited rounds')
+                candles = {}
+            except Exception as e:
+                logger.error(f'Error on fetching {symbol}: {e}')
+                candles = {}
+
+            metrics.processed += 1
+
+            try:
+                if candles:
+                    metrics.fetched += 1
+                for timeframe, ohlcv in candles.items():
+                    await compute_queue.put((symbol, timeframe, ohlcv))
+            finally:
+                symbol_queue.task_done()
+
+    async def run_computer(self, compute_queue: asyncio.Queue, check_queue: asyncio.Queue,
+                           metrics: PipelineMetrics):
+        while (item := await compute_queue.get()) is not STOP:
+            symbol, timeframe, ohlcv = item
+            try:
+                market_data = await self.compute(ohlcv)
+                size = get_market_data_size(market_data)
+            except Exception as e:
+                logger.error(f'Error on calculating indicators of {symbol} {timeframe}: {e}')
+                continue
+            metrics.computed += 1
+            await self.memory.acquire(size)
+            try:
+                await check_queue.put((symbol, timeframe, market_data))
+            except BaseException:
+                self.memory.release(size)
+                raise
+
+    async def get_batch(self, check_queue: asyncio.Queue) -> tuple[list[tuple], bool]:
+        """
+        Ждёт первый элемент, затем добирает пачку до batch_size, но не дольше batch_timeout.
+        Второй результат - был ли получен STOP
+        """
+        item = await check_queue.get()
+        if item is STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            try:
+                item = check_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                # wait_for над Queue.get может потерять элемент при таймауте, поэтому опрос
+                await asyncio.sleep(min(timeout, 0.005))
+                continue
+            if item is STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def run_checker(self, check_queue: asyncio.Queue, signal_queue: asyncio.Queue,
+                          metrics: PipelineMetrics, started_at: float):
+        stopped = False
+        while not stopped:
+            batch, stopped = await self.get_batch(check_queue)
+            if not batch:
+                continue
+            metrics.batches += 1
+            metrics.checked += len(batch)
+
+            by_timeframe: dict[str, dict[str, MarketData]] = {}
+            for symbol, timeframe, market_data in batch:
+                by_timeframe.setdefault(timeframe, {})[symbol] = market_data
+
+            for timeframe, market_data in by_timeframe.items():
+                # данные, за память которых ещё отвечает проверка, а не отправка
+                held = dict(market_data)
+                try:
+                    await self.check_timeframe(timeframe, market_data, held, signal_queue, metrics, started_at)
+                except Exception as e:
+                    logger.error(f'Error on checking {len(market_data)} symbols on {timeframe}: {e}', exc_info=True)
+                    for data in held.values():
+                        self.memory.release(get_market_data_size(data))
+
+    async def check_timeframe(self, timeframe: str, market_data: dict[str, MarketData], held: dict[str, MarketData],
+                              signal_queue: asyncio.Queue, metrics: PipelineMetrics, started_at: float):
+        evaluate_started_at = time.perf_counter()
+        long_symbols, short_symbols = evaluate_signal_panel(make_signal_panel(market_data))
+        if self.observe_stage is not None:
+            self.observe_stage('evaluate', time.perf_counter() - evaluate_started_at)
+        signal_symbols = set(long_symbols + short_symbols)
+        # данные без сигнала больше не нужны, данные сигналов освобождает отправка
+        for symbol in list(held):
+            if symbol not in signal_symbols:
+                self.memory.release(get_market_data_size(held.pop(symbol)))
+        for symbol in long_symbols + short_symbols:
+            if metrics.first_signal_latency is None:
+                metrics.first_signal_latency = time.monotonic() - started_at
+            metrics.signals += 1
+            await signal_queue.put((symbol, timeframe, market_data[symbol], symbol in long_symbols))
+            held.pop(symbol, None)
+
+    async def run_renderer(self, signal_queue: asyncio.Queue):
+        while (item := await signal_queue.get()) is not STOP:
+            symbol, timeframe, market_data, long_signal = item
+            try:
+                await self.handle_signal(symbol, timeframe, market_data, long_signal)
+            except Exception as e:
+                logger.error(f'Error on handling {symbol} {timeframe}: {e}', exc_info=True)
+            finally:
+                self.memory.release(get_market_data_size(market_data))
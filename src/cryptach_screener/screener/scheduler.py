@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+from src.cryptach_screener.data_loader.candle_store import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+class CandleScheduler(object):
+    """
+    Запускает проверку каждого таймфрейма ровно один раз после закрытия его свечи
+    (плюс settle_delay секунд, чтобы биржа успела закрыть свечу). Таймфреймы с совпавшими
+    дедлайнами проверяются одним вызовом run_scan. Если проверка затянулась и дедлайны
+    успели пройти, пропущенные запуски схлопываются в один. Часы clock и ожидание sleep подменяются в тестах
+    """
+    settle_delay: float
+
+    def __init__(self, timeframes: list[str], run_scan: Callable[[list[str]], Awaitable],
+                 settle_delay: float = 5, clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        if not timeframes:
+            raise ValueError('Scheduler needs at least one timeframe')
+        self.timeframes = timeframes
+        self.run_scan = run_scan
+        self.settle_delay = settle_delay
+        self.clock = clock
+        self.sleep = sleep
+        self.deadlines: dict[str, float] = {}
+        self.skipped_scans = 0
+
+    def get_last_deadline(self, timeframe: str, now: float) -> float:
+        """
+        Последний дедлайн таймфрейма, не позже now
+        """
+        timeframe_seconds = timeframe_to_ms(timeframe) / 1000
+        return (now - self.settle_delay) // timeframe_seconds * timeframe_seconds + self.settle_delay
+
+    def get_next_deadline(self, timeframe: str, now: float) -> float:
+        return self.get_last_deadline(timeframe, now) + timeframe_to_ms(timeframe) / 1000
+
+    def reset(self):
+        now = self.clock()
+        self.deadlines = {timeframe: self.get_next_deadline(timeframe, now) for timeframe in self.timeframes}
+
+    def get_due_timeframes(self, now: float) -> list[str]:
+        return [timeframe for timeframe in self.timeframes if self.deadlines[timeframe] <= now]
+
+    def advance(self, timeframes: list[str], now: float):
+        """
+        Переносит дедлайны выполненных таймфреймов. Если следующий дедлайн уже прошёл,
+        запуск выполняется один раз сразу, а промежуточные считаются пропущенными
+        """
+        for timeframe in timeframes:
+            timeframe_seconds = timeframe_to_ms(timeframe) / 1000
+            next_deadline = self.deadlines[timeframe] + timeframe_seconds
+            last_deadline = self.get_last_deadline(timeframe, now)
+            if last_deadline > next_deadline:
+                skipped = round((last_deadline - next_deadline) / timeframe_seconds)
+                self.skipped_scans += skipped
+                logger.warning(f'Scan of {timeframe} overran, {skipped} scans skipped')
+                next_deadline = last_deadline
+            self.deadlines[timeframe] = next_deadline
+
+    async def run(self):
+        self.reset()
+        while True:
+            deadline = min(self.deadlines.values())
+            delay = deadline - self.clock()
+            if delay > 0:
+                await self.sleep(delay)
+
+            now = self.clock()
+            due_timeframes = self.get_due_timeframes(now)
+            logger.info(f'Scheduled scan of {", ".join(due_timeframes)}, lag {now - deadline:.2f}s')
+            try:
+                await self.run_scan(due_timeframes)
+            except Exception as e:
+                logger.error(f'Error on scheduled scan of {", ".join(due_timeframes)}: {e}', exc_info=True)
+            finally:
+                self.advance(due_timeframes, self.clock())
@@ -1,19 +1,29 @@
 import asyncio
 import logging
-import os
-from datetime import datetime
+import time
+from typing import Awaitable, Callable
 
+import orjson
 import pandas as pd
 
-from ccxt import RequestTimeout
-from pandas_ta import supertrend
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-
 from src.cryptach_screener.config.config import Config
+from src.cryptach_screener.data_loader.candle_store import timeframe_to_ms
+from src.cryptach_screener.data_loader.kline_stream import KlineStream
+from src.cryptach_screener.data_loader.klines import OHLCV_COLUMNS
 from src.cryptach_screener.data_loader.ohlcv_loader import OHLCVLoader
-from src.cryptach_screener.indicators.nadaraya_watson import nadaraya_watson_envelope
+from src.cryptach_screener.data_loader.rate_limiter import RateLimitExceeded
+from src.cryptach_screener.data_loader.resample import get_resample_ratio
+from src.cryptach_screener.indicators.executor import IndicatorExecutor
+from src.cryptach_screener.metrics import MetricsServer
+from src.cryptach_screener.screener.chart import ChartRenderer, CHART_BARS
+from src.cryptach_screener.screener.instrumentation import ScreenerMetrics
+from src.cryptach_screener.screener.market_data import MarketData, SharedTimes, make_market_data
+from src.cryptach_screener.screener.panel import make_signal_panel, get_signal_masks
+from src.cryptach_screener.screener.scheduler import CandleScheduler
+from src.cryptach_screener.screener.pipeline import ScanPipeline
 from src.cryptach_screener.signal.simple import SimpleSignal
+from src.cryptach_screener.startup import startup_timer
+from src.cryptach_screener.telegram.outbox import TelegramOutbox
 from src.cryptach_screener.telegram.poster import TelegramPoster
 
 pd.options.mode.chained_assignment = None
@@ -22,145 +32,282 @@ logger = logging.getLogger(__name__)
 logger.addHandler(logging.StreamHandler())
 
 
-def add_session_cols(df):
-    df.loc[:, 'Hour'] = df.index.hour
-    df.loc[:, 'SessionNY'] = df.apply(lambda x: 'NY' if 13 <= x.Hour < 22 else None, axis=1)
-    df.loc[:, 'SessionLondon'] = df.apply(lambda x: 'London' if 7 <= x.Hour < 16 else None, axis=1)
-    df.loc[:, 'SessionTokyo'] = df.apply(lambda x: 'Tokyo' if 0 <= x.Hour < 9 else None, axis=1)
-    df.loc[:, 'SessionSydney'] = df.apply(lambda x: 'Sydney' if 21 <= x.Hour or x.Hour < 6 else None, axis=1)
-
-    return df
-
-
 class Screener(object):
     def __init__(self, config: Config):
         self.config = config
-        self.ohlcv_loader = OHLCVLoader()
+        self.ohlcv_loader = OHLCVLoader(rate_limit=config.rate_limit,
+                                        max_concurrent_requests=config.max_concurrent_requests,
+                                        base_url=config.binance_url,
+                                        cache_dir=config.candle_cache_dir or None,
+                                        symbols_ttl=config.symbols_ttl)
         self.telegram_poster = TelegramPoster(config)
+        self.telegram_outbox = TelegramOutbox(self.telegram_poster, admins=config.admins)
+        self.chart_renderer = ChartRenderer(workers=config.chart_workers)
+        self.indicator_executor = IndicatorExecutor(mode=config.indicator_executor,
+                                                    workers=config.indicator_workers)
+        self.metrics = ScreenerMetrics()
+        self.metrics.add_outbox(self.telegram_outbox)
+        self.metrics_server: MetricsServer | None = None
         self.last_signals: list[SimpleSignal] = []
-        self.timeframes = ['30m', '1h']
+        self.timeframes = config.timeframes
+        # старшие таймфреймы собираются локально из свечей базового
+        self.base_timeframe = config.base_timeframe
         self.ohlcv_limit = 500
+        # после расчёта индикаторов держится только хвост для графика с общим на символы временем
+        self.market_data_bars = CHART_BARS
+        self.shared_times = SharedTimes()
+        self.max_fetch_rounds = 3
 
-    async def enter_loop(self):
-        while True:
-            try:
-                # if datetime.now().minute == 00:
-                #     await self.make_checking_iteration('30m')
-                #     await self.make_checking_iteration('1h')
-                #     logger.info('Checking iteration completed')
-                # elif datetime.now().minute == 30:
-                #     await self.make_checking_iteration('30m')
-                #     logger.info('Checking iteration completed')
-
-                # await asyncio.sleep(5)
-
+    async def warm_up(self):
+        """
+        Поднимает пулы графиков и индикаторов до первой проверки и пишет отчёт о времени запуска
+        """
+        with startup_timer.measure('start chart pool'):
+            self.chart_renderer.warm_up()
+        with startup_timer.measure('warm up indicators') as phase:
+            _, cache_hits, kernels = await self.indicator_executor.warm_up()
+            phase.note = f'numba kernels from disk cache: {cache_hits}/{kernels}'
+        logger.info(startup_timer.report())
+
+    async def start_metrics_server(self):
+        if not self.config.metrics_port or self.metrics_server is not None:
+            return
+        self.metrics_server = MetricsServer(self.metrics.registry, host=self.config.metrics_host,
+                                            port=self.config.metrics_port)
+        await self.metrics_server.start()
 
-                if datetime.now().minute in (00, 10, 20, 30, 40, 50):
-                    await self.make_checking_iteration('1h')
-                    logger.info('Checking iteration completed')
-                await asyncio.sleep(5)
+    async def enter_loop(self):
+        await self.warm_up()
+        await self.start_metrics_server()
+        self.telegram_outbox.start()
+        scheduler = CandleScheduler(self.timeframes, self.make_scheduled_iteration,
+                                    settle_delay=self.config.settle_delay)
+        await scheduler.run()
+
+    async def make_scheduled_iteration(self, timeframes: list[str]):
+        try:
+            await self.make_checking_iteration(timeframes)
+            logger.info('Checking iteration completed')
+        except Exception as e:
+            logger.error(e, exc_info=True)
+            self.telegram_outbox.report_error(f'Error on analyzer: {e}')
 
-            except Exception as e:
-                logger.error(e, exc_info=True)
-                for admin in self.config.admins:
-                    await self.telegram_poster.send_message(admin, f'Error on analyzer: {e}')
+    async def enter_stream_loop(self):
+        """
+        Потоковый режим: свечи приходят через WebSocket, сигналы проверяются сразу после закрытия свечи.
+        Стримятся те же источники свечей, что загружает REST-цикл: старшие таймфреймы собираются из базового
+        """
+        await self.warm_up()
+        await self.start_metrics_server()
+        self.telegram_outbox.start()
+        symbols = await self.ohlcv_loader.fetch_futures_usdt_symbols()
+        streams = self.make_kline_streams(symbols)
+        logger.info(f"Start kline streams of {len(symbols)} symbols on {', '.join(s.timeframe for s in streams)}"
+                    f" for timeframes {', '.join(self.timeframes)}")
+        await asyncio.gather(*[stream.run() for stream in streams])
+
+    def make_kline_streams(self, symbols: list[str]) -> list[KlineStream]:
+        return [KlineStream(loader=self.ohlcv_loader, symbols=symbols, timeframe=source, limit=limit,
+                            on_candle_close=self.handle_closed_candle)
+                for source, limit in self.get_candle_sources(self.timeframes).items()]
+
+    def get_closed_timeframes(self, source: str, open_time: int) -> list[str]:
+        """
+        Таймфреймы, свеча которых закрылась вместе со свечой источника source, открытой в open_time (мс)
+        """
+        close_time = open_time + timeframe_to_ms(source)
+        closed = []
+        for timeframe in self.timeframes:
+            if (self.get_base_timeframe(timeframe) or timeframe) != source:
+                continue
+            if timeframe == source or close_time % timeframe_to_ms(timeframe) == 0:
+                closed.append(timeframe)
+        return closed
+
+    async def handle_closed_candle(self, symbol: str, source: str, open_time: int):
+        for timeframe in self.get_closed_timeframes(source, open_time):
+            await self.check_closed_candle(symbol, timeframe)
+
+    async def check_closed_candle(self, symbol: str, timeframe: str):
+        try:
+            ohlcv = self.ohlcv_loader.get_ohlcv(symbol, timeframe, self.ohlcv_limit,
+                                                self.get_base_timeframe(timeframe), closed_only=True)
+            if ohlcv is None or len(ohlcv.index) < self.ohlcv_limit:
+                return
+            market_data = await self.calculate_market_data(ohlcv)
+            with self.metrics.measure('evaluate'):
+                long_signal, short_signal = await self.get_signals(market_data)
+            self.metrics.checked.inc()
+            await self.handle_signals(long_signal, market_data, short_signal, symbol, timeframe)
+        except Exception as e:
+            logger.error(f'Error on handling {symbol} {timeframe}: {e}', exc_info=True)
+            self.telegram_outbox.report_error(f'Error on handling {symbol} {timeframe}: {e}')
 
-    async def make_checking_iteration(self, timeframe: str):
-        logger.info(f'New iteration on timeframe {timeframe}')
+    async def make_checking_iteration(self, timeframes: str | list[str]) -> dict:
+        """
+        Проверка всех символов на одном или нескольких таймфреймах за один проход загрузки.
+        Символы проходят конвейер по одному, сигнал отправляется, не дожидаясь остальных символов.
+        Возвращает сводку итерации
+        """
+        if isinstance(timeframes, str):
+            timeframes = [timeframes]
+        logger.info(f'New iteration on timeframes {", ".join(timeframes)}')
+        started_at = time.monotonic()
+        started_metrics = self.metrics.snapshot()
 
         self.ohlcv_loader.start_session()
+        try:
+            with self.metrics.measure('symbols'):
+                symbols = (await self.ohlcv_loader.fetch_futures_usdt_symbols())
+            pipeline = self.make_pipeline(timeframes, handle_signal=lambda symbol, timeframe, market_data, long_signal:
+                                          self.handle_symbol_signals(long_signal, market_data, not long_signal,
+                                                                     symbol, timeframe))
+            metrics = await pipeline.run(symbols)
+        finally:
+            await self.ohlcv_loader.close_session()
+
+        first_signal = f', first after {metrics.first_signal_latency:.1f}s' if metrics.signals else ''
+        logger.info(f"Checked {metrics.checked} market data of {len(symbols)} symbols on {', '.join(timeframes)}"
+                    f" in {metrics.duration:.1f}s: {metrics.signals} signals{first_signal},"
+                    f" {metrics.requeued} requeued, {metrics.skipped} skipped,"
+                    f" market data peak {metrics.peak_memory / 1024:.0f} KiB"
+                    f" ({metrics.max_symbol_memory} bytes per symbol at most)")
+        summary = self.metrics.finish_iteration(started_metrics, metrics, timeframes,
+                                                duration=time.monotonic() - started_at)
+        logger.info(f"Iteration summary {orjson.dumps(summary).decode()}")
+        logger.info(f"Telegram outbox: {self.telegram_outbox.get_metrics()}")
+        return summary
+
+    def make_pipeline(self, timeframes: list[str],
+                      handle_signal: Callable[[str, str, MarketData, bool], Awaitable]) -> ScanPipeline:
+        return ScanPipeline(
+            fetch=lambda symbol: self.fetch_candles(symbol, timeframes),
+            compute=self.calculate_market_data,
+            handle_signal=handle_signal,
+            fetch_workers=self.config.max_concurrent_requests,
+            compute_workers=self.indicator_executor.workers,
+            render_workers=self.config.chart_workers,
+            max_fetch_rounds=self.max_fetch_rounds,
+            observe_stage=self.metrics.observe_stage,
+            memory_limit=int(self.config.market_data_memory_mb * 1024 * 1024),
+        )
 
-        symbols = (await self.ohlcv_loader.fetch_futures_usdt_symbols())
-        fetch_data_tasks = [self.fetch_market_data(symbol, timeframe) for symbol in symbols]
-        loaded_market_data = await asyncio.gather(*fetch_data_tasks)
-        logger.debug(f"Loaded market data")
-
-        await self.ohlcv_loader.close_session()
+    def get_base_timeframe(self, timeframe: str) -> str | None:
+        if not self.base_timeframe:
+            return None
+        try:
+            get_resample_ratio(self.base_timeframe, timeframe)
+        except ValueError:
+            return None
+        return self.base_timeframe
 
-        checked_symbol_counter = 0
-        for symbol, market_data in zip(symbols, loaded_market_data):
-            try:
-                if market_data is None:
+    def get_candle_sources(self, timeframes: list[str]) -> dict[str, int]:
+        """
+        Какие таймфреймы нужно загрузить с биржи и сколько свечей каждого, чтобы получить все timeframes
+        """
+        sources = {}
+        for timeframe in timeframes:
+            base_timeframe = self.get_base_timeframe(timeframe)
+            if base_timeframe is None or base_timeframe == timeframe:
+                source, limit = timeframe, self.ohlcv_limit + 1
+            else:
+                ratio = get_resample_ratio(base_timeframe, timeframe)
+                source, limit = base_timeframe, (self.ohlcv_limit + 2) * ratio
+            sources[source] = max(sources.get(source, 0), limit)
+        return sources
+
+    async def fetch_candles(self, symbol: str, timeframes: list[str]) -> dict[str, pd.DataFrame]:
+        """
+        Свечи символа по таймфреймам; таймфреймы, по которым данных нет или их мало, пропускаются
+        """
+        market_data = {}
+        started_at = time.perf_counter()
+        try:
+            # каждый источник свечей загружается один раз на все таймфреймы
+            loaded_sources = set()
+            for source, limit in self.get_candle_sources(timeframes).items():
+                if await self.ohlcv_loader.update_candles(symbol, source, limit):
+                    loaded_sources.add(source)
+
+            for timeframe in timeframes:
+                base_timeframe = self.get_base_timeframe(timeframe)
+                if (base_timeframe or timeframe) not in loaded_sources:
+                    logger.debug(f'Ignore {symbol} {timeframe}: failed to load data')
+                    self.metrics.skipped.inc(labels=('no_data',))
+                    continue
+                # проверка идёт после закрытия свечи, поэтому формирующаяся свеча не нужна
+                ohlcv = self.ohlcv_loader.get_ohlcv(symbol, timeframe, self.ohlcv_limit, base_timeframe,
+                                                    closed_only=True)
+                if ohlcv is None:
+                    logger.debug(f'Ignore {symbol} {timeframe}: failed to load data')
+                    self.metrics.skipped.inc(labels=('no_data',))
+                    continue
+                if len(ohlcv.index) < self.ohlcv_limit:
+                    logger.debug(f'Ignore {symbol} {timeframe}: too little data was received:'
+                                 f' {len(ohlcv.index)} < {self.ohlcv_limit}')
+                    self.metrics.skipped.inc(labels=('too_little_data',))
                     continue
 
-                long_signal, short_signal = await self.get_signals(market_data)
-
-                await self.handle_signals(long_signal, market_data, short_signal, symbol, timeframe)
-                checked_symbol_counter += 1
-            except Exception as e:
-                logger.error(f'Error on handling {symbol} {timeframe}: {e}', exc_info=True)
-                for admin in self.config.admins:
-                    await self.telegram_poster.send_message(admin, f'Error on handling {symbol} {timeframe}: {e}')
-        logger.info(f"Checked market data of {checked_symbol_counter} / {len(symbols)} symbols")
-
-    async def fetch_market_data(self, symbol, timeframe):
-        try:
-            ohlcv = await self.ohlcv_loader.fetch_ohlcv(symbol, timeframe, self.ohlcv_limit)
-            # анализирую данные
-
-            if ohlcv is None:
-                logger.debug(f'Ignore {symbol} {timeframe}: failed to load data')
-                return None
-            if len(ohlcv.index) < self.ohlcv_limit:
-                logger.debug(f'Ignore {symbol} {timeframe}: too little data was received:'
-                             f' {len(ohlcv.index)} < {self.ohlcv_limit}')
-                return None
-
-            supertrend_result = supertrend(high=ohlcv.High, low=ohlcv.Low, close=ohlcv.Close, length=7)
-            nwe_result = nadaraya_watson_envelope(ohlcv, length=self.ohlcv_limit, h=8, mult=3)
-            market_data = pd.merge(nwe_result, supertrend_result, left_index=True, right_index=True)
-            market_data.columns = ['Open', 'High', 'Low', 'Close', 'Volume', 'NWE_upper',
-                                   'NWE_lower', 's_trend', 's_direction', 's_long', 's_short']
+                market_data[timeframe] = ohlcv
             return market_data
 
         except asyncio.exceptions.TimeoutError:
-            logger.debug(f"Timeout on fetching {symbol} {timeframe}")
-            return None
+            logger.debug(f"Timeout on fetching {symbol}")
+            self.metrics.timeouts.inc()
+            return market_data
         except TimeoutError:
-            logger.debug(f"Timeout on fetching {symbol} {timeframe}")
-            return None
-        except RequestTimeout:
-            logger.debug(f"Timeout on fetching {symbol} {timeframe}")
-            return None
+            logger.debug(f"Timeout on fetching {symbol}")
+            self.metrics.timeouts.inc()
+            return market_data
+        except RateLimitExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Error on fetching {symbol} {timeframe}: {e}")
-            return None
+            logger.error(f"Error on fetching {symbol}: {e}")
+            self.metrics.errors.inc(labels=('fetch',))
+            return market_data
+        finally:
+            self.metrics.observe_stage('fetch', time.perf_counter() - started_at)
+
+    async def calculate_market_data(self, ohlcv: pd.DataFrame) -> MarketData:
+        values = ohlcv[OHLCV_COLUMNS].to_numpy(dtype='float64')
+        # индикаторы считаются в пуле, чтобы не блокировать event loop
+        with self.metrics.measure('compute'):
+            indicators = await self.indicator_executor.compute(
+                values, nwe_length=self.ohlcv_limit, h=8, mult=3, supertrend_length=7
+            )
+        # входной датафрейм не изменяется, дальше идут только хвост свечей и индикаторов
+        return make_market_data(ohlcv.index.asi8 // 10 ** 6, values, indicators, self.market_data_bars,
+                                self.shared_times)
 
-    async def get_signals(self, market_data):
-        long_signal = self.check_to_long(market_data)
-        short_signal = self.check_to_short(market_data)
-        return long_signal, short_signal
+    async def get_signals(self, market_data: MarketData):
+        # те же условия, что в check_to_long / check_to_short, по последнему бару без потери точности
+        long_mask, short_mask = get_signal_masks(make_signal_panel({'': market_data}))
+        return bool(long_mask[0]), bool(short_mask[0])
+
+    async def handle_symbol_signals(self, long_signal, market_data, short_signal, symbol, timeframe):
+        try:
+            await self.handle_signals(long_signal, market_data, short_signal, symbol, timeframe)
+        except Exception as e:
+            logger.error(f'Error on handling {symbol} {timeframe}: {e}', exc_info=True)
+            self.telegram_outbox.report_error(f'Error on handling {symbol} {timeframe}: {e}')
 
     async def handle_signals(self, long_signal, market_data, short_signal, symbol, timeframe):
         # отправляю сигналы в канал телеграм
-        if long_signal:
-            image_path = self.save_market_data_chart(
-                market_data,
-                f'{symbol} {timeframe}',
-                f'{symbol}_{timeframe}_{datetime.now().timestamp()}'
-            )
-            await self.telegram_poster.post_signal(
-                channel_id=self.config.channel_id,
-                direction='🟢 LONG',
-                symbol=symbol,
-                timeframe=timeframe,
-                image_path=image_path
-            )
-            logger.info(f'New long signal: {symbol} {timeframe}')
-        elif short_signal:
-            image_path = self.save_market_data_chart(
-                market_data,
-                f'{symbol} {timeframe}',
-                f'{symbol}_{timeframe}_{datetime.now().timestamp()}'
-            )
-            await self.telegram_poster.post_signal(
-                channel_id=self.config.channel_id,
-                direction='🔴 SHORT',
-                symbol=symbol,
-                timeframe=timeframe,
-                image_path=image_path
-            )
-            logger.info(f'New short signal: {symbol} {timeframe}')
+        if long_signal or short_signal:
+            self.metrics.signals.inc(labels=(timeframe, 'long' if long_signal else 'short'))
+            with self.metrics.measure('render'):
+                image = await self.chart_renderer.render(market_data, f'{symbol} {timeframe}')
+            self.post_signal(long_signal, symbol, timeframe, image)
+
+    def post_signal(self, long_signal: bool, symbol: str, timeframe: str, image: bytes = None):
+        self.telegram_outbox.post_signal(
+            channel_id=self.config.channel_id,
+            direction='🟢 LONG' if long_signal else '🔴 SHORT',
+            symbol=symbol,
+            timeframe=timeframe,
+            image=image
+        )
+        logger.info(f'New {"long" if long_signal else "short"} signal: {symbol} {timeframe}')
 
     @staticmethod
     def check_to_long(market_data: pd.DataFrame) -> bool:
@@ -205,58 +352,3 @@ class Screener(object):
                 if 0 < indicator_difference < candle_length:
                     return True
         return False
-
-    def save_market_data_chart(self, market_data: pd.DataFrame, chart_title: str, file_name: str):
-        df = market_data.tail(50)
-
-        df = add_session_cols(df)
-
-        fig = self.draw_chart(chart_title, df)
-
-        if not os.path.exists("images"):
-            os.mkdir("images")
-
-        image_path = f"images/{file_name}.jpg"
-
-        fig.write_image(image_path)
-        return image_path
-
-    @staticmethod
-    def draw_chart(chart_title, df):
-        fig = make_subplots(rows=2, cols=1,
-                            row_heights=[0.15, 0.85],
-                            shared_xaxes=True,
-                            vertical_spacing=0.02)
-        fig.add_traces(data=[
-            go.Scatter(name='Sydney', x=df.index, y=df['SessionSydney'], showlegend=False, line={'width': 7}),
-            go.Scatter(name='Tokyo', x=df.index, y=df['SessionTokyo'], showlegend=False, line={'width': 7}),
-            go.Scatter(name='London', x=df.index, y=df['SessionLondon'], showlegend=False, line={'width': 7}),
-            go.Scatter(name='NY', x=df.index, y=df['SessionNY'], showlegend=False, line={'width': 7}),
-        ])
-        fig.add_traces(data=[
-            go.Candlestick(name=chart_title, x=df.index,
-                           open=df['Open'], high=df['High'],
-                           low=df['Low'], close=df['Close']),
-            go.Scatter(name='NWE upper', x=df.index, y=df['NWE_upper'],
-                       line=dict(color='lime', width=1, dash='dash')),
-            go.Scatter(name='NWE lower', x=df.index, y=df['NWE_lower'], line=dict(color='red', width=1, dash='dash')),
-            go.Scatter(name='Supertrend Long', x=df.index, y=df['s_long'], line=dict(color='lime', width=2)),
-            go.Scatter(name='Supertrend Short', x=df.index, y=df['s_short'], line=dict(color='red', width=2)),
-        ], rows=2, cols=1)
-        for i in range(1, 3):
-            fig.update_xaxes(row=i, col=1, rangeslider_visible=False)
-        fig.update_layout(
-            width=1280,
-            height=720,
-            title=chart_title,
-            xaxis_rangeslider_visible=False,
-            template='plotly_dark',
-            margin=go.layout.Margin(
-                l=50,
-                r=50,
-                b=30,
-                t=70,
-                pad=4
-            ),
-        )
-        return fig
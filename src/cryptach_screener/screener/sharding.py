@@ -0,0 +1,428 @@
+import asyncio
+import dataclasses
+import hashlib
+import logging
+import multiprocessing
+import os
+import ipaddress
+import queue
+import secrets
+import socket
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from multiprocessing.managers import BaseManager
+from typing import Awaitable, Callable
+
+from src.cryptach_screener.config.config import Config
+from src.cryptach_screener.screener.market_data import MarketData
+from src.cryptach_screener.screener.scheduler import CandleScheduler
+from src.cryptach_screener.screener.screener import Screener
+
+logger = logging.getLogger(__name__)
+
+
+def get_shard_score(symbol: str, worker_id: str) -> int:
+    digest = hashlib.blake2b(f'{worker_id}:{symbol}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def assign_shards(symbols: list[str], worker_ids: list[str]) -> dict[str, list[str]]:
+    """
+    Rendezvous hashing: символ достаётся воркеру с наибольшим хешем пары (воркер, символ).
+    Назначение не зависит от порядка и запусков, при уходе воркера переезжают только его символы
+    """
+    shards = {worker_id: [] for worker_id in worker_ids}
+    if not worker_ids:
+        return shards
+    for symbol in symbols:
+        worker_id = max(worker_ids, key=lambda worker: get_shard_score(symbol, worker))
+        shards[worker_id].append(symbol)
+    return shards
+
+
+@dataclass
+class ScanTask(object):
+    task_id: int
+    scan_id: int
+    timeframes: list[str]
+    symbols: list[str]
+
+
+@dataclass
+class ShardSignal(object):
+    worker_id: str
+    task_id: int
+    scan_id: int
+    symbol: str
+    timeframe: str
+    long_signal: bool
+    candle_time: int
+    image: bytes | None = None
+
+
+@dataclass
+class ShardProgress(object):
+    worker_id: str
+    task_id: int
+    scan_id: int
+    processed: int
+    total: int
+    signals: int
+    done: bool = False
+
+
+@dataclass
+class Heartbeat(object):
+    worker_id: str
+    sent_at: float = field(default_factory=time.time)
+
+
+# очереди живут в процессе брокера, воркеры и координатор работают с ними через прокси
+_task_queues: dict[str, queue.Queue] = {}
+_result_queue = queue.Queue()
+
+
+def _get_task_queue(worker_id: str) -> queue.Queue:
+    return _task_queues.setdefault(worker_id, queue.Queue())
+
+
+def _get_result_queue() -> queue.Queue:
+    return _result_queue
+
+
+class ShardBroker(BaseManager):
+    """
+    Локальная замена брокера сообщений: очередь задач на каждого воркера и общая очередь результатов.
+    Слушает TCP, поэтому воркеры могут работать и на других хостах
+    """
+
+
+ShardBroker.register('get_task_queue', callable=_get_task_queue)
+ShardBroker.register('get_result_queue', callable=_get_result_queue)
+
+
+def parse_broker_address(address: str) -> tuple[str, int]:
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+def is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def get_shard_authkey(config: Config, allow_generated: bool = False) -> str:
+    """
+    Ключ брокера. Брокер распаковывает pickle из сети, поэтому без ключа работать нельзя:
+    координатор на loopback без ключа генерирует случайный для своих локальных воркеров,
+    в остальных случаях ключ обязателен
+    """
+    if config.shard_authkey:
+        return config.shard_authkey
+    host, _ = parse_broker_address(config.shard_broker_address)
+    if allow_generated and is_loopback(host):
+        return secrets.token_hex(32)
+    raise ValueError('SHARD_AUTHKEY must be set: the shard broker executes pickled data from its clients')
+
+
+class ShardWorker(object):
+    """
+    Воркер шардированной проверки: берёт задачи из своей очереди, прогоняет символы через конвейер
+    Screener, рисует графики сработавших символов и отправляет сигналы координатору
+    """
+    heartbeat_interval: float
+    progress_interval: float
+
+    def __init__(self, screener: Screener, broker, worker_id: str, heartbeat_interval: float = 5,
+                 progress_interval: float = 5):
+        self.screener = screener
+        self.worker_id = worker_id
+        self.task_queue = broker.get_task_queue(worker_id)
+        self.result_queue = broker.get_result_queue()
+        self.heartbeat_interval = heartbeat_interval
+        self.progress_interval = progress_interval
+
+    async def send(self, message):
+        await asyncio.to_thread(self.result_queue.put, message)
+
+    async def run_heartbeat(self):
+        while True:
+            await self.send(Heartbeat(self.worker_id))
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def run(self):
+        await self.screener.warm_up()
+        heartbeat = asyncio.create_task(self.run_heartbeat())
+        logger.info(f'Shard worker {self.worker_id} started')
+        try:
+            while (task := await asyncio.to_thread(self.task_queue.get)) is not None:
+                try:
+                    await self.run_task(task)
+                except Exception as e:
+                    logger.error(f'Error on shard task {task.task_id}: {e}', exc_info=True)
+                    await self.send(ShardProgress(self.worker_id, task.task_id, task.scan_id, 0,
+                                                  len(task.symbols), 0, done=True))
+        finally:
+            heartbeat.cancel()
+
+    async def run_task(self, task: ScanTask):
+        async def handle_signal(symbol: str, timeframe: str, market_data: MarketData, long_signal: bool):
+            image = await self.screener.chart_renderer.render(market_data, f'{symbol} {timeframe}')
+            await self.send(ShardSignal(self.worker_id, task.task_id, task.scan_id, symbol, timeframe, long_signal,
+                                        candle_time=market_data.last_time, image=image))
+
+        def get_progress(done: bool = False) -> ShardProgress:
+            metrics = pipeline.metrics
+            return ShardProgress(self.worker_id, task.task_id, task.scan_id, metrics.processed,
+                                 len(task.symbols), metrics.signals, done=done)
+
+        async def report_progress():
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                await self.send(get_progress())
+
+        pipeline = self.screener.make_pipeline(task.timeframes, handle_signal)
+        self.screener.ohlcv_loader.start_session()
+        reporter = asyncio.create_task(report_progress())
+        try:
+            await pipeline.run(task.symbols)
+        finally:
+            reporter.cancel()
+            await self.screener.ohlcv_loader.close_session()
+        await self.send(get_progress(done=True))
+
+
+class ShardCoordinator(object):
+    """
+    Координатор шардированной проверки: по расписанию делит символы между живыми воркерами,
+    следит за их heartbeat и прогрессом, передаёт символы умершего воркера остальным,
+    убирает дубли сигналов и отправляет их
+    """
+    heartbeat_timeout: float
+    progress_interval: float
+
+    def __init__(self, broker, timeframes: list[str],
+                 fetch_symbols: Callable[[], Awaitable[list[str]]],
+                 post_signal: Callable[[bool, str, str, bytes], None],
+                 settle_delay: float = 5, heartbeat_timeout: float = 30, progress_interval: float = 30,
+                 scan_timeout: float = 1800, max_posted: int = 10000):
+        self.broker = broker
+        self.timeframes = timeframes
+        self.fetch_symbols = fetch_symbols
+        self.post_signal = post_signal
+        self.settle_delay = settle_delay
+        self.heartbeat_timeout = heartbeat_timeout
+        self.progress_interval = progress_interval
+        self.scan_timeout = scan_timeout
+        self.max_posted = max_posted
+
+        self.result_queue = broker.get_result_queue()
+        self.heartbeats: dict[str, float] = {}
+        self.progress: dict[int, ShardProgress] = {}
+        # незавершённые задачи текущей проверки: task_id -> (воркер, задача)
+        self.pending: dict[int, tuple[str, ScanTask]] = {}
+        self.posted: OrderedDict[tuple[str, str, int], None] = OrderedDict()
+        self.scan_id = 0
+        self.task_id = 0
+        self.scan_done = asyncio.Event()
+        self.duplicates = 0
+        self.rebalances = 0
+
+    def get_alive_workers(self) -> list[str]:
+        now = time.monotonic()
+        return sorted(worker_id for worker_id, last_seen in self.heartbeats.items()
+                      if now - last_seen <= self.heartbeat_timeout)
+
+    def handle_result(self, message):
+        if isinstance(message, Heartbeat):
+            if message.worker_id not in self.heartbeats:
+                logger.info(f'Shard worker {message.worker_id} joined')
+            self.heartbeats[message.worker_id] = time.monotonic()
+        elif isinstance(message, ShardProgress):
+            self.heartbeats[message.worker_id] = time.monotonic()
+            if message.task_id not in self.pending:
+                return
+            self.progress[message.task_id] = message
+            if message.done:
+                self.pending.pop(message.task_id)
+                if not self.pending:
+                    self.scan_done.set()
+        elif isinstance(message, ShardSignal):
+            self.handle_signal(message)
+
+    def handle_signal(self, signal: ShardSignal):
+        if signal.scan_id != self.scan_id:
+            logger.warning(f'Ignore stale signal {signal.symbol} {signal.timeframe} of scan {signal.scan_id}')
+            return
+        key = (signal.symbol, signal.timeframe, signal.candle_time)
+        if key in self.posted:
+            # символ проверили два воркера после перебалансировки
+            self.duplicates += 1
+            return
+        self.posted[key] = None
+        if len(self.posted) > self.max_posted:
+            self.posted.popitem(last=False)
+        self.post_signal(signal.long_signal, signal.symbol, signal.timeframe, signal.image)
+
+    async def run_results(self):
+        while True:
+            try:
+                message = await asyncio.to_thread(self.result_queue.get, True, 1)
+            except queue.Empty:
+                continue
+            self.handle_result(message)
+
+    def drain_tasks(self, worker_ids) -> int:
+        """
+        Убирает из очередей воркеров задачи, которые они ещё не взяли, например оставшиеся от проверки
+        с истёкшим scan_timeout, чтобы воркеры не тратили на них время следующей проверки
+        """
+        drained = 0
+        for worker_id in worker_ids:
+            task_queue = self.broker.get_task_queue(worker_id)
+            while True:
+                try:
+                    task_queue.get_nowait()
+                except queue.Empty:
+                    break
+                drained += 1
+        return drained
+
+    def send_tasks(self, symbols: list[str], timeframes: list[str], worker_ids: list[str]):
+        for worker_id, shard in assign_shards(symbols, worker_ids).items():
+            if not shard:
+                continue
+            self.task_id += 1
+            task = ScanTask(self.task_id, self.scan_id, timeframes, shard)
+            self.pending[task.task_id] = (worker_id, task)
+            self.broker.get_task_queue(worker_id).put(task)
+
+    def rebalance(self) -> bool:
+        """
+        Передаёт задачи умерших воркеров живым, False - если живых воркеров не осталось
+        """
+        alive = self.get_alive_workers()
+        dead_tasks = [task_id for task_id, (worker_id, _) in self.pending.items() if worker_id not in alive]
+        if not dead_tasks:
+            return True
+        if not alive:
+            return False
+        for task_id in dead_tasks:
+            worker_id, task = self.pending.pop(task_id)
+            self.rebalances += 1
+            logger.warning(f'Shard worker {worker_id} is dead, move {len(task.symbols)} symbols to {len(alive)} workers')
+            self.send_tasks(task.symbols, task.timeframes, alive)
+        return True
+
+    def log_progress(self):
+        for task_id, (worker_id, task) in sorted(self.pending.items()):
+            progress = self.progress.get(task_id)
+            processed = progress.processed if progress else 0
+            logger.info(f'Scan {self.scan_id} shard {worker_id}: {processed} / {len(task.symbols)} symbols')
+
+    async def run_scan(self, timeframes: list[str]):
+        workers = self.get_alive_workers()
+        if not workers:
+            logger.error(f'No alive shard workers, skip scan of {", ".join(timeframes)}')
+            return
+        symbols = await self.fetch_symbols()
+
+        if drained := self.drain_tasks(self.heartbeats):
+            logger.warning(f'Drop {drained} stale shard tasks of scan {self.scan_id}')
+        self.scan_id += 1
+        self.pending.clear()
+        self.progress.clear()
+        self.scan_done.clear()
+        started_at = time.monotonic()
+        self.send_tasks(symbols, timeframes, workers)
+        logger.info(f'Scan {self.scan_id} of {len(symbols)} symbols on {", ".join(timeframes)}'
+                    f' split between {len(workers)} workers')
+
+        last_report = started_at
+        while self.pending:
+            try:
+                await asyncio.wait_for(self.scan_done.wait(), min(self.heartbeat_timeout, self.progress_interval))
+            except asyncio.TimeoutError:
+                pass
+            if not self.rebalance():
+                logger.error(f'All shard workers are dead, scan {self.scan_id} is incomplete')
+                break
+            if time.monotonic() - started_at > self.scan_timeout:
+                logger.error(f'Scan {self.scan_id} timed out with {len(self.pending)} unfinished shards')
+                break
+            if time.monotonic() - last_report >= self.progress_interval:
+                last_report = time.monotonic()
+                self.log_progress()
+        if self.pending:
+            # незавершённые задачи не должны выполняться после конца проверки
+            self.drain_tasks({worker_id for worker_id, _ in self.pending.values()})
+        logger.info(f'Scan {self.scan_id} finished in {time.monotonic() - started_at:.1f}s,'
+                    f' {self.duplicates} duplicate signals, {self.rebalances} rebalances')
+
+    async def run(self):
+        results = asyncio.create_task(self.run_results())
+        scheduler = CandleScheduler(self.timeframes, self.run_scan, settle_delay=self.settle_delay)
+        try:
+            await scheduler.run()
+        finally:
+            results.cancel()
+
+
+def get_worker_id() -> str:
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def run_shard_worker(config: Config, worker_id: str = None):
+    """
+    Точка входа процесса воркера, в том числе на другом хосте
+    """
+    broker = ShardBroker(address=parse_broker_address(config.shard_broker_address),
+                         authkey=get_shard_authkey(config).encode())
+    broker.connect()
+    worker = ShardWorker(Screener(config), broker, worker_id or config.shard_worker_id or get_worker_id())
+    asyncio.run(worker.run())
+
+
+def run_shard_coordinator(config: Config):
+    """
+    Запускает брокер, shard_workers локальных воркеров и координатор.
+    Воркеры с других хостов подключаются к тому же адресу брокера
+    """
+    authkey = get_shard_authkey(config, allow_generated=True)
+    broker = ShardBroker(address=parse_broker_address(config.shard_broker_address), authkey=authkey.encode())
+    broker.start()
+    logger.info(f'Shard broker is listening on {broker.address}')
+    worker_config = dataclasses.replace(config, shard_broker_address='%s:%d' % broker.address,
+                                        shard_authkey=authkey)
+    # не daemon: у воркера свои пулы процессов для индикаторов и графиков
+    processes = [multiprocessing.Process(target=run_shard_worker, args=(worker_config, f'local-{number}'))
+                 for number in range(config.shard_workers)]
+    for process in processes:
+        process.start()
+
+    async def run():
+        screener = Screener(config)
+        screener.telegram_outbox.start()
+
+        async def fetch_symbols() -> list[str]:
+            screener.ohlcv_loader.start_session()
+            try:
+                return await screener.ohlcv_loader.fetch_futures_usdt_symbols()
+            finally:
+                await screener.ohlcv_loader.close_session()
+
+        coordinator = ShardCoordinator(broker, config.timeframes, fetch_symbols, screener.post_signal,
+                                       settle_delay=config.settle_delay)
+        await coordinator.run()
+
+    try:
+        asyncio.run(run())
+    finally:
+        for process in processes:
+            process.terminate()
+        broker.shutdown()
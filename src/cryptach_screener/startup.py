@@ -0,0 +1,38 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+@dataclass
+class StartupPhase(object):
+    name: str
+    seconds: float = 0.
+    note: str = ''
+
+
+class StartupTimer(object):
+    """
+    Замеры времени запуска по этапам: импорты, загрузка конфига, прогрев JIT и пулов.
+    Модуль не импортирует ничего тяжёлого, чтобы его можно было подключить первым
+    """
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: list[StartupPhase] = []
+
+    @contextmanager
+    def measure(self, name: str):
+        phase = StartupPhase(name)
+        started_at = time.perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.seconds = time.perf_counter() - started_at
+            self.phases.append(phase)
+
+    def report(self) -> str:
+        phases = ', '.join(f'{phase.name} {phase.seconds:.2f}s' + (f' ({phase.note})' if phase.note else '')
+                           for phase in self.phases)
+        return f'Startup took {time.perf_counter() - self.started_at:.2f}s: {phases}'
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from aiogram.utils.exceptions import RetryAfter, TelegramAPIError
+
+from src.cryptach_screener.telegram.poster import TelegramPoster
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboundMessage(object):
+    chat_id: int | str
+    send: Callable[..., Awaitable[Any]]
+    kwargs: dict
+    description: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+@dataclass
+class OutboxMetrics(object):
+    enqueued: int = 0
+    sent: int = 0
+    dropped: int = 0
+    retries: int = 0
+    flood_waits: int = 0
+    digests: int = 0
+    latency_sum: float = 0.
+    latency_max: float = 0.
+
+
+class TelegramOutbox(object):
+    """
+    Фоновая очередь исходящих сообщений Telegram. Сканирование только ставит сообщения в очередь.
+    У каждого чата своя очередь и свой интервал между сообщениями, общий лимит - global_rate в секунду.
+    RetryAfter выдерживается и сообщение отправляется повторно, ошибки для админов собираются в дайджест
+    """
+    chat_interval: float
+    channel_interval: float
+    global_rate: float
+    max_queue_size: int
+    max_retries: int
+    digest_interval: float
+
+    def __init__(self, poster: TelegramPoster, admins: list[int], chat_interval: float = 1.,
+                 channel_interval: float = 3., global_rate: float = 25., max_queue_size: int = 1000,
+                 max_retries: int = 5, digest_interval: float = 60.):
+        self.poster = poster
+        self.admins = admins
+        # Telegram: не больше сообщения в секунду в личный чат и ~20 в минуту в канал/группу
+        self.chat_interval = chat_interval
+        self.channel_interval = channel_interval
+        self.global_rate = global_rate
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.digest_interval = digest_interval
+
+        self.queues: dict[int | str, asyncio.Queue] = {}
+        self.workers: dict[int | str, asyncio.Task] = {}
+        self.digest_task: asyncio.Task | None = None
+        self.next_global_send = 0.
+        self.error_digest: dict[str, int] = {}
+        self.metrics = OutboxMetrics()
+        # вызывается с задержкой доставки каждого отправленного сообщения
+        self.on_delivered: Callable[[float], None] | None = None
+
+    def start(self):
+        if self.digest_task is None:
+            self.digest_task = asyncio.create_task(self.run_digest())
+
+    async def stop(self, timeout: float = 10):
+        """
+        Отправляет накопленный дайджест и ждёт опустошения очередей
+        """
+        self.flush_digest()
+        try:
+            await asyncio.wait_for(asyncio.gather(*[queue.join() for queue in self.queues.values()]), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f'Telegram outbox stopped with {self.depth} undelivered messages')
+        for task in [*self.workers.values(), self.digest_task]:
+            if task is not None:
+                task.cancel()
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self.queues.values())
+
+    def get_metrics(self) -> dict:
+        sent = self.metrics.sent
+        return {
+            'depth': self.depth,
+            'enqueued': self.metrics.enqueued,
+            'sent': sent,
+            'dropped': self.metrics.dropped,
+            'retries': self.metrics.retries,
+            'flood_waits': self.metrics.flood_waits,
+            'digests': self.metrics.digests,
+            'latency_avg': self.metrics.latency_sum / sent if sent else 0.,
+            'latency_max': self.metrics.latency_max,
+        }
+
+    def get_interval(self, chat_id: int | str) -> float:
+        # id каналов и групп отрицательные, личных чатов - положительные
+        return self.channel_interval if str(chat_id).startswith(('-', '@')) else self.chat_interval
+
+    def enqueue(self, message: OutboundMessage) -> bool:
+        queue = self.queues.get(message.chat_id)
+        if queue is None:
+            queue = self.queues[message.chat_id] = asyncio.Queue(maxsize=self.max_queue_size)
+            self.workers[message.chat_id] = asyncio.create_task(self.run_chat(message.chat_id, queue))
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.metrics.dropped += 1
+            logger.error(f'Telegram outbox for {message.chat_id} is full, drop {message.description}')
+            return False
+        self.metrics.enqueued += 1
+        return True
+
+    def post_signal(self, channel_id: str, direction: str, symbol: str, timeframe: str, image: bytes = None) -> bool:
+        return self.enqueue(OutboundMessage(
+            chat_id=channel_id,
+            send=self.poster.post_signal,
+            kwargs=dict(channel_id=channel_id, direction=direction, symbol=symbol, timeframe=timeframe, image=image),
+            description=f'signal {symbol} {timeframe}',
+        ))
+
+    def send_message(self, chat_id: int | str, text: str) -> bool:
+        return self.enqueue(OutboundMessage(
+            chat_id=chat_id,
+            send=self.poster.send_message,
+            kwargs=dict(channel_id=chat_id, text=text),
+            description='message',
+        ))
+
+    def report_error(self, text: str):
+        """
+        Ошибка для админов: одинаковые ошибки схлопываются и уходят одним дайджестом раз в digest_interval
+        """
+        self.error_digest[text] = self.error_digest.get(text, 0) + 1
+
+    def flush_digest(self):
+        if not self.error_digest:
+            return
+        lines = [f'{text} (x{count})' if count > 1 else text for text, count in self.error_digest.items()]
+        self.error_digest = {}
+        text = f'Errors digest, {len(lines)} unique:\n' + '\n'.join(lines)
+        if len(text) > 4096:
+            text = text[:4093] + '...'
+        for admin in self.admins:
+            self.send_message(admin, text)
+        self.metrics.digests += 1
+
+    async def run_digest(self):
+        while True:
+            await asyncio.sleep(self.digest_interval)
+            self.flush_digest()
+
+    async def wait_for_global_budget(self):
+        while True:
+            now = time.monotonic()
+            if now >= self.next_global_send:
+                self.next_global_send = now + 1 / self.global_rate
+                return
+            await asyncio.sleep(self.next_global_send - now)
+
+    async def run_chat(self, chat_id: int | str, queue: asyncio.Queue):
+        interval = self.get_interval(chat_id)
+        while True:
+            message: OutboundMessage = await queue.get()
+            try:
+                await self.deliver(message)
+            except Exception as e:
+                self.metrics.dropped += 1
+                logger.error(f'Drop {message.description} to {chat_id}: {e}', exc_info=True)
+            finally:
+                queue.task_done()
+            await asyncio.sleep(interval)
+
+    async def deliver(self, message: OutboundMessage):
+        while True:
+            await self.wait_for_global_budget()
+            message.attempts += 1
+            try:
+                await message.send(**message.kwargs)
+            except RetryAfter as e:
+                # flood control: ждём, сколько сказал Telegram, попытка не считается
+                self.metrics.flood_waits += 1
+                message.attempts -= 1
+                logger.warning(f'Telegram flood control for {message.chat_id}, retry after {e.timeout}s')
+                await asyncio.sleep(e.timeout)
+                continue
+            except (TelegramAPIError, OSError, asyncio.TimeoutError) as e:
+                if message.attempts >= self.max_retries:
+                    self.metrics.dropped += 1
+                    logger.error(f'Drop {message.description} to {message.chat_id} after'
+                                 f' {message.attempts} attempts: {e}')
+                    return
+                self.metrics.retries += 1
+                await asyncio.sleep(2 ** message.attempts)
+                continue
+
+            latency = time.monotonic() - message.enqueued_at
+            self.metrics.sent += 1
+            self.metrics.latency_sum += latency
+            self.metrics.latency_max = max(self.metrics.latency_max, latency)
+            if self.on_delivered is not None:
+                self.on_delivered(latency)
+            return
@@ -1,8 +1,10 @@
+import io
 import logging
 import os
 from datetime import datetime
 
 from aiogram import Bot, types
+from aiogram.bot.api import TelegramAPIServer, TELEGRAM_PRODUCTION
 from aiogram.types import InputFile
 
 from src.cryptach_screener.config.config import Config
@@ -15,14 +17,23 @@ class TelegramPoster(object):
     def __init__(self, config: Config):
         self.config = config
 
-        self.bot = Bot(token=config.token, parse_mode=types.ParseMode.HTML)
+        # свой адрес Bot API, например локальная подмена для нагрузочного теста
+        server = TELEGRAM_PRODUCTION
+        if config.telegram_api_url:
+            server = TelegramAPIServer.from_base(config.telegram_api_url)
+        self.bot = Bot(token=config.token, parse_mode=types.ParseMode.HTML, server=server)
 
-    async def post_signal(self, channel_id: str, direction: str, symbol: str, timeframe: str, image_path: str = None):
+    async def post_signal(self, channel_id: str, direction: str, symbol: str, timeframe: str, image_path: str = None,
+                          image: bytes = None):
         text = f'{symbol}\n' \
                f'{direction}\n' \
                f'{timeframe} '
         logger.info(f'posting message:\n{text}')
-        if image_path is not None and os.path.isfile(image_path):
+        if image is not None:
+            # картинка загружается прямо из памяти, без временного файла
+            photo = InputFile(io.BytesIO(image), filename=f'{symbol}_{timeframe}.jpg')
+            result = await self.bot.send_photo(chat_id=channel_id, photo=photo, caption=text)
+        elif image_path is not None and os.path.isfile(image_path):
             image = InputFile(image_path)
             result = await self.bot.send_photo(chat_id=channel_id, photo=image, caption=text)
             os.remove(image_path)
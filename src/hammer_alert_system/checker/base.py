@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 
-from src.hammer_alert_system.structs import DOM
+from src.hammer_alert_system.structs import DOM, ArrayDOM
 
 
 class BaseChecker(ABC):
@@ -11,7 +11,7 @@ class BaseChecker(ABC):
 
 
     @abstractmethod
-    def check_dom(self, dom: DOM) -> list[str]:
+    def check_dom(self, dom: DOM | ArrayDOM) -> list[str]:
         """
         Возвращает список сигналов, если они имеются в стакане
         :param dom:
@@ -19,6 +19,23 @@ class BaseChecker(ABC):
         """
         ...
 
+    @abstractmethod
+    def get_big_levels(self, dom: DOM | ArrayDOM) -> list[DOM.Level]:
+        """
+        Уровни стакана, о которых нужно сообщить
+        :param dom:
+        :return:
+        """
+        ...
+
+    def get_level_key(self, level: DOM.Level) -> tuple:
+        """
+        Ключ уровня, по которому отличаются новые сигналы от уже отправленных
+        :param level:
+        :return:
+        """
+        return level.level_type, level.price
+
     @abstractmethod
     def generate_signal(self, level: DOM.Level, symbol: str):
         """
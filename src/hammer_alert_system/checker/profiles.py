@@ -0,0 +1,141 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from src.hammer_alert_system.checker.base import BaseChecker
+from src.hammer_alert_system.checker.rolling_sum import find_big_windows, get_cumsum, mean_windows
+from src.hammer_alert_system.structs import DOM, DOMLevelType, ArrayDOM, as_array_dom
+
+
+@dataclass
+class CheckProfile(object):
+    """
+    Профиль проверки: большой уровень - окно из agg_frame соседних уровней с объёмом не меньше threshold_quantity
+    """
+    name: str
+    threshold_quantity: float
+    agg_frame: int = 1
+    bid_emoji: str = '🟢🟢🟢'
+    ask_emoji: str = '🔴🔴🔴'
+
+    def __post_init__(self):
+        if self.agg_frame <= 0:
+            raise ValueError('Size of rolling window must be is larger than zero')
+
+
+@dataclass
+class ProfileLevel(DOM.Level):
+    """
+    Большой уровень и профиль, который на нём сработал. start_price - цена первого уровня окна:
+    она не меняется, пока окно стоит на месте, поэтому по ней узнаётся уже отправленный уровень
+    """
+    profile: CheckProfile = None
+    start_price: float = None
+
+
+@dataclass
+class WindowProfiles(object):
+    """
+    Профили с одинаковым окном, отсортированные по порогу
+    """
+    agg_frame: int
+    thresholds: np.ndarray
+    profiles: list[CheckProfile] = field(default_factory=list)
+
+
+class ProfileChecker(BaseChecker):
+    """
+    Проверяет стакан сразу по набору профилей за один проход по каждой стороне.
+    Профили задаются по символу или по классу символа (symbol_classes), для остальных символов
+    используются профили по ключу DEFAULT. Кумулятивная сумма стороны считается один раз, суммы окон -
+    один раз на каждый размер окна, а пороги профилей сравниваются только с окнами,
+    прошедшими минимальный порог, поэтому новые профили почти не добавляют работы
+    """
+    DEFAULT = 'default'
+
+    def __init__(self, profiles: dict[str, list[CheckProfile]], symbol_classes: dict[str, str] = None):
+        self.profiles = profiles
+        self.symbol_classes = symbol_classes or {}
+        self.windows: dict[str, list[WindowProfiles]] = {key: self.group_by_window(key_profiles)
+                                                         for key, key_profiles in profiles.items()}
+
+    @staticmethod
+    def group_by_window(profiles: list[CheckProfile]) -> list[WindowProfiles]:
+        windows: dict[int, list[CheckProfile]] = {}
+        for profile in sorted(profiles, key=lambda profile: profile.threshold_quantity):
+            windows.setdefault(profile.agg_frame, []).append(profile)
+        return [WindowProfiles(agg_frame, np.array([profile.threshold_quantity for profile in window_profiles]),
+                               window_profiles)
+                for agg_frame, window_profiles in sorted(windows.items())]
+
+    def get_profile_key(self, symbol: str) -> str:
+        if symbol in self.profiles:
+            return symbol
+        return self.symbol_classes.get(symbol, self.DEFAULT)
+
+    def get_profiles(self, symbol: str) -> list[CheckProfile]:
+        return self.profiles.get(self.get_profile_key(symbol), [])
+
+    def get_big_side_levels(self, prices: np.ndarray, quantities: np.ndarray, level_type: DOMLevelType,
+                            windows: list[WindowProfiles]) -> list[ProfileLevel]:
+        if not windows or len(quantities) == 0:
+            return []
+        quantity_cumsum = get_cumsum(quantities)
+
+        big_levels = []
+        for window in windows:
+            size = window.agg_frame
+            positions, sums = find_big_windows(quantities, size, window.thresholds[0], quantity_cumsum)
+            if not len(positions):
+                continue
+            mean_prices = mean_windows(prices, size, positions)
+            # сколько профилей окна сработало на каждом уровне: пороги отсортированы по возрастанию
+            fired = np.searchsorted(window.thresholds, sums, side='right')
+            for price, start_price, quantity, count in zip(mean_prices.tolist(), prices[positions].tolist(),
+                                                           sums.tolist(), fired.tolist()):
+                big_levels += [ProfileLevel(price, quantity, level_type, profile, start_price)
+                               for profile in window.profiles[:count]]
+        return big_levels
+
+    def get_big_levels(self, dom: DOM | ArrayDOM) -> list[ProfileLevel]:
+        """
+        Большие уровни по всем профилям символа, у каждого уровня указан сработавший профиль
+        :param dom:
+        :return:
+        """
+        book = as_array_dom(dom)
+        windows = self.windows.get(self.get_profile_key(book.symbol), [])
+        big_levels = []
+        for level_type in (DOMLevelType.ASK, DOMLevelType.BID):
+            big_levels += self.get_big_side_levels(*book.get_side(level_type), level_type, windows)
+        return big_levels
+
+    def get_level_key(self, level: ProfileLevel) -> tuple:
+        return level.level_type, level.start_price, level.profile.name
+
+    def check_dom(self, dom: DOM | ArrayDOM) -> list[str]:
+        """
+        Возвращает список сигналов, если они имеются в стакане
+        :param dom:
+        :return:
+        """
+        return [self.generate_signal(level, dom.symbol) for level in self.get_big_levels(dom)]
+
+    def generate_signal(self, level: ProfileLevel, symbol: str) -> str:
+        """
+        Получить сообщение о сигнале
+        :param symbol:
+        :param level:
+        :return:
+        """
+        profile = level.profile
+        if level.level_type == DOMLevelType.ASK:
+            return f'#{symbol} {profile.name}\n' \
+                   f'{profile.ask_emoji}\n' \
+                   f'Аск с объемом {level.quantity} по цене {level.price}'
+        elif level.level_type == DOMLevelType.BID:
+            return f'#{symbol} {profile.name}\n' \
+                   f'{profile.bid_emoji}\n' \
+                   f'Бид с объемом {level.quantity} по цене {level.price}'
+        else:
+            raise ValueError(f'Unknown level type: {level}')
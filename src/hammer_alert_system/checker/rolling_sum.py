@@ -1,9 +1,10 @@
-import itertools
-from statistics import fmean
+import math
 from typing import Any
 
+import numpy as np
+
 from src.hammer_alert_system.checker.base import BaseChecker
-from src.hammer_alert_system.structs import DOM, DOMLevelType
+from src.hammer_alert_system.structs import DOM, DOMLevelType, ArrayDOM, as_array_dom
 
 
 def rolling_window(seq: list[Any], size: int):
@@ -12,6 +13,54 @@ def rolling_window(seq: list[Any], size: int):
     return (seq[pos:pos + size] for pos in range(0, len(seq) - size + 1, 1))
 
 
+def get_cumsum(values: np.ndarray) -> np.ndarray:
+    return np.concatenate([[0.], np.cumsum(values, dtype=np.float64)])
+
+
+def sum_windows(values: np.ndarray, size: int, positions: np.ndarray) -> np.ndarray:
+    """
+    Суммы окон размера size, начинающихся в positions, слева направо - ровно как sum() по окну
+    """
+    sums = values[positions].astype(np.float64)
+    for offset in range(1, size):
+        sums += values[positions + offset]
+    return sums
+
+
+def mean_windows(values: np.ndarray, size: int, positions: np.ndarray) -> np.ndarray:
+    """
+    Средние окон с точно округлённой суммой, как statistics.fmean: цена в сигнале не содержит
+    шума сложения. Окон-кандидатов немного, поэтому каждое считается отдельно.
+    Окно из одного уровня - это сама цена уровня, без арифметики
+    """
+    if size == 1:
+        return values[positions].astype(np.float64)
+    return np.array([math.fsum(values[position:position + size]) for position in positions.tolist()],
+                    dtype=np.float64) / size
+
+
+def find_big_windows(quantities: np.ndarray, size: int, threshold: float,
+                     cumsum: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Начала окон размера size с суммой не меньше threshold и точные суммы этих окон.
+    Кумулятивная сумма отбирает кандидатов за O(n) с запасом на ошибку округления,
+    а суммы кандидатов пересчитываются по самим уровням, поэтому окно с суммой ровно
+    threshold не теряется, а объём в сигнале не содержит шума округления
+    """
+    if size <= 0:
+        raise ValueError('Size of rolling window must be is larger than zero')
+    if len(quantities) < size:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    if cumsum is None:
+        cumsum = get_cumsum(quantities)
+    # ошибка разности кумулятивных сумм не больше нескольких ulp от полной суммы стороны
+    tolerance = 4 * len(quantities) * np.finfo(np.float64).eps * np.abs(cumsum).max()
+    positions = np.flatnonzero(cumsum[size:] - cumsum[:-size] >= threshold - tolerance)
+    sums = sum_windows(quantities, size, positions)
+    mask = sums >= threshold
+    return positions[mask], sums[mask]
+
+
 class AggSumChecker(BaseChecker):
     threshold_quantity: float
     agg_frame: int
@@ -24,26 +73,30 @@ class AggSumChecker(BaseChecker):
         self.bid_emoji = bid_emoji
         self.ask_emoji = ask_emoji
 
-    def get_big_levels(self, dom: DOM) -> list:
+    def get_big_side_levels(self, prices: np.ndarray, quantities: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Средние цены и суммарные объёмы окон из agg_frame соседних уровней одной стороны стакана,
+        объём которых не меньше threshold_quantity
+        """
+        positions, quantity_sums = find_big_windows(quantities, self.agg_frame, self.threshold_quantity)
+        return mean_windows(prices, self.agg_frame, positions), quantity_sums
+
+    def get_big_levels(self, dom: DOM | ArrayDOM) -> list:
         """
         Проверяет большие уровни в стакане с помощью чанков - т.е.
         разбивая уровни стакана на группы и суммируя объем группы
         :param dom:
         :return:
         """
+        book = as_array_dom(dom)
         big_levels = []
-        ask_rolling_window = rolling_window(dom.asks, self.agg_frame)
-        bid_rolling_window = rolling_window(dom.bids, self.agg_frame)
-        for window in itertools.chain(ask_rolling_window, bid_rolling_window):
-            if (quantity_sum := sum([level.quantity for level in window])) >= self.threshold_quantity:
-                big_levels.append(DOM.Level(
-                    price=fmean([level.price for level in window]),
-                    quantity=quantity_sum,
-                    level_type=window[0].level_type
-                ))
+        for level_type in (DOMLevelType.ASK, DOMLevelType.BID):
+            prices, quantities = self.get_big_side_levels(*book.get_side(level_type))
+            big_levels += [DOM.Level(price=price, quantity=quantity, level_type=level_type)
+                           for price, quantity in zip(prices.tolist(), quantities.tolist())]
         return big_levels
 
-    def check_dom(self, dom: DOM) -> list[str]:
+    def check_dom(self, dom: DOM | ArrayDOM) -> list[str]:
         """
         Возвращает список сигналов, если они имеются в стакане
         :param dom:
@@ -1,33 +1,37 @@
+import numpy as np
+
 from src.hammer_alert_system.checker.base import BaseChecker
-from src.hammer_alert_system.structs import DOM, DOMLevelType
+from src.hammer_alert_system.structs import DOM, DOMLevelType, ArrayDOM, as_array_dom
 
 
 class StrictChecker(BaseChecker):
     threshold_quantity: float
 
-    def get_big_bids(self, dom: DOM) -> list:
-        big_bids = []
-        for level in dom.bids:
-            if level.quantity >= self.threshold_quantity:
-                big_bids.append(level)
-        return big_bids
-
-    def get_big_asks(self, dom: DOM) -> list:
-        big_asks = []
-        for level in dom.asks:
-            if level.quantity >= self.threshold_quantity:
-                big_asks.append(level)
-        return big_asks
-
-    def check_dom(self, dom: DOM) -> list[DOM.Level]:
+    def get_big_side_levels(self, book: ArrayDOM, level_type: DOMLevelType) -> list:
+        prices, quantities = book.get_side(level_type)
+        positions = np.flatnonzero(quantities >= self.threshold_quantity)
+        return [DOM.Level(price, quantity, level_type)
+                for price, quantity in zip(prices[positions].tolist(), quantities[positions].tolist())]
+
+    def get_big_bids(self, dom: DOM | ArrayDOM) -> list:
+        return self.get_big_side_levels(as_array_dom(dom), DOMLevelType.BID)
+
+    def get_big_asks(self, dom: DOM | ArrayDOM) -> list:
+        return self.get_big_side_levels(as_array_dom(dom), DOMLevelType.ASK)
+
+    def get_big_levels(self, dom: DOM | ArrayDOM) -> list[DOM.Level]:
+        return self.check_dom(dom)
+
+    def check_dom(self, dom: DOM | ArrayDOM) -> list[DOM.Level]:
         """
         Возвращает список уровней с большими заявками, если они имеются в стакане
         :param dom:
         :return:
         """
+        book = as_array_dom(dom)
         levels = []
-        levels += self.get_big_asks(dom)
-        levels += self.get_big_bids(dom)
+        levels += self.get_big_asks(book)
+        levels += self.get_big_bids(book)
 
         return levels
 
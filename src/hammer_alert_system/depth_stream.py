@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+import aiohttp
+import orjson
+
+from src.cryptach_screener.data_loader.rate_limiter import WeightRateLimiter
+from src.cryptach_screener.signal.dom import DomSignal
+from src.hammer_alert_system.checker.base import BaseChecker
+from src.hammer_alert_system.order_book import LocalOrderBook, depth_request_weight
+
+logger = logging.getLogger(__name__)
+
+
+class DepthStream(object):
+    """
+    Поддерживает локальные стаканы символов по комбинированным WebSocket-стримам <symbol>@depth@<speed>.
+    Пока загружается снимок, события символа откладываются; при пропуске в последовательности
+    стакан загружается заново. Чекеры запускаются на каждое обновление (check_interval=0)
+    или не чаще раза в check_interval секунд: обновление внутри интервала проверяется в его конце.
+    О каждом новом большом уровне сообщает on_signal
+    """
+    check_interval: float
+    depth_limit: int
+    streams_per_connection: int
+    reconnect_delay: float
+    max_reconnect_delay: float
+    max_pending_events: int
+
+    def __init__(self, symbols: list[str], checkers: list[BaseChecker],
+                 on_signal: Callable[[str, DomSignal], Awaitable],
+                 rate_limiter: WeightRateLimiter = None, base_url: str = 'https://fapi.binance.com',
+                 url: str = 'wss://fstream.binance.com', update_speed: str = '100ms', depth_limit: int = 1000,
+                 check_interval: float = 1., streams_per_connection: int = 200, reconnect_delay: float = 1,
+                 max_reconnect_delay: float = 60, max_pending_events: int = 1000):
+        self.symbols = symbols
+        self.checkers = checkers
+        self.on_signal = on_signal
+        self.rate_limiter = rate_limiter or WeightRateLimiter(weight_limit=2400, max_concurrency=10)
+        self.base_url = base_url
+        self.url = url
+        self.update_speed = update_speed
+        self.depth_limit = depth_limit
+        self.check_interval = check_interval
+        self.streams_per_connection = streams_per_connection
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_pending_events = max_pending_events
+
+        self.books: dict[str, LocalOrderBook] = {symbol: LocalOrderBook(symbol) for symbol in symbols}
+        # символы, по которым загружается снимок, и отложенные на это время события
+        self.syncing: dict[str, deque] = {}
+        self.next_check_at: dict[str, float] = {}
+        # отложенные до next_check_at проверки символов
+        self.deferred_checks: dict[str, asyncio.TimerHandle] = {}
+        self.signaled_levels: dict[str, set] = {}
+        self.session: aiohttp.ClientSession | None = None
+        self.tasks: set[asyncio.Task] = set()
+
+        self.updates_received = 0
+        self.updates_applied = 0
+        self.resyncs = 0
+        self.checks = 0
+        self.signals = 0
+        self.last_latency: float | None = None
+
+    def get_batches(self) -> list[list[str]]:
+        return [self.symbols[pos:pos + self.streams_per_connection]
+                for pos in range(0, len(self.symbols), self.streams_per_connection)]
+
+    def get_stream_url(self, batch: list[str]) -> str:
+        streams = '/'.join(f'{symbol.lower()}@depth@{self.update_speed}' for symbol in batch)
+        return f'{self.url}/stream?streams={streams}'
+
+    async def run(self):
+        async with aiohttp.ClientSession() as session:
+            self.session = session
+            try:
+                await asyncio.gather(*[self.run_connection(batch) for batch in self.get_batches()])
+            finally:
+                for handle in self.deferred_checks.values():
+                    handle.cancel()
+                self.deferred_checks.clear()
+
+    async def run_connection(self, batch: list[str]):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with self.session.ws_connect(self.get_stream_url(batch), heartbeat=30) as ws:
+                    logger.info(f'Depth stream connected: {len(batch)} streams')
+                    delay = self.reconnect_delay
+                    for symbol in batch:
+                        self.start_sync(symbol)
+                    async for message in ws:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            self.handle_message(orjson.loads(message.data))
+                        elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f'Depth stream error: {e}')
+
+            logger.warning(f'Depth stream disconnected, reconnect in {delay}s')
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def start_sync(self, symbol: str):
+        if symbol in self.syncing:
+            return
+        self.books[symbol].reset()
+        # старые события всё равно отбрасываются после снимка, поэтому очередь ограничена
+        self.syncing[symbol] = deque(maxlen=self.max_pending_events)
+        self.spawn(self.sync(symbol))
+
+    async def fetch_snapshot(self, symbol: str) -> dict:
+        url = f'{self.base_url}/fapi/v1/depth?symbol={symbol}&limit={self.depth_limit}'
+        async with self.rate_limiter.request(depth_request_weight(self.depth_limit)):
+            async with self.session.get(url) as resp:
+                self.rate_limiter.update_used_weight(resp.headers)
+                resp.raise_for_status()
+                return orjson.loads(await resp.read())
+
+    async def sync(self, symbol: str):
+        """
+        Загружает снимок стакана и применяет события, отложенные за время загрузки
+        """
+        book = self.books[symbol]
+        try:
+            book.apply_snapshot(await self.fetch_snapshot(symbol))
+        except Exception as e:
+            logger.error(f'Error on loading order book {symbol}: {e}')
+        finally:
+            pending_events = self.syncing.pop(symbol, ())
+
+        if not book.synced:
+            await asyncio.sleep(self.reconnect_delay)
+            self.start_sync(symbol)
+            return
+        for event in pending_events:
+            if not self.apply_update(symbol, event):
+                return
+        self.check_book(symbol)
+
+    def handle_message(self, message: dict):
+        event = message.get('data', message)
+        if event.get('e') != 'depthUpdate':
+            return
+        self.updates_received += 1
+        self.last_latency = time.time() - event['E'] / 1000
+
+        symbol = event['s']
+        if symbol in self.syncing:
+            self.syncing[symbol].append(event)
+            return
+        if symbol in self.books and self.apply_update(symbol, event):
+            self.request_check(symbol)
+
+    def request_check(self, symbol: str):
+        """
+        Проверяет стакан сразу, а если прошлая проверка была меньше check_interval назад -
+        один раз в next_check_at, чтобы уровень, выставленный перед затишьем, не остался без проверки
+        """
+        if symbol in self.deferred_checks:
+            return
+        now = time.monotonic()
+        next_check_at = self.next_check_at.get(symbol, 0.)
+        if now >= next_check_at:
+            self.next_check_at[symbol] = now + self.check_interval
+            self.check_book(symbol)
+        else:
+            self.deferred_checks[symbol] = asyncio.get_running_loop().call_later(
+                next_check_at - now, self.run_deferred_check, symbol)
+
+    def run_deferred_check(self, symbol: str):
+        del self.deferred_checks[symbol]
+        # стакан, который загружается заново, проверит sync
+        if symbol not in self.syncing:
+            self.next_check_at[symbol] = time.monotonic() + self.check_interval
+            self.check_book(symbol)
+
+    def apply_update(self, symbol: str, event: dict) -> bool:
+        if self.books[symbol].apply_update(event):
+            self.updates_applied += 1
+            return True
+        self.resyncs += 1
+        logger.warning(f'Order book {symbol} is out of sync, reload it')
+        self.start_sync(symbol)
+        self.syncing[symbol].append(event)
+        return False
+
+    def check_book(self, symbol: str):
+        """
+        Прогоняет стакан через чекеры и сообщает только об уровнях, которых не было при прошлой проверке.
+        Ошибка чекера остаётся в пределах символа и не рвёт соединение со стаканами остальных
+        """
+        self.checks += 1
+        try:
+            book = self.books[symbol].to_array_dom()
+            levels = {}
+            for number, checker in enumerate(self.checkers):
+                for level in checker.get_big_levels(book):
+                    levels[(number, *checker.get_level_key(level))] = (checker, level)
+        except Exception as e:
+            logger.error(f'Error on checking order book {symbol}: {e}', exc_info=True)
+            return
+
+        previous_levels = self.signaled_levels.get(symbol, set())
+        self.signaled_levels[symbol] = set(levels)
+        for key in levels.keys() - previous_levels:
+            checker, level = levels[key]
+            try:
+                text = checker.generate_signal(level, symbol)
+            except Exception as e:
+                logger.error(f'Error on generating signal of {symbol} {level}: {e}', exc_info=True)
+                continue
+            self.signals += 1
+            self.spawn(self.on_signal(symbol, DomSignal(price=level.price, quantity=level.quantity, text=text)))
+
+    def spawn(self, coroutine: Awaitable):
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
@@ -0,0 +1,93 @@
+import numpy as np
+
+from src.hammer_alert_system.structs import ArrayDOM
+
+
+def depth_request_weight(limit: int) -> int:
+    """
+    Вес запроса /fapi/v1/depth в зависимости от limit по документации Binance
+    """
+    if limit <= 50:
+        return 2
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 10
+    return 20
+
+
+class LocalOrderBook(object):
+    """
+    Локальная копия стакана одного символа: снимок /fapi/v1/depth плюс события <symbol>@depth.
+    Следит за непрерывностью последовательности событий (U / u / pu), как описано у Binance
+    """
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids: dict[float, float] = {}
+        self.asks: dict[float, float] = {}
+        # lastUpdateId снимка, затем u последнего применённого события
+        self.last_update_id: int | None = None
+        self.has_updates = False
+
+    @property
+    def synced(self) -> bool:
+        return self.last_update_id is not None
+
+    def reset(self):
+        self.bids.clear()
+        self.asks.clear()
+        self.last_update_id = None
+        self.has_updates = False
+
+    @staticmethod
+    def apply_levels(side: dict[float, float], levels: list[list[str]]):
+        for price, quantity in levels:
+            price, quantity = float(price), float(quantity)
+            if quantity == 0:
+                side.pop(price, None)
+            else:
+                side[price] = quantity
+
+    def apply_snapshot(self, snapshot: dict):
+        self.reset()
+        self.apply_levels(self.bids, snapshot['bids'])
+        self.apply_levels(self.asks, snapshot['asks'])
+        self.last_update_id = snapshot['lastUpdateId']
+
+    def apply_update(self, event: dict) -> bool:
+        """
+        Применяет событие depthUpdate. False - в последовательности пропуск, стакан нужно загрузить заново
+        """
+        if not self.synced:
+            return False
+        if event['u'] < self.last_update_id:
+            # событие старше снимка
+            return True
+        if self.has_updates:
+            if event['pu'] != self.last_update_id:
+                return False
+        elif event['U'] > self.last_update_id:
+            # первое событие после снимка должно его перекрывать
+            return False
+
+        self.apply_levels(self.bids, event['b'])
+        self.apply_levels(self.asks, event['a'])
+        self.last_update_id = event['u']
+        self.has_updates = True
+        return True
+
+    @staticmethod
+    def get_sorted_side(side: dict[float, float], descending: bool, depth: int = None) -> tuple[np.ndarray, np.ndarray]:
+        prices = np.fromiter(side.keys(), np.float64, len(side))
+        quantities = np.fromiter(side.values(), np.float64, len(side))
+        order = np.argsort(-prices if descending else prices, kind='stable')[:depth]
+        return prices[order], quantities[order]
+
+    def to_array_dom(self, depth: int = None) -> ArrayDOM:
+        """
+        Стакан для чекеров: аски по возрастанию цены, биды по убыванию, не больше depth уровней на сторону
+        """
+        ask_prices, ask_quantities = self.get_sorted_side(self.asks, descending=False, depth=depth)
+        bid_prices, bid_quantities = self.get_sorted_side(self.bids, descending=True, depth=depth)
+        return ArrayDOM(ask_prices=ask_prices, ask_quantities=ask_quantities,
+                        bid_prices=bid_prices, bid_quantities=bid_quantities, symbol=self.symbol)
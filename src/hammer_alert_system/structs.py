@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
+
 
 class DOMLevelType(Enum):
     BID = 0
@@ -21,6 +23,46 @@ class DOM(object):
     symbol: str
 
 
+@dataclass
+class ArrayDOM(object):
+    """
+    Стакан в массивах: цены и объёмы каждой стороны, уровни идут от спреда вглубь, как в DOM
+    """
+    ask_prices: np.ndarray
+    ask_quantities: np.ndarray
+    bid_prices: np.ndarray
+    bid_quantities: np.ndarray
+    symbol: str
+
+    @classmethod
+    def from_dom(cls, dom: DOM) -> 'ArrayDOM':
+        return cls(
+            ask_prices=np.fromiter((level.price for level in dom.asks), np.float64, len(dom.asks)),
+            ask_quantities=np.fromiter((level.quantity for level in dom.asks), np.float64, len(dom.asks)),
+            bid_prices=np.fromiter((level.price for level in dom.bids), np.float64, len(dom.bids)),
+            bid_quantities=np.fromiter((level.quantity for level in dom.bids), np.float64, len(dom.bids)),
+            symbol=dom.symbol,
+        )
+
+    def to_dom(self) -> DOM:
+        return DOM(
+            asks=[DOM.Level(price, quantity, DOMLevelType.ASK)
+                  for price, quantity in zip(self.ask_prices.tolist(), self.ask_quantities.tolist())],
+            bids=[DOM.Level(price, quantity, DOMLevelType.BID)
+                  for price, quantity in zip(self.bid_prices.tolist(), self.bid_quantities.tolist())],
+            symbol=self.symbol,
+        )
+
+    def get_side(self, level_type: DOMLevelType) -> tuple[np.ndarray, np.ndarray]:
+        if level_type == DOMLevelType.ASK:
+            return self.ask_prices, self.ask_quantities
+        return self.bid_prices, self.bid_quantities
+
+
+def as_array_dom(dom: DOM | ArrayDOM) -> ArrayDOM:
+    return dom if isinstance(dom, ArrayDOM) else ArrayDOM.from_dom(dom)
+
+
 @dataclass
 class OHLCV(object):
     time: int
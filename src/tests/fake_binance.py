@@ -0,0 +1,135 @@
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+from src.cryptach_screener.data_loader.candle_store import timeframe_to_ms
+from src.cryptach_screener.loadtest.exchange_data import get_klines_range, make_market
+
+
+class FakeBinance(object):
+    """
+    Локальная подмена Binance для тестов: REST /fapi/v1/klines, /fapi/v1/depth и комбинированные
+    WebSocket-стримы /stream. Сообщения в стримы отправляются вручную через push_kline и push_depth
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self.runner: web.AppRunner = None
+        self.connections: list[tuple[web.WebSocketResponse, set[str]]] = []
+        self.klines_requests = 0
+        self.klines_limits: list[int] = []
+        self.exchange_info_requests = 0
+        self.depth_requests = 0
+        self.depth_snapshots: dict[str, dict] = {}
+        self.markets: list[dict] = [
+            make_market('BTCUSDT'),
+            make_market('ETHUSDT'),
+            make_market('BTCUSDT_240628', contract_type='CURRENT_QUARTER'),
+            make_market('LUNAUSDT', status='SETTLING'),
+            make_market('BTCBUSD', quote_asset='BUSD'),
+        ]
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def ws_url(self) -> str:
+        return f'ws://{self.host}:{self.port}'
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/fapi/v1/klines', self.handle_klines)
+        app.router.add_get('/fapi/v1/exchangeInfo', self.handle_exchange_info)
+        app.router.add_get('/fapi/v1/depth', self.handle_depth)
+        app.router.add_get('/stream', self.handle_stream)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        self.port = self.runner.addresses[0][1]
+
+    async def stop(self):
+        await self.drop_connections()
+        await self.runner.cleanup()
+
+    @staticmethod
+    def make_kline(open_time: int, close: float) -> list:
+        return [open_time, str(close), str(close + 1), str(close - 1), str(close), '10',
+                open_time + 59999, '0', 0, '0', '0', '0']
+
+    async def handle_exchange_info(self, request: web.Request) -> web.Response:
+        self.exchange_info_requests += 1
+        return web.json_response({'timezone': 'UTC', 'symbols': self.markets})
+
+    async def handle_depth(self, request: web.Request) -> web.Response:
+        self.depth_requests += 1
+        snapshot = self.depth_snapshots.get(request.query['symbol'], {'lastUpdateId': 1, 'bids': [], 'asks': []})
+        return web.json_response(snapshot)
+
+    async def handle_klines(self, request: web.Request) -> web.Response:
+        self.klines_requests += 1
+        timeframe_ms = timeframe_to_ms(request.query['interval'])
+        limit = int(request.query['limit'])
+        self.klines_limits.append(limit)
+        start_time = int(request.query['startTime']) if 'startTime' in request.query else None
+        first_open_time, last_open_time = get_klines_range(timeframe_ms, limit, start_time)
+        klines = [self.make_kline(open_time, 100.) for open_time in
+                  range(first_open_time, last_open_time + 1, timeframe_ms)]
+        return web.json_response(klines)
+
+    async def handle_stream(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        streams = set(request.query['streams'].split('/'))
+        connection = (ws, streams)
+        self.connections.append(connection)
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            self.connections.remove(connection)
+        return ws
+
+    async def push_kline(self, symbol: str, timeframe: str, open_time: int, close: float, is_closed: bool):
+        stream = f'{symbol.lower()}@kline_{timeframe}'
+        message = json.dumps({
+            'stream': stream,
+            'data': {
+                'e': 'kline',
+                'E': int(time.time() * 1000),
+                's': symbol,
+                'k': {
+                    't': open_time, 'T': open_time + timeframe_to_ms(timeframe) - 1, 's': symbol, 'i': timeframe,
+                    'o': str(close), 'c': str(close), 'h': str(close + 1), 'l': str(close - 1), 'v': '10',
+                    'x': is_closed,
+                }
+            }
+        })
+        await self.send(stream, message)
+
+    async def push_depth(self, symbol: str, first_update_id: int, last_update_id: int, previous_update_id: int,
+                         bids: list[tuple[float, float]] = (), asks: list[tuple[float, float]] = ()):
+        stream = f'{symbol.lower()}@depth@100ms'
+        message = json.dumps({
+            'stream': stream,
+            'data': {
+                'e': 'depthUpdate',
+                'E': int(time.time() * 1000),
+                'T': int(time.time() * 1000),
+                's': symbol,
+                'U': first_update_id, 'u': last_update_id, 'pu': previous_update_id,
+                'b': [[str(price), str(quantity)] for price, quantity in bids],
+                'a': [[str(price), str(quantity)] for price, quantity in asks],
+            }
+        })
+        await self.send(stream, message)
+
+    async def send(self, stream: str, message: str):
+        for ws, streams in list(self.connections):
+            if stream in streams:
+                await ws.send_str(message)
+
+    async def drop_connections(self):
+        await asyncio.gather(*[ws.close() for ws, _ in list(self.connections)])
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from src.cryptach_screener.backtest.replay import replay_symbol, make_params_grid, BacktestParams, run_backtest
+from src.cryptach_screener.indicators.executor import compute_indicators, INDICATOR_COLUMNS
+from src.cryptach_screener.screener.screener import Screener
+
+LENGTH = 100
+
+
+def make_history(bars: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+    open_price = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_price, close) * (1 + rng.uniform(0, 0.01, bars))
+    low = np.minimum(open_price, close) * (1 - rng.uniform(0, 0.01, bars))
+    index = pd.date_range('2023-01-01', periods=bars, freq='1h')
+    return pd.DataFrame({'Open': open_price, 'High': high, 'Low': low, 'Close': close,
+                         'Volume': np.ones(bars)}, index=index)
+
+
+def live_signals(history: pd.DataFrame, params: BacktestParams) -> list[tuple]:
+    """
+    Сигналы так, как их нашёл бы скринер, пересчитывая индикаторы на каждом баре
+    """
+    signals = []
+    ohlcv = history.to_numpy()
+    for bar in range(LENGTH - 1, len(history)):
+        window = history.iloc[bar - LENGTH + 1:bar + 1].copy()
+        window[INDICATOR_COLUMNS] = compute_indicators(ohlcv[bar - LENGTH + 1:bar + 1], LENGTH, params.h,
+                                                       params.mult, params.supertrend_length)
+        if Screener.check_to_long(window):
+            signals.append((history.index[bar], 'LONG'))
+        elif Screener.check_to_short(window):
+            signals.append((history.index[bar], 'SHORT'))
+    return signals
+
+
+class TestReplay(TestCase):
+    def test_same_signals_as_screener(self):
+        history = make_history(400, seed=1)
+        params_grid = make_params_grid([5, 8], [2, 3], [7])
+        signals = replay_symbol('BTCUSDT', history.index.asi8 // 1_000_000, history.to_numpy(), params_grid,
+                                length=LENGTH, chunk_size=64)
+
+        found_any = False
+        for params in params_grid:
+            replayed = [(signal['time'], signal['direction']) for signal in signals
+                        if (signal['h'], signal['mult'], signal['supertrend_length']) ==
+                        (params.h, params.mult, params.supertrend_length)]
+            expected = live_signals(history, params)
+            self.assertListEqual(sorted(replayed), sorted(expected))
+            found_any = found_any or bool(expected)
+        self.assertTrue(found_any)
+
+    def test_forward_returns(self):
+        history = make_history(400, seed=1)
+        signals = run_backtest({'BTCUSDT': history}, make_params_grid([5], [2], [7]), length=LENGTH,
+                               horizons=(1,), workers=1)
+        for signal in signals.itertuples():
+            bar = history.index.get_loc(signal.time)
+            if bar + 1 < len(history):
+                sign = 1 if signal.direction == 'LONG' else -1
+                expected = sign * (history.Close.iloc[bar + 1] / history.Close.iloc[bar] - 1)
+                self.assertAlmostEqual(signal.return_1, expected)
@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.cryptach_screener.benchmark.cases import get_cases
+from src.cryptach_screener.benchmark.suite import BenchmarkCase, BenchmarkReport, BenchmarkResult, \
+    compare_with_baseline, run_benchmarks
+from src.cryptach_screener.benchmark.synthetic import make_ohlcv, make_klines_payload, make_array_dom
+from src.cryptach_screener.data_loader.klines import parse_klines
+
+
+def make_result(name: str, best: float) -> BenchmarkResult:
+    return BenchmarkResult(name=name, group='', best=best, median=best, mean=best, calls=1, repeat=1)
+
+
+class TestSyntheticData(TestCase):
+    def test_generators_are_deterministic(self):
+        self.assertTrue(make_ohlcv(100, seed=1).equals(make_ohlcv(100, seed=1)))
+        self.assertFalse(make_ohlcv(100, seed=1).equals(make_ohlcv(100, seed=2)))
+        self.assertEqual(make_klines_payload(50), make_klines_payload(50))
+        np.testing.assert_array_equal(make_array_dom(100).bid_quantities, make_array_dom(100).bid_quantities)
+
+    def test_klines_payload_matches_ohlcv(self):
+        times, values = parse_klines(make_klines_payload(20))
+        ohlcv = make_ohlcv(20)
+        self.assertEqual(times.tolist(), (ohlcv.index.asi8 // 10 ** 6).tolist())
+        np.testing.assert_allclose(values, ohlcv.to_numpy(), atol=1e-3)
+
+    def test_ohlcv_is_consistent(self):
+        ohlcv = make_ohlcv(500)
+        self.assertTrue((ohlcv['High'] >= ohlcv[['Open', 'Close']].max(axis=1)).all())
+        self.assertTrue((ohlcv['Low'] <= ohlcv[['Open', 'Close']].min(axis=1)).all())
+
+
+class TestBenchmarkSuite(TestCase):
+    def test_run_and_round_trip(self):
+        cases = [BenchmarkCase('sum', lambda: lambda: sum(range(100))),
+                 BenchmarkCase('skipped', lambda: self.fail('case is filtered out'))]
+        report = run_benchmarks(cases, pattern='^sum$', repeat=3, min_time=0.01)
+        self.assertEqual([result.name for result in report.results], ['sum'])
+        result = report.results[0]
+        self.assertGreater(result.best, 0)
+        self.assertLessEqual(result.best, result.median)
+        self.assertEqual(BenchmarkReport.from_json(report.to_json()).results, report.results)
+
+    def test_compare_with_baseline(self):
+        baseline = BenchmarkReport([make_result('fast', 1.0), make_result('slow', 1.0)])
+        report = BenchmarkReport([make_result('fast', 1.1), make_result('slow', 1.5), make_result('new', 9.)])
+        regressions = compare_with_baseline(report, baseline, tolerance=0.25)
+        self.assertEqual([regression.name for regression in regressions], ['slow'])
+        self.assertAlmostEqual(regressions[0].ratio, 1.5)
+
+    def test_cases_run(self):
+        # все замеры, кроме отрисовки графиков, должны выполняться на синтетических данных
+        for case in get_cases(chart=False):
+            with self.subTest(case.name):
+                case.setup()()
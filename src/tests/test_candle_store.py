@@ -0,0 +1,131 @@
+import os
+import tempfile
+import time
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+import numpy as np
+
+from src.cryptach_screener.data_loader.candle_store import CandleBuffer, CandleStore, MappedCandleBuffer, \
+    timeframe_to_ms
+from src.cryptach_screener.data_loader.ohlcv_loader import OHLCVLoader
+from src.tests.fake_binance import FakeBinance
+
+
+def make_candles(open_times: list[int], close: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+    times = np.array(open_times, dtype=np.int64)
+    values = np.full((len(open_times), 5), close)
+    return times, values
+
+
+class TestCandleBuffer(TestCase):
+    def test_merge_replaces_forming_candle(self):
+        buffer = CandleBuffer(5)
+        buffer.merge(*make_candles([1, 2, 3], close=1.0))
+        buffer.merge(*make_candles([3, 4], close=2.0))
+        times, values = buffer.tail(5)
+        self.assertListEqual(times.tolist(), [1, 2, 3, 4])
+        self.assertListEqual(values[:, 3].tolist(), [1.0, 1.0, 2.0, 2.0])
+
+    def test_old_candles_are_evicted(self):
+        buffer = CandleBuffer(3)
+        buffer.merge(*make_candles([1, 2, 3]))
+        buffer.merge(*make_candles([3, 4, 5]))
+        times, _ = buffer.tail(3)
+        self.assertListEqual(times.tolist(), [3, 4, 5])
+        self.assertEqual(buffer.last_open_time, 5)
+
+    def test_stale_candles_are_ignored(self):
+        buffer = CandleBuffer(3)
+        buffer.merge(*make_candles([5, 6]))
+        buffer.merge(*make_candles([4]))
+        times, _ = buffer.tail(3)
+        self.assertListEqual(times.tolist(), [5, 6])
+
+
+class TestMappedCandleStore(TestCase):
+    def setUp(self) -> None:
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.cache_dir.cleanup()
+
+    def test_candles_survive_reopen(self):
+        store = CandleStore(self.cache_dir.name)
+        buffer = store.get_or_create('BTCUSDT', '1h', 3)
+        self.assertIsInstance(buffer, MappedCandleBuffer)
+        buffer.merge(*make_candles([1, 2, 3, 4], close=2.0))
+        store.flush()
+
+        reopened = CandleStore(self.cache_dir.name).get('BTCUSDT', '1h')
+        times, values = reopened.tail(3)
+        self.assertListEqual(times.tolist(), [2, 3, 4])
+        self.assertListEqual(values[:, 3].tolist(), [2.0, 2.0, 2.0])
+        self.assertIsNone(CandleStore(self.cache_dir.name).get('ETHUSDT', '1h'))
+
+    def test_growing_capacity_keeps_candles(self):
+        store = CandleStore(self.cache_dir.name)
+        store.get_or_create('BTCUSDT', '1h', 2).merge(*make_candles([1, 2]))
+        buffer = store.get_or_create('BTCUSDT', '1h', 5)
+        self.assertEqual(buffer.capacity, 5)
+        buffer.merge(*make_candles([3]))
+        self.assertListEqual(CandleStore(self.cache_dir.name).get('BTCUSDT', '1h').tail(5)[0].tolist(), [1, 2, 3])
+
+    def test_corrupted_file_is_ignored(self):
+        store = CandleStore(self.cache_dir.name)
+        store.get_or_create('BTCUSDT', '1h', 3).merge(*make_candles([1, 2]))
+        store.flush()
+        with open(store.get_cache_path('BTCUSDT', '1h'), 'r+b') as file:
+            file.truncate(os.path.getsize(file.name) - 8)
+        self.assertIsNone(CandleStore(self.cache_dir.name).get('BTCUSDT', '1h'))
+
+    def test_broken_file_is_recreated(self):
+        for size in (0, 8 * MappedCandleBuffer.HEADER_SIZE + 3):
+            with self.subTest(size=size):
+                store = CandleStore(self.cache_dir.name)
+                path = store.get_cache_path('BTCUSDT', '1h')
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as file:
+                    file.write(b'\x01' * size)
+                self.assertIsNone(store.get('BTCUSDT', '1h'))
+
+                buffer = store.get_or_create('BTCUSDT', '1h', 3)
+                buffer.merge(*make_candles([1, 2]))
+                store.flush()
+                self.assertEqual(len(CandleStore(self.cache_dir.name).get('BTCUSDT', '1h')), 2)
+
+
+class TestWarmRestart(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.fake_binance = FakeBinance()
+        await self.fake_binance.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.fake_binance.stop()
+        self.cache_dir.cleanup()
+
+    async def run_loader(self) -> OHLCVLoader:
+        loader = OHLCVLoader(base_url=self.fake_binance.url, cache_dir=self.cache_dir.name)
+        await loader.update_candles('BTCUSDT', '1m', 500)
+        await loader.close_session()
+        return loader
+
+    async def test_restart_fetches_only_gap(self):
+        await self.run_loader()
+        self.assertListEqual(self.fake_binance.klines_limits, [500])
+
+        loader = await self.run_loader()
+        # последняя свеча ещё формировалась, догружается она и, возможно, следующая
+        self.assertEqual(len(self.fake_binance.klines_limits), 2)
+        self.assertLessEqual(self.fake_binance.klines_limits[1], 3)
+        self.assertEqual(len(loader.get_ohlcv('BTCUSDT', '1m', 500)), 500)
+        self.assertLessEqual(loader.candle_store.get('BTCUSDT', '1m').last_open_time, time.time() * 1000)
+
+
+class TestTimeframeToMs(TestCase):
+    def test_timeframes(self):
+        self.assertEqual(timeframe_to_ms('30m'), 30 * 60 * 1000)
+        self.assertEqual(timeframe_to_ms('4h'), 4 * 60 * 60 * 1000)
+
+    def test_unknown_timeframe_raises_exception(self):
+        self.assertRaises(ValueError, timeframe_to_ms, '1M')
@@ -0,0 +1,57 @@
+import importlib.util
+from unittest import TestCase, IsolatedAsyncioTestCase, skipUnless
+
+import numpy as np
+import pandas as pd
+
+from src.cryptach_screener.benchmark.synthetic import make_market_data
+from src.cryptach_screener.config.config import Config
+from src.cryptach_screener.loadtest.mock_server import MockExchange, MockSettings
+from src.cryptach_screener.screener.chart import CHART_BARS, CHART_COLUMNS, add_session_cols, render_chart
+from src.cryptach_screener.telegram.poster import TelegramPoster
+
+HAS_KALEIDO = importlib.util.find_spec('kaleido') is not None
+
+
+def reference_session_cols(df):
+    """
+    Прежняя построчная версия add_session_cols
+    """
+    df.loc[:, 'Hour'] = df.index.hour
+    df.loc[:, 'SessionNY'] = df.apply(lambda x: 'NY' if 13 <= x.Hour < 22 else None, axis=1)
+    df.loc[:, 'SessionLondon'] = df.apply(lambda x: 'London' if 7 <= x.Hour < 16 else None, axis=1)
+    df.loc[:, 'SessionTokyo'] = df.apply(lambda x: 'Tokyo' if 0 <= x.Hour < 9 else None, axis=1)
+    df.loc[:, 'SessionSydney'] = df.apply(lambda x: 'Sydney' if 21 <= x.Hour or x.Hour < 6 else None, axis=1)
+    return df
+
+
+class TestChart(TestCase):
+    def test_session_cols_same_as_reference(self):
+        index = pd.date_range('2024-01-01', periods=72, freq='h')
+        df = pd.DataFrame({'Close': np.arange(72.)}, index=index)
+        result = add_session_cols(df.copy())
+        expected = reference_session_cols(df.copy())
+        for column in ('SessionNY', 'SessionLondon', 'SessionTokyo', 'SessionSydney'):
+            self.assertListEqual(result[column].tolist(), expected[column].tolist(), column)
+        self.assertListEqual(result['Hour'].tolist(), expected['Hour'].tolist())
+
+    @skipUnless(HAS_KALEIDO, 'kaleido is not installed')
+    def test_render_chart_returns_jpeg(self):
+        df = make_market_data(500).tail(CHART_BARS)
+        image = render_chart('BTCUSDT 1h', df.index.asi8, df[CHART_COLUMNS].to_numpy(dtype=np.float64))
+        self.assertTrue(image.startswith(b'\xff\xd8'))
+
+
+class TestPostChart(IsolatedAsyncioTestCase):
+    async def test_post_signal_uploads_image(self):
+        exchange = MockExchange(MockSettings())
+        await exchange.start()
+        self.addAsyncCleanup(exchange.stop)
+        poster = TelegramPoster(Config(token='123456:test', admins=[1], channel_id='-1001', rate_limit=2400,
+                                       telegram_api_url=exchange.url))
+        image = b'\xff\xd8\xff\xe0' + bytes(range(256))
+        try:
+            await poster.post_signal('-1001', 'LONG', 'BTCUSDT', '1h', image=image)
+        finally:
+            await (await poster.bot.get_session()).close()
+        self.assertEqual(exchange.last_photo, image)
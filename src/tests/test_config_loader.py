@@ -0,0 +1,29 @@
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.cryptach_screener.config.loader import load_config
+
+ENV = {'BOT_TOKEN': '123456:test', 'ADMINS': '1, 2', 'CHANNEL_ID': '-1001'}
+
+
+class TestLoadConfig(TestCase):
+    def test_timeframes_with_spaces(self):
+        with patch.dict(os.environ, {**ENV, 'TIMEFRAMES': '1h, 4h ,,1d'}):
+            config = load_config()
+        self.assertListEqual(config.timeframes, ['1h', '4h', '1d'])
+        self.assertListEqual(config.admins, [1, 2])
+
+    def test_empty_timeframes_are_rejected(self):
+        with patch.dict(os.environ, {**ENV, 'TIMEFRAMES': ' , '}):
+            self.assertRaises(ValueError, load_config)
+
+    def test_empty_values_use_defaults(self):
+        names = ['RATE_LIMIT', 'MAX_CONCURRENT_REQUESTS', 'SETTLE_DELAY', 'SYMBOLS_TTL', 'INDICATOR_WORKERS',
+                 'CHART_WORKERS', 'MARKET_DATA_MEMORY_MB', 'METRICS_PORT', 'SHARD_WORKERS', 'TIMEFRAMES']
+        with patch.dict(os.environ, {**ENV, **{name: '' for name in names}}):
+            config = load_config()
+        self.assertEqual((config.rate_limit, config.max_concurrent_requests, config.settle_delay), (2400, 20, 5.))
+        self.assertEqual((config.symbols_ttl, config.indicator_workers, config.chart_workers), (3600., 0, 2))
+        self.assertEqual((config.market_data_memory_mb, config.metrics_port, config.shard_workers), (64., 0, 2))
+        self.assertListEqual(config.timeframes, ['1h'])
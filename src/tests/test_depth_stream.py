@@ -0,0 +1,235 @@
+import asyncio
+import time
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+import numpy as np
+
+from src.cryptach_screener.data_loader.rate_limiter import WeightRateLimiter
+from src.hammer_alert_system.checker.profiles import CheckProfile, ProfileChecker
+from src.hammer_alert_system.checker.strict import StrictChecker
+from src.hammer_alert_system.depth_stream import DepthStream
+from src.hammer_alert_system.order_book import LocalOrderBook, depth_request_weight
+from src.tests.fake_binance import FakeBinance
+
+
+async def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError('Condition was not met in time')
+        await asyncio.sleep(0.01)
+
+
+def make_snapshot(last_update_id: int) -> dict:
+    return {'lastUpdateId': last_update_id,
+            'bids': [['99.0', '5'], ['98.0', '7']],
+            'asks': [['101.0', '3'], ['102.0', '4']]}
+
+
+def make_event(first_update_id: int, last_update_id: int, previous_update_id: int,
+               bids: list = (), asks: list = ()) -> dict:
+    return {'e': 'depthUpdate', 'U': first_update_id, 'u': last_update_id, 'pu': previous_update_id,
+            'b': [[str(price), str(quantity)] for price, quantity in bids],
+            'a': [[str(price), str(quantity)] for price, quantity in asks]}
+
+
+class TestLocalOrderBook(TestCase):
+    def setUp(self) -> None:
+        self.book = LocalOrderBook('BTCUSDT')
+        self.book.apply_snapshot(make_snapshot(100))
+
+    def test_events_before_snapshot_are_dropped(self):
+        self.assertTrue(self.book.apply_update(make_event(90, 95, 89, bids=[(99., 0)])))
+        self.assertEqual(self.book.bids[99.], 5)
+        self.assertEqual(self.book.last_update_id, 100)
+
+    def test_first_event_must_overlap_snapshot(self):
+        self.assertFalse(self.book.apply_update(make_event(101, 105, 100)))
+        self.assertTrue(self.book.apply_update(make_event(98, 105, 97, bids=[(99., 0), (97., 2)],
+                                                          asks=[(101., 8)])))
+        self.assertEqual(self.book.bids, {98.: 7, 97.: 2})
+        self.assertEqual(self.book.asks[101.], 8)
+        self.assertEqual(self.book.last_update_id, 105)
+
+    def test_gap_in_sequence(self):
+        self.assertTrue(self.book.apply_update(make_event(98, 105, 97)))
+        self.assertTrue(self.book.apply_update(make_event(106, 110, 105)))
+        self.assertFalse(self.book.apply_update(make_event(115, 120, 114)))
+
+    def test_array_dom_is_sorted(self):
+        self.book.apply_update(make_event(98, 105, 97, bids=[(99.5, 1)], asks=[(100.5, 1)]))
+        dom = self.book.to_array_dom(depth=2)
+        np.testing.assert_array_equal(dom.bid_prices, [99.5, 99.])
+        np.testing.assert_array_equal(dom.ask_prices, [100.5, 101.])
+        np.testing.assert_array_equal(dom.ask_quantities, [1., 3.])
+
+    def test_depth_request_weight(self):
+        self.assertEqual([depth_request_weight(limit) for limit in (5, 100, 500, 1000)], [2, 5, 10, 20])
+
+
+class TestDepthStream(IsolatedAsyncioTestCase):
+    symbols = ['BTCUSDT', 'ETHUSDT', 'XRPUSDT']
+    check_interval = 0.
+
+    async def asyncSetUp(self) -> None:
+        self.fake_binance = FakeBinance()
+        for symbol in self.symbols:
+            self.fake_binance.depth_snapshots[symbol] = self.make_snapshot()
+        await self.fake_binance.start()
+        self.signals = []
+        self.stream = DepthStream(
+            symbols=self.symbols,
+            checkers=self.make_checkers(),
+            on_signal=self.on_signal,
+            rate_limiter=WeightRateLimiter(weight_limit=100000, max_concurrency=50),
+            base_url=self.fake_binance.url,
+            url=self.fake_binance.ws_url,
+            check_interval=self.check_interval,
+            streams_per_connection=100,
+            reconnect_delay=0.05,
+        )
+        self.stream_task = asyncio.create_task(self.stream.run())
+        await wait_for(lambda: all(book.synced for book in self.stream.books.values())
+                       and not self.stream.syncing)
+
+    async def asyncTearDown(self) -> None:
+        self.stream_task.cancel()
+        await asyncio.gather(self.stream_task, return_exceptions=True)
+        await self.fake_binance.stop()
+
+    async def on_signal(self, symbol, signal):
+        self.signals.append((symbol, signal))
+
+    def make_snapshot(self) -> dict:
+        return make_snapshot(100)
+
+    def make_checkers(self) -> list:
+        return [StrictChecker(threshold_quantity=50)]
+
+
+class TestDepthStreamSignals(TestDepthStream):
+    async def test_new_big_level_is_signaled_once(self):
+        await self.fake_binance.push_depth('ETHUSDT', 98, 105, 97, bids=[(98.5, 60)])
+        await self.fake_binance.push_depth('ETHUSDT', 106, 110, 105, bids=[(98.5, 70)])
+        await wait_for(lambda: self.stream.books['ETHUSDT'].last_update_id == 110)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(len(self.signals), 1)
+        symbol, signal = self.signals[0]
+        self.assertEqual((symbol, signal.price, signal.quantity), ('ETHUSDT', 98.5, 60))
+        self.assertIn('#ETHUSDT', signal.text)
+
+        # уровень снят и выставлен снова - это новый сигнал
+        await self.fake_binance.push_depth('ETHUSDT', 111, 112, 110, bids=[(98.5, 0)])
+        await self.fake_binance.push_depth('ETHUSDT', 113, 114, 112, bids=[(98.5, 55)])
+        await wait_for(lambda: len(self.signals) == 2)
+
+    async def test_gap_triggers_resync(self):
+        await self.fake_binance.push_depth('BTCUSDT', 98, 105, 97)
+        await wait_for(lambda: self.stream.books['BTCUSDT'].last_update_id == 105)
+        requests = self.fake_binance.depth_requests
+
+        self.fake_binance.depth_snapshots['BTCUSDT'] = {'lastUpdateId': 200, 'bids': [['90', '80']], 'asks': []}
+        await self.fake_binance.push_depth('BTCUSDT', 150, 160, 149)
+        await wait_for(lambda: self.fake_binance.depth_requests > requests and not self.stream.syncing)
+        self.assertEqual(self.stream.resyncs, 1)
+
+        book = self.stream.books['BTCUSDT']
+        self.assertEqual(book.bids, {90.: 80})
+        await self.fake_binance.push_depth('BTCUSDT', 195, 205, 194, asks=[(91., 1)])
+        await wait_for(lambda: book.last_update_id == 205)
+        self.assertEqual(book.asks, {91.: 1})
+        self.assertEqual([signal.price for _, signal in self.signals], [90.])
+
+
+class BrokenSignalChecker(StrictChecker):
+    def generate_signal(self, level, symbol: str) -> str:
+        if symbol == 'XRPUSDT':
+            raise ValueError('broken signal text')
+        return super().generate_signal(level, symbol)
+
+
+class TestDepthStreamThrottle(TestDepthStream):
+    check_interval = 0.3
+
+    def make_checkers(self) -> list:
+        return [BrokenSignalChecker(threshold_quantity=50)]
+
+    async def test_update_inside_interval_is_checked_later(self):
+        await self.fake_binance.push_depth('ETHUSDT', 98, 105, 97, bids=[(98.5, 1)])
+        await wait_for(lambda: self.stream.books['ETHUSDT'].last_update_id == 105)
+        checks = self.stream.checks
+
+        # стенка пришла внутри интервала, и после неё символ затих
+        await self.fake_binance.push_depth('ETHUSDT', 106, 110, 105, bids=[(98.5, 60)])
+        await wait_for(lambda: self.stream.books['ETHUSDT'].last_update_id == 110)
+        self.assertEqual((self.stream.checks, self.signals), (checks, []))
+        await wait_for(lambda: self.signals, timeout=2)
+        self.assertEqual(self.stream.checks, checks + 1)
+        self.assertEqual([(symbol, signal.price) for symbol, signal in self.signals], [('ETHUSDT', 98.5)])
+
+    async def test_checker_error_stays_within_symbol(self):
+        requests = self.fake_binance.depth_requests
+        await self.fake_binance.push_depth('XRPUSDT', 98, 105, 97, bids=[(98.5, 60)])
+        await self.fake_binance.push_depth('BTCUSDT', 98, 105, 97, bids=[(98.5, 70)])
+        await wait_for(lambda: self.signals)
+        await self.fake_binance.push_depth('XRPUSDT', 106, 110, 105, asks=[(101.5, 1)])
+        await wait_for(lambda: self.stream.books['XRPUSDT'].last_update_id == 110)
+
+        self.assertEqual([(symbol, signal.quantity) for symbol, signal in self.signals], [('BTCUSDT', 70)])
+        self.assertEqual(self.stream.resyncs, 0)
+        self.assertEqual(self.fake_binance.depth_requests, requests)
+        self.assertEqual(len(self.fake_binance.connections), 1)
+
+
+class TestDepthStreamProfiles(TestDepthStream):
+    symbols = ['ADAUSDT']
+
+    def make_snapshot(self) -> dict:
+        return {'lastUpdateId': 100,
+                'bids': [['1.1', '5'], ['0.7', '7']],
+                'asks': [['1.5', '3'], ['1.7', '4']]}
+
+    def make_checkers(self) -> list:
+        return [ProfileChecker({ProfileChecker.DEFAULT: [CheckProfile('wall', 50),
+                                                         CheckProfile('cluster', 90, agg_frame=3)]})]
+
+    async def test_moving_top_of_book_does_not_repeat_signals(self):
+        await self.fake_binance.push_depth('ADAUSDT', 98, 105, 97, bids=[(0.3, 60), (0.2, 40)])
+        await wait_for(lambda: len(self.signals) == 2)
+        wall = [signal for _, signal in self.signals if 'wall' in signal.text][0]
+        self.assertEqual(wall.price, 0.3)
+
+        # лучшая цена двигается, стенка и кластер остаются на месте
+        update_id = 105
+        for bids in ([(1.3, 1)], [(0.9, 1)], [(1.3, 0)], [(1.3, 2), (0.9, 0)], [(1.3, 0), (0.9, 3)]):
+            await self.fake_binance.push_depth('ADAUSDT', update_id + 1, update_id + 2, update_id, bids=bids)
+            update_id += 2
+            await wait_for(lambda: self.stream.books['ADAUSDT'].last_update_id == update_id)
+            await asyncio.sleep(0.05)
+        self.assertEqual(len(self.signals), 2)
+
+
+class TestDepthStreamThroughput(TestDepthStream):
+    symbols = [f'SYM{i}USDT' for i in range(300)]
+    check_interval = 60.
+
+    async def test_many_symbols(self):
+        updates = 20
+        started_at = time.perf_counter()
+        for update_id in range(updates):
+            for symbol in self.symbols:
+                first_update_id = 91 + update_id * 10
+                await self.fake_binance.push_depth(symbol, first_update_id, first_update_id + 9,
+                                                   first_update_id - 1, bids=[(98. - update_id * 0.1, 1)],
+                                                   asks=[(102. + update_id * 0.1, 1)])
+        total = updates * len(self.symbols)
+        await wait_for(lambda: self.stream.updates_applied == total, timeout=20)
+        elapsed = time.perf_counter() - started_at
+
+        self.assertEqual(self.stream.resyncs, 0)
+        # проверка после снимка и на первом обновлении, последнее обновление проверится в конце интервала
+        self.assertEqual(self.stream.checks, len(self.symbols) * 2)
+        self.assertEqual(set(self.stream.deferred_checks), set(self.symbols))
+        self.assertLess(self.stream.last_latency, 5)
+        self.assertLess(elapsed, 10)
@@ -0,0 +1,150 @@
+import itertools
+from statistics import fmean
+from unittest import TestCase
+
+import numpy as np
+
+from src.hammer_alert_system.checker.profiles import CheckProfile, ProfileChecker
+from src.hammer_alert_system.checker.rolling_sum import AggSumChecker, find_big_windows, mean_windows, \
+    rolling_window
+from src.hammer_alert_system.checker.strict import StrictChecker
+from src.hammer_alert_system.structs import DOM, DOMLevelType, ArrayDOM
+
+
+def make_dom(rng: np.random.Generator, levels: int, fractional: bool = False) -> DOM:
+    quantities = rng.choice([0, 1, 5, 20, 60], size=(2, levels), p=[0.4, 0.3, 0.2, 0.08, 0.02])
+    if fractional:
+        # объёмы с шагом 0.001, как у большинства контрактов
+        quantities = np.round(quantities * rng.uniform(0.5, 1.5, size=(2, levels)), 3)
+    return DOM(
+        symbol='BTCUSDT',
+        asks=[DOM.Level(100. + i * 0.1, float(quantity), DOMLevelType.ASK) for i, quantity in enumerate(quantities[0])],
+        bids=[DOM.Level(99.9 - i * 0.1, float(quantity), DOMLevelType.BID) for i, quantity in enumerate(quantities[1])],
+    )
+
+
+def get_big_levels_reference(dom: DOM, threshold_quantity: float, agg_frame: int) -> list[DOM.Level]:
+    big_levels = []
+    for window in itertools.chain(rolling_window(dom.asks, agg_frame), rolling_window(dom.bids, agg_frame)):
+        if (quantity_sum := sum([level.quantity for level in window])) >= threshold_quantity:
+            big_levels.append(DOM.Level(fmean([level.price for level in window]), quantity_sum, window[0].level_type))
+    return big_levels
+
+
+class TestArrayDOM(TestCase):
+    def test_round_trip(self):
+        dom = make_dom(np.random.default_rng(0), 20)
+        book = ArrayDOM.from_dom(dom)
+        self.assertEqual(book.ask_prices.shape, (20,))
+        self.assertEqual(book.to_dom(), dom)
+
+
+class TestRollingSum(TestCase):
+    def test_same_as_window_sums(self):
+        values = np.array([1., 4., 5., 2., 3., 5., 6.])
+        positions, sums = find_big_windows(values, 4, 0)
+        self.assertListEqual(sums.tolist(), [sum(window) for window in rolling_window(values, 4)])
+        self.assertEqual(len(find_big_windows(values[:2], 3, 0)[0]), 0)
+        self.assertRaises(ValueError, find_big_windows, values, 0, 0)
+
+    def test_window_means_are_exactly_rounded(self):
+        prices = [47058.2442, 47058.2452, 47058.2462]
+        self.assertEqual(mean_windows(np.array(prices), 3, np.array([0])).tolist(), [fmean(prices)])
+        rng = np.random.default_rng(6)
+        prices = np.round(rng.uniform(20000, 70000, size=1000), 4)
+        positions = np.arange(len(prices) - 2)
+        self.assertListEqual(mean_windows(prices, 3, positions).tolist(),
+                             [fmean(window) for window in rolling_window(prices.tolist(), 3)])
+
+
+class TestVectorizedCheckers(TestCase):
+    def test_agg_sum_checker_same_as_reference(self):
+        rng = np.random.default_rng(1)
+        checker = AggSumChecker(threshold_quantity=50, agg_frame=3, bid_emoji='', ask_emoji='')
+        for levels, fractional in itertools.product((0, 2, 3, 50, 1000), (False, True)):
+            dom = make_dom(rng, levels, fractional)
+            expected = get_big_levels_reference(dom, 50, 3)
+            for book in (dom, ArrayDOM.from_dom(dom)):
+                levels_found = checker.get_big_levels(book)
+                self.assertEqual(len(levels_found), len(expected))
+                for level, expected_level in zip(levels_found, expected):
+                    self.assertEqual(level.quantity, expected_level.quantity)
+                    self.assertEqual(level.level_type, expected_level.level_type)
+                    self.assertEqual(level.price, expected_level.price)
+
+    def test_window_with_sum_equal_to_threshold(self):
+        rng = np.random.default_rng(4)
+        dom = make_dom(rng, 1000, fractional=True)
+        book = ArrayDOM.from_dom(dom)
+        for position in rng.integers(0, 997, size=50):
+            window = dom.asks[position:position + 3]
+            threshold = sum([level.quantity for level in window])
+            if not threshold:
+                continue
+            checker = AggSumChecker(threshold_quantity=threshold, agg_frame=3, bid_emoji='', ask_emoji='')
+            found = [level for level in checker.get_big_levels(book) if level.level_type == DOMLevelType.ASK
+                     and level.price == fmean([window_level.price for window_level in window])]
+            self.assertEqual([level.quantity for level in found], [threshold])
+
+    def test_single_level_prices_are_book_prices(self):
+        dom = make_dom(np.random.default_rng(5), 1000, fractional=True)
+        checker = AggSumChecker(threshold_quantity=20, agg_frame=1, bid_emoji='', ask_emoji='')
+        book_prices = {level.price for level in dom.asks + dom.bids}
+        levels = checker.get_big_levels(ArrayDOM.from_dom(dom))
+        self.assertTrue(levels)
+        self.assertTrue(all(level.price in book_prices for level in levels))
+
+    def test_strict_checker_same_as_reference(self):
+        dom = make_dom(np.random.default_rng(2), 1000)
+        checker = StrictChecker(threshold_quantity=20)
+        expected = [level for level in dom.asks + dom.bids if level.quantity >= 20]
+        self.assertListEqual(checker.check_dom(dom), expected)
+        self.assertListEqual(checker.check_dom(ArrayDOM.from_dom(dom)), expected)
+
+
+class TestProfileChecker(TestCase):
+    profiles = [CheckProfile('small', 20), CheckProfile('big', 60), CheckProfile('agg', 50, agg_frame=3),
+                CheckProfile('wide', 120, agg_frame=10)]
+
+    def test_same_as_separate_checkers(self):
+        checker = ProfileChecker({ProfileChecker.DEFAULT: self.profiles})
+        rng = np.random.default_rng(3)
+        for levels, fractional in itertools.product((0, 2, 50, 1000), (False, True)):
+            dom = make_dom(rng, levels, fractional)
+            found = checker.get_big_levels(dom)
+            for profile in self.profiles:
+                expected = get_big_levels_reference(dom, profile.threshold_quantity, profile.agg_frame)
+                profile_levels = [level for level in found if level.profile is profile]
+                self.assertEqual(len(profile_levels), len(expected), profile.name)
+                key = lambda level: (level.level_type.value, level.price)
+                for level, expected_level in zip(sorted(profile_levels, key=key), sorted(expected, key=key)):
+                    self.assertEqual(level.quantity, expected_level.quantity)
+                    self.assertEqual(level.level_type, expected_level.level_type)
+                    self.assertEqual(level.price, expected_level.price)
+
+    def test_profiles_by_symbol_and_class(self):
+        checker = ProfileChecker(
+            profiles={'BTCUSDT': [CheckProfile('btc', 1000)], 'majors': [CheckProfile('major', 100)],
+                      ProfileChecker.DEFAULT: [CheckProfile('alt', 10)]},
+            symbol_classes={'BTCUSDT': 'majors', 'ETHUSDT': 'majors'},
+        )
+        self.assertEqual([profile.name for profile in checker.get_profiles('BTCUSDT')], ['btc'])
+        self.assertEqual([profile.name for profile in checker.get_profiles('ETHUSDT')], ['major'])
+        self.assertEqual([profile.name for profile in checker.get_profiles('DOGEUSDT')], ['alt'])
+
+        book = ArrayDOM(ask_prices=np.array([101., 102.]), ask_quantities=np.array([150., 5.]),
+                        bid_prices=np.array([99.]), bid_quantities=np.array([50.]), symbol='ETHUSDT')
+        levels = checker.get_big_levels(book)
+        self.assertEqual([(level.price, level.profile.name) for level in levels], [(101., 'major')])
+        self.assertTrue(checker.check_dom(book)[0].startswith('#ETHUSDT major'))
+
+        book.symbol = 'DOGEUSDT'
+        self.assertEqual(len(checker.get_big_levels(book)), 2)
+
+    def test_level_keys_differ_between_profiles(self):
+        checker = ProfileChecker({ProfileChecker.DEFAULT: self.profiles[:2]})
+        book = ArrayDOM(ask_prices=np.array([101.]), ask_quantities=np.array([80.]),
+                        bid_prices=np.empty(0), bid_quantities=np.empty(0), symbol='XRPUSDT')
+        levels = checker.get_big_levels(book)
+        self.assertEqual([level.profile.name for level in levels], ['small', 'big'])
+        self.assertEqual(len({checker.get_level_key(level) for level in levels}), 2)
@@ -0,0 +1,44 @@
+import asyncio
+import os
+from unittest import IsolatedAsyncioTestCase
+
+import numpy as np
+
+from src.cryptach_screener.benchmark.synthetic import make_ohlcv_values
+from src.cryptach_screener.indicators.executor import IndicatorExecutor, compute_indicators, get_warm_up_result, \
+    INDICATOR_COLUMNS
+
+
+class TestIndicatorExecutor(IsolatedAsyncioTestCase):
+    def test_default_workers(self):
+        self.assertEqual(IndicatorExecutor(mode='thread').workers, os.cpu_count() or 1)
+        self.assertEqual(IndicatorExecutor(mode='thread', workers=3).workers, 3)
+        self.assertRaises(ValueError, IndicatorExecutor, mode='unknown')
+
+    async def test_same_as_direct_call(self):
+        ohlcv = make_ohlcv_values(300, seed=3)
+        expected = compute_indicators(ohlcv, nwe_length=300, h=8, mult=3, supertrend_length=7)
+        self.assertEqual(expected.shape, (300, len(INDICATOR_COLUMNS)))
+
+        for mode in IndicatorExecutor.modes:
+            with self.subTest(mode=mode):
+                executor = IndicatorExecutor(mode=mode, workers=2)
+                try:
+                    result = await executor.compute(ohlcv, nwe_length=300, h=8, mult=3, supertrend_length=7)
+                finally:
+                    executor.shutdown(wait=True)
+                self.assertIsNone(executor.executor)
+                np.testing.assert_array_equal(result, expected)
+
+    async def test_every_process_is_warmed_up(self):
+        executor = IndicatorExecutor(mode='process', workers=2)
+        try:
+            seconds, _, kernels = await executor.warm_up()
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(*[loop.run_in_executor(executor.executor, get_warm_up_result)
+                                             for _ in range(20)])
+        finally:
+            executor.shutdown(wait=True)
+        self.assertGreater(seconds, 0)
+        self.assertGreater(kernels, 0)
+        self.assertNotIn(None, results)
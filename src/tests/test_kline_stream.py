@@ -0,0 +1,146 @@
+import asyncio
+import time
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+from src.cryptach_screener.data_loader.kline_stream import KlineStream
+from src.cryptach_screener.data_loader.ohlcv_loader import OHLCVLoader
+from src.cryptach_screener.loadtest.harness import LoadTestOptions, make_config
+from src.cryptach_screener.screener.screener import Screener
+from src.tests.fake_binance import FakeBinance
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'XRPUSDT']
+TIMEFRAME = '1m'
+LIMIT = 10
+
+
+async def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError('Condition was not met in time')
+        await asyncio.sleep(0.01)
+
+
+class TestKlineStream(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.fake_binance = FakeBinance()
+        await self.fake_binance.start()
+        self.loader = OHLCVLoader(base_url=self.fake_binance.url)
+        self.closed_candles = []
+        self.stream = KlineStream(
+            loader=self.loader,
+            symbols=SYMBOLS,
+            timeframe=TIMEFRAME,
+            limit=LIMIT,
+            on_candle_close=self.on_candle_close,
+            url=self.fake_binance.ws_url,
+            streams_per_connection=2,
+            reconnect_delay=0.05,
+        )
+        self.stream_task = asyncio.create_task(self.stream.run())
+        # соединение регистрируется на сервере раньше, чем клиент начинает дозагрузку
+        await wait_for(lambda: len(self.fake_binance.connections) == 2 and not self.stream.backfilling
+                       and all(self.loader.candle_store.get(symbol, TIMEFRAME) for symbol in SYMBOLS))
+
+    async def asyncTearDown(self) -> None:
+        self.stream_task.cancel()
+        await asyncio.gather(self.stream_task, return_exceptions=True)
+        await self.fake_binance.stop()
+        await self.loader.close_session()
+
+    async def on_candle_close(self, symbol: str, timeframe: str, open_time: int):
+        self.closed_candles.append((symbol, timeframe, open_time, time.monotonic()))
+
+    def last_open_time(self, symbol: str) -> int:
+        return self.loader.candle_store.get(symbol, TIMEFRAME).last_open_time
+
+    async def test_backfill_on_connect(self):
+        for symbol in SYMBOLS:
+            self.assertEqual(len(self.loader.get_ohlcv(symbol, TIMEFRAME, LIMIT)), LIMIT)
+
+    async def test_candle_close_triggers_callback(self):
+        open_time = self.last_open_time('ETHUSDT')
+        pushed_at = time.monotonic()
+        await self.fake_binance.push_kline('ETHUSDT', TIMEFRAME, open_time, 200., is_closed=True)
+        await wait_for(lambda: self.closed_candles)
+
+        symbol, timeframe, closed_open_time, handled_at = self.closed_candles[0]
+        self.assertEqual((symbol, timeframe, closed_open_time), ('ETHUSDT', TIMEFRAME, open_time))
+        self.assertLess(handled_at - pushed_at, 0.5)
+        self.assertEqual(self.loader.get_ohlcv('ETHUSDT', TIMEFRAME, LIMIT).Close.iloc[-1], 200.)
+
+    async def test_message_throughput(self):
+        messages = 3000
+        open_time = self.last_open_time('BTCUSDT')
+        started_at = time.monotonic()
+        for i in range(messages):
+            await self.fake_binance.push_kline('BTCUSDT', TIMEFRAME, open_time, 100. + i, is_closed=False)
+        await wait_for(lambda: self.stream.messages_received >= messages)
+        elapsed = time.monotonic() - started_at
+
+        self.assertEqual(self.loader.get_ohlcv('BTCUSDT', TIMEFRAME, LIMIT).Close.iloc[-1], 100. + messages - 1)
+        self.assertGreater(messages / elapsed, 1000)
+
+    async def test_reconnect_with_backfill(self):
+        klines_requests = self.fake_binance.klines_requests
+        await self.fake_binance.drop_connections()
+        await wait_for(lambda: len(self.fake_binance.connections) == 2 and not self.stream.backfilling
+                       and self.fake_binance.klines_requests >= klines_requests + len(SYMBOLS))
+
+        self.assertGreaterEqual(self.stream.reconnects, 2)
+        self.assertEqual(self.fake_binance.klines_requests, klines_requests + len(SYMBOLS))
+
+    async def test_gap_triggers_backfill(self):
+        klines_requests = self.fake_binance.klines_requests
+        open_time = self.last_open_time('XRPUSDT') + 5 * 60 * 1000
+        await self.fake_binance.push_kline('XRPUSDT', TIMEFRAME, open_time, 300., is_closed=False)
+        await wait_for(lambda: self.stream.messages_received and not self.stream.backfilling)
+
+        self.assertEqual(self.fake_binance.klines_requests, klines_requests + 1)
+        self.assertEqual(self.last_open_time('XRPUSDT'), open_time)
+
+    async def test_failed_backfill_is_retried(self):
+        update_candles = self.loader.update_candles
+        failures = [RuntimeError('klines are down'), False]
+
+        async def flaky_update_candles(symbol: str, timeframe: str, limit: int) -> bool:
+            if failures:
+                failure = failures.pop(0)
+                if isinstance(failure, Exception):
+                    raise failure
+                return failure
+            return await update_candles(symbol, timeframe, limit)
+
+        self.loader.update_candles = flaky_update_candles
+        last_open_time = self.last_open_time('XRPUSDT')
+        open_time = last_open_time + 5 * 60 * 1000
+        await self.fake_binance.push_kline('XRPUSDT', TIMEFRAME, open_time, 300., is_closed=False)
+        await wait_for(lambda: len(failures) == 1)
+
+        # пока история не дозагружена, сообщение не ложится поверх пропуска
+        self.assertIn('XRPUSDT', self.stream.backfilling)
+        self.assertEqual(self.last_open_time('XRPUSDT'), last_open_time)
+        await wait_for(lambda: not self.stream.backfilling)
+        self.assertEqual(self.last_open_time('XRPUSDT'), open_time)
+        self.assertEqual(self.loader.get_ohlcv('XRPUSDT', TIMEFRAME, LIMIT).Close.iloc[-1], 300.)
+
+
+class TestScreenerKlineStreams(TestCase):
+    def setUp(self) -> None:
+        options = LoadTestOptions(timeframes=['15m', '1h', '4h', '1d'], base_timeframe='1h',
+                                  indicator_executor='inline')
+        self.screener = Screener(make_config('http://127.0.0.1:1', options))
+
+    def test_streams_follow_candle_sources(self):
+        streams = self.screener.make_kline_streams(SYMBOLS)
+        sources = self.screener.get_candle_sources(self.screener.timeframes)
+        self.assertDictEqual({stream.timeframe: stream.limit for stream in streams}, sources)
+        self.assertListEqual(sorted(sources), ['15m', '1h'])
+
+    def test_closed_timeframes(self):
+        day = 24 * 60 * 60 * 1000
+        hour = 60 * 60 * 1000
+        self.assertListEqual(self.screener.get_closed_timeframes('15m', day + 45 * 60 * 1000), ['15m'])
+        self.assertListEqual(self.screener.get_closed_timeframes('1h', day + 4 * hour), ['1h'])
+        self.assertListEqual(self.screener.get_closed_timeframes('1h', day + 3 * hour), ['1h', '4h'])
+        self.assertListEqual(self.screener.get_closed_timeframes('1h', 2 * day - hour), ['1h', '4h', '1d'])
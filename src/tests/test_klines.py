@@ -0,0 +1,37 @@
+import json
+from unittest import TestCase
+
+import numpy as np
+
+from src.cryptach_screener.data_loader.klines import parse_klines, concat_klines, make_candles_frame
+from src.tests.fake_binance import FakeBinance
+
+
+class TestKlines(TestCase):
+    def test_parse_klines(self):
+        rows = [FakeBinance.make_kline(open_time, 100. + i) for i, open_time in enumerate([0, 60000, 120000])]
+        times, values = parse_klines(json.dumps(rows).encode())
+        self.assertEqual(times.dtype, np.int64)
+        self.assertListEqual(times.tolist(), [0, 60000, 120000])
+        self.assertEqual(values.shape, (3, 5))
+        expected = [[float(item) for item in row[1:6]] for row in rows]
+        self.assertListEqual(values.tolist(), expected)
+
+    def test_parse_empty_klines(self):
+        times, values = parse_klines(b'[]')
+        self.assertEqual(times.shape, (0,))
+        self.assertEqual(values.shape, (0, 5))
+
+    def test_concat_pages(self):
+        first = parse_klines(json.dumps([FakeBinance.make_kline(0, 1.)]).encode())
+        second = parse_klines(json.dumps([FakeBinance.make_kline(60000, 2.)]).encode())
+        times, values = concat_klines([first, second])
+        self.assertListEqual(times.tolist(), [0, 60000])
+        self.assertListEqual(values[:, 3].tolist(), [1., 2.])
+
+    def test_candles_frame_index_is_utc(self):
+        times = np.array([1_700_006_400_000, 1_700_010_000_000], dtype=np.int64)
+        df = make_candles_frame(times, np.ones((2, 5)))
+        self.assertListEqual(df.columns.tolist(), ['Open', 'High', 'Low', 'Close', 'Volume'])
+        self.assertEqual(df.index.name, 'Time')
+        self.assertListEqual(df.index.hour.tolist(), [0, 1])
@@ -0,0 +1,77 @@
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+from src.cryptach_screener.config.config import Config
+from src.cryptach_screener.data_loader.ohlcv_loader import OHLCVLoader
+from src.cryptach_screener.data_loader.rate_limiter import RateLimitExceeded
+from src.cryptach_screener.loadtest.exchange_data import get_klines_range
+from src.cryptach_screener.loadtest.harness import LoadTestOptions, run_screener_iteration
+from src.cryptach_screener.loadtest.mock_server import MockExchange, MockSettings
+from src.cryptach_screener.telegram.poster import TelegramPoster
+
+
+class TestExchangeData(TestCase):
+    def test_klines_range(self):
+        minute = 60000
+        current = 1_700_006_400_000 + 30 * minute
+        now = current + 15000
+        self.assertEqual(get_klines_range(minute, 10, now_ms=now), (current - 9 * minute, current))
+        # со startTime - limit свечей от первой открытой после него, но не дальше текущей
+        self.assertEqual(get_klines_range(minute, 3, now - 10 * minute, now),
+                         (current - 9 * minute, current - 7 * minute))
+        self.assertEqual(get_klines_range(minute, 100, current - 2 * minute, now), (current - 2 * minute, current))
+
+
+class TestMockExchange(IsolatedAsyncioTestCase):
+    async def start_exchange(self, **settings) -> MockExchange:
+        exchange = MockExchange(MockSettings(**settings))
+        await exchange.start()
+        self.addAsyncCleanup(exchange.stop)
+        return exchange
+
+    async def test_loader_against_mock(self):
+        exchange = await self.start_exchange(symbols=30)
+        loader = OHLCVLoader(base_url=exchange.url)
+        try:
+            symbols = await loader.fetch_futures_usdt_symbols()
+            self.assertEqual(len(symbols), 30)
+            self.assertTrue(await loader.update_candles(symbols[0], '1h', 501))
+            ohlcv = loader.get_ohlcv(symbols[0], '1h', 500, closed_only=True)
+        finally:
+            await loader.close_session()
+        self.assertEqual(len(ohlcv), 500)
+        self.assertTrue((ohlcv['High'] >= ohlcv['Close']).all())
+        self.assertEqual(exchange.stats.klines_requests, 1)
+        self.assertEqual(exchange.stats.exchange_info_requests, 1)
+
+    async def test_rate_limit_injection(self):
+        exchange = await self.start_exchange(symbols=1, rate_limit_rate=1., retry_after=0.01)
+        loader = OHLCVLoader(base_url=exchange.url)
+        try:
+            with self.assertRaises(RateLimitExceeded):
+                await loader.make_request_ohlcv('SYM0USDT', '1h', 10)
+        finally:
+            await loader.close_session()
+        self.assertEqual(exchange.stats.rate_limited, OHLCVLoader.max_retries)
+
+    async def test_telegram_poster_against_mock(self):
+        exchange = await self.start_exchange()
+        poster = TelegramPoster(Config(token='123456:test', admins=[1], channel_id='-1001', rate_limit=2400,
+                                       telegram_api_url=exchange.url))
+        try:
+            signal = await poster.post_signal('-1001', 'LONG', 'SYM0USDT', '1h', image=b'\xff\xd8\xff')
+            await poster.send_message(1, 'error digest')
+        finally:
+            await (await poster.bot.get_session()).close()
+        self.assertEqual(signal.message_id, 1)
+        self.assertEqual((exchange.stats.photos, exchange.stats.messages), (1, 1))
+
+    async def test_screener_iteration(self):
+        exchange = await self.start_exchange(symbols=20, error_rate=0.1, seed=1)
+        result = await run_screener_iteration(exchange.url, LoadTestOptions(indicator_executor='inline',
+                                                                            chart_workers=1))
+        summary = result['summary']
+        self.assertEqual(summary['symbols'], 20)
+        self.assertEqual(summary['checked'] + summary['skipped'], 20)
+        self.assertGreater(summary['skipped'], 0)
+        self.assertEqual(result['stats']['klines_requests'], 20)
+        self.assertGreater(result['peak_rss_mb'], 0)
@@ -0,0 +1,92 @@
+import asyncio
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+import numpy as np
+
+from src.cryptach_screener.benchmark.synthetic import make_ohlcv
+from src.cryptach_screener.data_loader.klines import OHLCV_COLUMNS
+from src.cryptach_screener.indicators.executor import compute_indicators, INDICATOR_COLUMNS
+from src.cryptach_screener.screener.market_data import MARKET_DATA_COLUMNS, MemoryBudget, SharedTimes, \
+    make_market_data
+from src.cryptach_screener.screener.panel import PANEL_COLUMNS, make_signal_panel
+
+
+def make_inputs(seed: int, bars: int = 500):
+    ohlcv = make_ohlcv(bars, seed)
+    values = ohlcv[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+    indicators = compute_indicators(values, nwe_length=bars, h=8, mult=3, supertrend_length=7)
+    return ohlcv, values, indicators
+
+
+class TestMarketData(TestCase):
+    def test_compact_tail(self):
+        ohlcv, values, indicators = make_inputs(seed=0)
+        full = ohlcv.copy()
+        full[INDICATOR_COLUMNS] = indicators
+        market_data = make_market_data(ohlcv.index.asi8 // 10 ** 6, values, indicators, bars=50)
+
+        self.assertEqual(len(market_data), 50)
+        self.assertEqual(market_data.values.dtype, np.float32)
+        self.assertEqual(market_data.last_time, int(ohlcv.index[-1].value // 10 ** 6))
+        # последний бар хранится без потери точности, остальные - с точностью float32
+        np.testing.assert_array_equal(market_data.get_last(PANEL_COLUMNS), full[PANEL_COLUMNS].to_numpy()[-1])
+        np.testing.assert_allclose(market_data.get_columns(MARKET_DATA_COLUMNS),
+                                   full[MARKET_DATA_COLUMNS].tail(50).to_numpy(), rtol=1e-6)
+        np.testing.assert_array_equal(market_data.to_frame().index, full.tail(50).index)
+        # входные данные не изменяются
+        self.assertListEqual(ohlcv.columns.tolist(), OHLCV_COLUMNS)
+        self.assertLess(market_data.nbytes * 20, full.memory_usage(index=True).sum())
+
+    def test_signal_panel(self):
+        ohlcv, values, indicators = make_inputs(seed=1)
+        full = ohlcv.copy()
+        full[INDICATOR_COLUMNS] = indicators
+        market_data = make_market_data(ohlcv.index.asi8 // 10 ** 6, values, indicators, bars=50)
+        np.testing.assert_array_equal(make_signal_panel({'SYM': market_data}).to_numpy(),
+                                      make_signal_panel({'SYM': full}).to_numpy())
+
+    def test_shared_times(self):
+        shared_times = SharedTimes(max_size=2)
+        first_ohlcv, first_values, first_indicators = make_inputs(seed=0)
+        second_ohlcv, second_values, second_indicators = make_inputs(seed=1)
+        first = make_market_data(first_ohlcv.index.asi8 // 10 ** 6, first_values, first_indicators, 50,
+                                 shared_times)
+        second = make_market_data(second_ohlcv.index.asi8 // 10 ** 6, second_values, second_indicators, 50,
+                                  shared_times)
+        self.assertIs(first.times, second.times)
+        self.assertFalse(first.times.flags.writeable)
+
+        # символ с пропуском свечи получает свой массив времени
+        times = second_ohlcv.index.asi8 // 10 ** 6
+        times[-25:-1] += 1
+        gapped = make_market_data(times, second_values, second_indicators, 50, shared_times)
+        self.assertIsNot(gapped.times, first.times)
+        np.testing.assert_array_equal(gapped.times, times[-50:])
+
+        for shift in range(1, 4):
+            shared_times.share(first.times + shift)
+        self.assertEqual(len(shared_times.arrays), 2)
+
+
+class TestMemoryBudget(IsolatedAsyncioTestCase):
+    async def test_acquire_waits_for_release(self):
+        budget = MemoryBudget(limit=100)
+        await budget.acquire(60)
+        waiter = asyncio.create_task(budget.acquire(60))
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiter.done())
+
+        budget.release(60)
+        await asyncio.wait_for(waiter, 1)
+        self.assertEqual((budget.used, budget.peak, budget.waits), (60, 60, 1))
+
+        # данные больше лимита пропускаются, если другие не держатся
+        budget.release(60)
+        await asyncio.wait_for(budget.acquire(150), 1)
+        self.assertEqual((budget.used, budget.max_item), (150, 150))
+
+    async def test_without_limit(self):
+        budget = MemoryBudget()
+        for _ in range(10):
+            await budget.acquire(1000)
+        self.assertEqual((budget.peak, budget.peak_items, budget.waits), (10000, 10, 0))
@@ -0,0 +1,99 @@
+import time
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+import aiohttp
+
+from src.cryptach_screener.metrics import Metric, MetricsRegistry, MetricsServer, CONTENT_TYPE
+from src.cryptach_screener.screener.instrumentation import ScreenerMetrics
+from src.cryptach_screener.screener.pipeline import PipelineMetrics, ScanPipeline
+from src.tests.test_scan_pipeline import FakeScan, LONG_ROW, EMPTY_ROW
+
+
+class TestMetricsRegistry(TestCase):
+    def test_prometheus_text_format(self):
+        registry = MetricsRegistry(prefix='app_')
+        requests = registry.counter('requests_total', 'Requests')
+        errors = registry.counter('errors_total', 'Errors', ('stage',))
+        latency = registry.histogram('latency_seconds', 'Latency', ('stage',), buckets=(0.1, 1.))
+        registry.gauge('queue_depth', 'Queue depth', function=lambda: 7)
+
+        requests.inc()
+        requests.inc(2)
+        errors.inc(labels=('fetch',))
+        for value in (0.05, 0.1, 0.5, 3.):
+            latency.observe(value, ('fetch',))
+
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE app_requests_total counter', lines)
+        self.assertIn('app_requests_total 3', lines)
+        self.assertIn('app_errors_total{stage="fetch"} 1', lines)
+        self.assertIn('# TYPE app_latency_seconds histogram', lines)
+        self.assertIn('app_latency_seconds_bucket{stage="fetch",le="0.1"} 2', lines)
+        self.assertIn('app_latency_seconds_bucket{stage="fetch",le="1"} 3', lines)
+        self.assertIn('app_latency_seconds_bucket{stage="fetch",le="+Inf"} 4', lines)
+        self.assertIn('app_latency_seconds_sum{stage="fetch"} 3.65', lines)
+        self.assertIn('app_latency_seconds_count{stage="fetch"} 4', lines)
+        self.assertIn('app_queue_depth 7', lines)
+
+        self.assertRaises(ValueError, registry.counter, 'requests_total', 'Requests')
+
+    def test_metric_requires_samples(self):
+        with self.assertRaises(TypeError):
+            Metric('screener_unknown', 'Metric without samples')
+
+    def test_observe_overhead(self):
+        metrics = ScreenerMetrics()
+        calls = 100000
+        started_at = time.perf_counter()
+        for _ in range(calls):
+            metrics.observe_stage('fetch', 0.01)
+        self.assertLess((time.perf_counter() - started_at) / calls, 5e-6)
+
+
+class TestScreenerMetrics(IsolatedAsyncioTestCase):
+    async def test_iteration_summary(self):
+        metrics = ScreenerMetrics()
+        started = metrics.snapshot()
+
+        with metrics.measure('symbols'):
+            pass
+        with self.assertRaises(ValueError):
+            with metrics.measure('compute'):
+                raise ValueError('broken')
+        metrics.timeouts.inc()
+        metrics.skipped.inc(labels=('no_data',))
+
+        rows = {'LONGUSDT': LONG_ROW, **{f'SYM{i}USDT': EMPTY_ROW for i in range(20)}}
+        scan = FakeScan(rows)
+        pipeline_metrics = await ScanPipeline(scan.fetch, scan.compute, scan.handle_signal,
+                                              observe_stage=metrics.observe_stage).run(list(rows))
+
+        summary = metrics.finish_iteration(started, pipeline_metrics, ['1h'], duration=1.5)
+        self.assertEqual(summary['symbols'], len(rows))
+        self.assertEqual(summary['checked'], len(rows))
+        self.assertEqual(summary['signals'], 1)
+        self.assertEqual((summary['timeouts'], summary['errors'], summary['skipped']), (1, 1, 1))
+        self.assertEqual(summary['stages']['symbols']['count'], 1)
+        self.assertEqual(summary['stages']['compute']['count'], 1)
+        self.assertGreaterEqual(summary['stages']['evaluate']['count'], 1)
+        self.assertNotIn('render', summary['stages'])
+
+        # следующая сводка считается только от своего снимка
+        summary = metrics.finish_iteration(metrics.snapshot(), PipelineMetrics(), ['1h'], duration=0.1)
+        self.assertEqual((summary['errors'], summary['stages']), (0, {}))
+        self.assertEqual(metrics.iterations.get(), 2)
+
+    async def test_metrics_endpoint(self):
+        metrics = ScreenerMetrics()
+        metrics.observe_stage('fetch', 0.2)
+        server = MetricsServer(metrics.registry, port=0)
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f'http://{server.host}:{server.port}/metrics') as resp:
+                    self.assertEqual(resp.status, 200)
+                    self.assertEqual(resp.headers['Content-Type'], CONTENT_TYPE)
+                    body = await resp.text()
+        finally:
+            await server.stop()
+        self.assertIn('screener_stage_duration_seconds_count{stage="fetch"} 1', body.splitlines())
@@ -0,0 +1,63 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from src.cryptach_screener.indicators.nadaraya_watson import nadaraya_watson_envelope, nadaraya_watson_bands, \
+    get_nwe_weights
+
+
+def reference_envelope(close_array: np.ndarray, h: float, mult: float, length: int):
+    """
+    Прежняя реализация NWE через двойной цикл, используется как эталон
+    """
+    y = np.zeros(length)
+    estimation = 0
+    for i, close in enumerate(close_array):
+        current_weight = 0
+        cumulative_weight = 0
+        for j, other_close in enumerate(close_array):
+            w = np.exp(-(np.power(i - j, 2) / (h * h * 2)))
+            current_weight += other_close * w
+            cumulative_weight += w
+        y2 = current_weight / cumulative_weight
+        estimation += np.abs(y2 - close)
+        y[i] = y2
+    mae = estimation / length * mult
+    return y + mae, y - mae
+
+
+def make_close(length: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+
+
+class TestNadarayaWatsonEnvelope(TestCase):
+    def test_same_as_reference(self):
+        for length, h, mult in [(50, 8, 3), (120, 5, 3), (200, 8, 2.5)]:
+            close = make_close(length, seed=length)
+            data = pd.DataFrame({'Close': close})
+            result = nadaraya_watson_envelope(data, h=h, mult=mult, length=length)
+            upper, lower = reference_envelope(close, h, mult, length)
+            np.testing.assert_allclose(result['NWE_upper'].to_numpy(), upper, rtol=1e-10)
+            np.testing.assert_allclose(result['NWE_lower'].to_numpy(), lower, rtol=1e-10)
+
+    def test_stacked_symbols(self):
+        length = 100
+        closes = np.stack([make_close(length, seed) for seed in range(4)])
+        upper, lower = nadaraya_watson_bands(closes, h=8, mult=3, length=length)
+        self.assertEqual(upper.shape, closes.shape)
+        for row, close in enumerate(closes):
+            single_upper, single_lower = nadaraya_watson_bands(close, h=8, mult=3, length=length)
+            np.testing.assert_allclose(upper[row], single_upper, rtol=1e-12)
+            np.testing.assert_allclose(lower[row], single_lower, rtol=1e-12)
+
+    def test_weights_are_cached(self):
+        self.assertIs(get_nwe_weights(8, 64), get_nwe_weights(8, 64))
+        np.testing.assert_allclose(get_nwe_weights(8, 64).sum(axis=1), 1)
+
+    def test_input_is_not_modified(self):
+        data = pd.DataFrame({'Close': make_close(50, seed=0)})
+        result = nadaraya_watson_envelope(data, h=8, mult=3, length=50)
+        self.assertListEqual(data.columns.tolist(), ['Close'])
+        self.assertListEqual(result.columns.tolist(), ['Close', 'NWE_upper', 'NWE_lower'])
@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from src.cryptach_screener.data_loader.resample import resample_candles, get_resample_ratio
+
+MINUTE = 60 * 1000
+
+
+def make_candles(first_open_time: int, count: int, timeframe_ms: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    times = first_open_time + np.arange(count, dtype=np.int64) * timeframe_ms
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    open_price = close + rng.normal(0, 1, count)
+    values = np.column_stack([open_price, np.maximum(open_price, close) + 1, np.minimum(open_price, close) - 1,
+                              close, rng.uniform(1, 10, count)])
+    return times, values
+
+
+class TestResampleCandles(TestCase):
+    def test_same_as_pandas_resample(self):
+        # начинаю с середины часа, первая неполная свеча должна отброситься
+        times, values = make_candles(1_700_000_000_000 // (60 * MINUTE) * 60 * MINUTE + 30 * MINUTE, 103,
+                                     30 * MINUTE)
+        resampled_times, resampled = resample_candles(times, values, '1h')
+
+        df = pd.DataFrame(values, index=pd.to_datetime(times, unit='ms'),
+                          columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        expected = df.iloc[1:].resample('1h').agg({'Open': 'first', 'High': 'max', 'Low': 'min',
+                                                   'Close': 'last', 'Volume': 'sum'})
+        np.testing.assert_array_equal(pd.to_datetime(resampled_times, unit='ms'), expected.index)
+        np.testing.assert_allclose(resampled, expected.to_numpy())
+
+    def test_last_candle_is_forming(self):
+        times, values = make_candles(0, 9, 30 * MINUTE)
+        resampled_times, resampled = resample_candles(times, values, '4h')
+        self.assertListEqual(resampled_times.tolist(), [0, 4 * 60 * MINUTE])
+        self.assertEqual(resampled[-1, 3], values[-1, 3])
+
+    def test_resample_ratio(self):
+        self.assertEqual(get_resample_ratio('30m', '4h'), 8)
+        self.assertRaises(ValueError, get_resample_ratio, '1h', '30m')
+        self.assertRaises(ValueError, get_resample_ratio, '1h', '90m')
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.cryptach_screener.data_loader.rate_limiter import RateLimitExceeded
+from src.cryptach_screener.screener.panel import PANEL_COLUMNS, evaluate_signal_panel
+from src.cryptach_screener.screener.pipeline import ScanPipeline
+
+LONG_ROW = {'Open': 110., 'Close': 101., 'NWE_upper': 200., 'NWE_lower': 100., 's_long': 99., 's_short': 0.}
+SHORT_ROW = {'Open': 90., 'Close': 99., 'NWE_upper': 100., 'NWE_lower': 0., 's_long': 0., 's_short': 101.}
+EMPTY_ROW = {'Open': 100., 'Close': 100., 'NWE_upper': 110., 'NWE_lower': 90., 's_long': 0., 's_short': 0.}
+
+
+class FakeScan(object):
+    def __init__(self, rows: dict[str, dict], delays: dict[str, float] = None, rate_limits: dict[str, int] = None):
+        self.rows = rows
+        self.delays = delays or {}
+        self.rate_limits = rate_limits or {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.signals: list[tuple[str, str, bool, float]] = []
+
+    async def fetch(self, symbol: str) -> dict[str, pd.DataFrame]:
+        await asyncio.sleep(self.delays.get(symbol, 0))
+        if self.rate_limits.get(symbol):
+            self.rate_limits[symbol] -= 1
+            raise RateLimitExceeded('rate limited', 0)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return {'1h': pd.DataFrame([self.rows[symbol]], columns=PANEL_COLUMNS)}
+
+    async def compute(self, ohlcv: pd.DataFrame) -> pd.DataFrame:
+        await asyncio.sleep(0.001)
+        return ohlcv
+
+    async def handle_signal(self, symbol: str, timeframe: str, market_data: pd.DataFrame, long_signal: bool):
+        self.signals.append((symbol, timeframe, long_signal, time.monotonic()))
+
+
+class TestScanPipeline(IsolatedAsyncioTestCase):
+    async def test_signals_of_all_symbols(self):
+        rows = {'LONGUSDT': LONG_ROW, 'SHORTUSDT': SHORT_ROW, **{f'SYM{i}USDT': EMPTY_ROW for i in range(50)}}
+        scan = FakeScan(rows)
+        metrics = await ScanPipeline(scan.fetch, scan.compute, scan.handle_signal, fetch_workers=8).run(list(rows))
+        self.assertListEqual(sorted(signal[:3] for signal in scan.signals),
+                             [('LONGUSDT', '1h', True), ('SHORTUSDT', '1h', False)])
+        self.assertEqual(metrics.checked, len(rows))
+        self.assertEqual(metrics.signals, 2)
+
+    async def test_slow_symbol_does_not_delay_signals(self):
+        rows = {'LONGUSDT': LONG_ROW, 'SLOWUSDT': EMPTY_ROW}
+        scan = FakeScan(rows, delays={'SLOWUSDT': 0.5})
+        started_at = time.monotonic()
+        metrics = await ScanPipeline(scan.fetch, scan.compute, scan.handle_signal).run(list(rows))
+        self.assertLess(scan.signals[0][3] - started_at, 0.25)
+        self.assertLess(metrics.first_signal_latency, 0.25)
+        self.assertGreaterEqual(metrics.duration, 0.5)
+
+    async def test_rate_limited_symbols_are_requeued(self):
+        rows = {'LONGUSDT': LONG_ROW, 'SHORTUSDT': SHORT_ROW}
+        scan = FakeScan(rows, rate_limits={'LONGUSDT': 2, 'SHORTUSDT': 5})
+        metrics = await ScanPipeline(scan.fetch, scan.compute, scan.handle_signal,
+                                     max_fetch_rounds=3).run(list(rows))
+        self.assertListEqual([signal[0] for signal in scan.signals], ['LONGUSDT'])
+        self.assertEqual(metrics.requeued, 4)
+        self.assertEqual(metrics.skipped, 1)
+
+    async def test_backpressure_bounds_queued_frames(self):
+        rows = {f'SYM{i}USDT': EMPTY_ROW for i in range(200)}
+        scan = FakeScan(rows)
+
+        async def slow_compute(ohlcv: pd.DataFrame) -> pd.DataFrame:
+            await asyncio.sleep(0.002)
+            scan.in_flight -= 1
+            return ohlcv
+
+        metrics = await ScanPipeline(scan.fetch, slow_compute, scan.handle_signal, fetch_workers=20,
+                                     compute_workers=1, queue_size=4).run(list(rows))
+        self.assertEqual(metrics.checked, len(rows))
+        # в ожидании расчёта не больше очереди и по одному датафрейму у воркеров загрузки
+        self.assertLessEqual(scan.max_in_flight, 4 + 20 + 1)
+
+    async def test_memory_limit_bounds_held_market_data(self):
+        rows = {'LONGUSDT': LONG_ROW, **{f'SYM{i}USDT': EMPTY_ROW for i in range(100)}}
+        scan = FakeScan(rows)
+        frame_size = int(pd.DataFrame([EMPTY_ROW], columns=PANEL_COLUMNS).memory_usage(index=True).sum())
+        metrics = await ScanPipeline(scan.fetch, scan.compute, scan.handle_signal, compute_workers=4,
+                                     memory_limit=3 * frame_size).run(list(rows))
+        self.assertEqual(metrics.checked, len(rows))
+        self.assertEqual([signal[0] for signal in scan.signals], ['LONGUSDT'])
+        self.assertLessEqual(metrics.peak_memory, 3 * frame_size)
+        self.assertEqual(metrics.max_symbol_memory, frame_size)
+        self.assertGreater(metrics.memory_waits, 0)
+
+    async def test_failed_check_releases_its_batch(self):
+        rows = {'LONGUSDT': LONG_ROW, 'SHORTUSDT': SHORT_ROW, **{f'SYM{i}USDT': EMPTY_ROW for i in range(50)}}
+        scan = FakeScan(rows)
+        calls = 0
+
+        def evaluate_once_broken(panel):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise ValueError('broken panel')
+            return evaluate_signal_panel(panel)
+
+        pipeline = ScanPipeline(scan.fetch, scan.compute, scan.handle_signal, batch_size=4, memory_limit=10 ** 9)
+        with patch('src.cryptach_screener.screener.pipeline.evaluate_signal_panel', evaluate_once_broken):
+            metrics = await asyncio.wait_for(pipeline.run(list(rows)), 5)
+        self.assertEqual(metrics.checked, len(rows))
+        self.assertGreater(calls, 1)
+        self.assertEqual(pipeline.memory.used, 0)
+        self.assertEqual(pipeline.memory.items, 0)
+
+    async def test_dead_worker_stops_the_run(self):
+        rows = {f'SYM{i}USDT': EMPTY_ROW for i in range(200)}
+        scan = FakeScan(rows)
+        pipeline = ScanPipeline(scan.fetch, scan.compute, scan.handle_signal, queue_size=4)
+
+        async def broken_batch(check_queue: asyncio.Queue):
+            raise RuntimeError('checker is broken')
+
+        with patch.object(pipeline, 'get_batch', broken_batch):
+            with self.assertRaisesRegex(RuntimeError, 'checker is broken'):
+                await asyncio.wait_for(pipeline.run(list(rows)), 5)
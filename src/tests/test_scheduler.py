@@ -0,0 +1,73 @@
+import asyncio
+from unittest import TestCase
+
+from src.cryptach_screener.screener.scheduler import CandleScheduler
+
+HOUR = 3600.
+DAY_START = 1_700_006_400.  # полночь UTC
+
+
+class FakeClock(object):
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCandleScheduler(TestCase):
+    def make_scheduler(self, now: float, timeframes: list[str] = None) -> tuple[CandleScheduler, FakeClock]:
+        clock = FakeClock(now)
+        scheduler = CandleScheduler(timeframes or ['30m', '1h'], run_scan=None, settle_delay=5, clock=clock)
+        scheduler.reset()
+        return scheduler, clock
+
+    def test_deadlines_aligned_to_candle_close(self):
+        scheduler, _ = self.make_scheduler(DAY_START + 10 * 60)
+        self.assertEqual(scheduler.deadlines, {'30m': DAY_START + 1800 + 5, '1h': DAY_START + HOUR + 5})
+
+        # до settle_delay свеча ещё считается незакрытой
+        scheduler, _ = self.make_scheduler(DAY_START + 2)
+        self.assertEqual(scheduler.deadlines['1h'], DAY_START + 5)
+
+    def test_coinciding_timeframes_are_due_together(self):
+        scheduler, _ = self.make_scheduler(DAY_START + 10 * 60)
+        self.assertEqual(scheduler.get_due_timeframes(DAY_START + 1805), ['30m'])
+        scheduler.advance(['30m'], DAY_START + 1810)
+        self.assertEqual(scheduler.get_due_timeframes(DAY_START + HOUR + 5), ['30m', '1h'])
+
+    def test_overrun_skips_missed_scans(self):
+        scheduler, _ = self.make_scheduler(DAY_START + 10 * 60)
+        # проверка 30m закончилась через 2 часа после своего дедлайна
+        scheduler.advance(['30m'], DAY_START + 1805 + 2 * HOUR)
+        self.assertEqual(scheduler.deadlines['30m'], DAY_START + 2 * HOUR + 1800 + 5)
+        self.assertEqual(scheduler.skipped_scans, 3)
+
+        scheduler.advance(['1h'], DAY_START + HOUR + 10)
+        self.assertEqual(scheduler.deadlines['1h'], DAY_START + 2 * HOUR + 5)
+        self.assertEqual(scheduler.skipped_scans, 3)
+
+    def test_run_scans_each_close_once(self):
+        clock = FakeClock(DAY_START + 10 * 60)
+        scans = []
+
+        async def run_scan(timeframes: list[str]):
+            scans.append((clock.now, timeframes))
+            if len(scans) == 3:
+                raise asyncio.CancelledError()
+
+        async def fake_sleep(delay: float):
+            clock.now += delay
+
+        scheduler = CandleScheduler(['30m', '1h'], run_scan, settle_delay=5, clock=clock, sleep=fake_sleep)
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(scheduler.run())
+
+        self.assertEqual(scans, [
+            (DAY_START + 1805, ['30m']),
+            (DAY_START + HOUR + 5, ['30m', '1h']),
+            (DAY_START + HOUR + 1805, ['30m']),
+        ])
+
+    def test_empty_timeframes_are_rejected(self):
+        self.assertRaises(ValueError, CandleScheduler, [], run_scan=None)
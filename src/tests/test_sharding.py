@@ -0,0 +1,210 @@
+import asyncio
+import dataclasses
+import queue
+from unittest import TestCase, IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from src.cryptach_screener.loadtest.harness import LoadTestOptions, make_config
+from src.cryptach_screener.loadtest.mock_server import MockExchange, MockSettings
+from src.cryptach_screener.screener.screener import Screener
+from src.cryptach_screener.screener.sharding import assign_shards, ShardCoordinator, ShardProgress, ShardSignal, \
+    Heartbeat, ScanTask, ShardBroker, ShardWorker, get_shard_authkey
+
+SYMBOLS = [f'SYM{i}USDT' for i in range(300)]
+
+
+class FakeBroker(object):
+    def __init__(self):
+        self.task_queues: dict[str, queue.Queue] = {}
+        self.result_queue = queue.Queue()
+
+    def get_task_queue(self, worker_id: str) -> queue.Queue:
+        return self.task_queues.setdefault(worker_id, queue.Queue())
+
+    def get_result_queue(self) -> queue.Queue:
+        return self.result_queue
+
+
+class TestAssignShards(TestCase):
+    def test_assignment_is_stable_and_balanced(self):
+        shards = assign_shards(SYMBOLS, ['a', 'b', 'c'])
+        reordered = assign_shards(list(reversed(SYMBOLS)), ['c', 'a', 'b'])
+        self.assertEqual({worker_id: set(shard) for worker_id, shard in shards.items()},
+                         {worker_id: set(shard) for worker_id, shard in reordered.items()})
+        self.assertEqual(sorted(sum(shards.values(), [])), sorted(SYMBOLS))
+        for shard in shards.values():
+            self.assertGreater(len(shard), len(SYMBOLS) / 6)
+
+    def test_only_symbols_of_removed_worker_move(self):
+        shards = assign_shards(SYMBOLS, ['a', 'b', 'c'])
+        rebalanced = assign_shards(SYMBOLS, ['a', 'b'])
+        for worker_id in ('a', 'b'):
+            self.assertTrue(set(shards[worker_id]) <= set(rebalanced[worker_id]))
+
+
+class TestShardCoordinator(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.broker = FakeBroker()
+        self.posted = []
+
+        async def fetch_symbols():
+            return SYMBOLS
+
+        def post_signal(long_signal, symbol, timeframe, image):
+            self.posted.append((symbol, timeframe, long_signal))
+
+        self.coordinator = ShardCoordinator(self.broker, ['1h'], fetch_symbols, post_signal,
+                                            heartbeat_timeout=0.2, progress_interval=0.05)
+        self.results = asyncio.create_task(self.coordinator.run_results())
+
+    async def asyncTearDown(self) -> None:
+        self.results.cancel()
+        await asyncio.gather(self.results, return_exceptions=True)
+
+    async def run_worker(self, worker_id: str, signal_symbols: list[str], alive: asyncio.Event):
+        """
+        Воркер, который отвечает, пока выставлен alive
+        """
+        task_queue = self.broker.get_task_queue(worker_id)
+        while alive.is_set():
+            self.broker.result_queue.put(Heartbeat(worker_id))
+            try:
+                task: ScanTask = task_queue.get_nowait()
+            except queue.Empty:
+                await asyncio.sleep(0.02)
+                continue
+            for symbol in task.symbols:
+                if symbol in signal_symbols:
+                    self.broker.result_queue.put(ShardSignal(worker_id, task.task_id, task.scan_id, symbol, '1h',
+                                                             True, candle_time=0))
+            self.broker.result_queue.put(ShardProgress(worker_id, task.task_id, task.scan_id, len(task.symbols),
+                                                       len(task.symbols), 0, done=True))
+
+    async def wait_for_workers(self, count: int):
+        while len(self.coordinator.get_alive_workers()) < count:
+            await asyncio.sleep(0.01)
+
+    async def test_scan_is_split_between_workers(self):
+        alive = asyncio.Event()
+        alive.set()
+        workers = [asyncio.create_task(self.run_worker(worker_id, ['SYM1USDT', 'SYM2USDT'], alive))
+                   for worker_id in ('a', 'b', 'c')]
+        await self.wait_for_workers(3)
+
+        await asyncio.wait_for(self.coordinator.run_scan(['1h']), 5)
+        alive.clear()
+        await asyncio.gather(*workers)
+
+        self.assertEqual(sorted(self.posted), [('SYM1USDT', '1h', True), ('SYM2USDT', '1h', True)])
+        self.assertEqual(self.coordinator.rebalances, 0)
+        self.assertFalse(self.coordinator.pending)
+
+    async def test_dead_worker_is_rebalanced_without_duplicates(self):
+        alive = asyncio.Event()
+        alive.set()
+        signal_symbols = SYMBOLS[:50]
+        workers = [asyncio.create_task(self.run_worker('a', signal_symbols, alive)),
+                   asyncio.create_task(self.run_worker('b', signal_symbols, alive))]
+        await self.wait_for_workers(2)
+        # воркер c успевает забрать задачу и умирает, не ответив
+        self.coordinator.heartbeats['c'] = self.coordinator.heartbeats['a']
+
+        await asyncio.wait_for(self.coordinator.run_scan(['1h']), 5)
+        alive.clear()
+        await asyncio.gather(*workers)
+
+        self.assertEqual(self.coordinator.rebalances, 1)
+        self.assertEqual(sorted(symbol for symbol, _, _ in self.posted), sorted(signal_symbols))
+
+        # сигнал той же свечи от второго воркера не отправляется повторно
+        self.coordinator.handle_result(ShardSignal('b', 0, self.coordinator.scan_id, signal_symbols[0], '1h',
+                                                   True, candle_time=0))
+        self.assertEqual(len(self.posted), len(signal_symbols))
+        self.assertEqual(self.coordinator.duplicates, 1)
+
+    async def test_stale_tasks_are_drained(self):
+        # воркер c жив, но не берёт задачи: проверка заканчивается по scan_timeout
+        self.coordinator.heartbeats['c'] = float('inf')
+        self.coordinator.scan_timeout = 0.05
+
+        await asyncio.wait_for(self.coordinator.run_scan(['1h']), 5)
+        self.assertTrue(self.coordinator.pending)
+        self.assertTrue(self.broker.get_task_queue('c').empty())
+
+        # задачи, попавшие в очередь после конца проверки, убираются перед следующей
+        self.broker.get_task_queue('c').put(ScanTask(0, self.coordinator.scan_id, ['1h'], SYMBOLS))
+        await asyncio.wait_for(self.coordinator.run_scan(['1h']), 5)
+        tasks = []
+        while not self.broker.get_task_queue('c').empty():
+            tasks.append(self.broker.get_task_queue('c').get_nowait())
+        self.assertTrue(all(task.scan_id == self.coordinator.scan_id for task in tasks))
+
+
+class TestShardAuthkey(TestCase):
+    def test_key_is_required(self):
+        config = make_config('http://127.0.0.1:1', LoadTestOptions())
+        self.assertRaises(ValueError, get_shard_authkey, config)
+        self.assertEqual(len(get_shard_authkey(config, allow_generated=True)), 64)
+
+        public = dataclasses.replace(config, shard_broker_address='0.0.0.0:50555')
+        self.assertRaises(ValueError, get_shard_authkey, public, allow_generated=True)
+        self.assertEqual(get_shard_authkey(dataclasses.replace(public, shard_authkey='secret')), 'secret')
+
+
+class TestShardWorker(IsolatedAsyncioTestCase):
+    @staticmethod
+    async def wait_for_duplicate(coordinator: ShardCoordinator):
+        while not coordinator.duplicates:
+            await asyncio.sleep(0.01)
+
+    async def test_scan_through_real_broker(self):
+        exchange = MockExchange(MockSettings(symbols=6))
+        await exchange.start()
+        self.addAsyncCleanup(exchange.stop)
+
+        broker = ShardBroker(address=('127.0.0.1', 0), authkey=b'test')
+        broker.start()
+        self.addCleanup(broker.shutdown)
+        client = ShardBroker(address=broker.address, authkey=b'test')
+        client.connect()
+
+        screener = Screener(make_config(exchange.url, LoadTestOptions(indicator_executor='inline')))
+        screener.chart_renderer.warm_up = lambda: None
+
+        async def render(market_data, chart_title):
+            return b'\xff\xd8'
+
+        screener.chart_renderer.render = render
+        worker = ShardWorker(screener, client, 'w1', heartbeat_interval=0.05, progress_interval=0.05)
+
+        posted = []
+
+        async def fetch_symbols():
+            return exchange.symbols
+
+        def post_signal(long_signal, symbol, timeframe, image):
+            posted.append((symbol, timeframe, long_signal, image))
+            # символ проверяется повторно, как после перебалансировки
+            broker.get_task_queue('w1').put(ScanTask(0, coordinator.scan_id, ['1h'], [symbol]))
+
+        coordinator = ShardCoordinator(broker, ['1h'], fetch_symbols, post_signal,
+                                       heartbeat_timeout=10, progress_interval=0.1, scan_timeout=60)
+        results = asyncio.create_task(coordinator.run_results())
+        with patch('src.cryptach_screener.screener.pipeline.evaluate_signal_panel',
+                   lambda panel: ([symbol for symbol in panel.index if symbol == 'SYM1USDT'], [])):
+            running = asyncio.create_task(worker.run())
+            try:
+                while not coordinator.get_alive_workers():
+                    await asyncio.sleep(0.01)
+                await asyncio.wait_for(coordinator.run_scan(['1h']), 30)
+                await asyncio.wait_for(self.wait_for_duplicate(coordinator), 10)
+            finally:
+                broker.get_task_queue('w1').put(None)
+                await asyncio.wait_for(running, 10)
+                results.cancel()
+                await asyncio.gather(results, return_exceptions=True)
+                await (await screener.telegram_poster.bot.get_session()).close()
+
+        self.assertFalse(coordinator.pending)
+        self.assertEqual(posted, [('SYM1USDT', '1h', True, b'\xff\xd8')])
+        self.assertEqual(coordinator.duplicates, 1)
@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from src.cryptach_screener.screener.panel import make_signal_panel, evaluate_signal_panel, PANEL_COLUMNS
+from src.cryptach_screener.screener.screener import Screener
+
+
+def make_market_data(rng: np.random.Generator) -> pd.DataFrame:
+    close = rng.uniform(95, 105)
+    nwe_lower = close - rng.uniform(-1, 2)
+    nwe_upper = close + rng.uniform(-1, 2)
+    row = {
+        'Open': close + rng.uniform(-3, 3),
+        'Close': close,
+        'NWE_upper': nwe_upper,
+        'NWE_lower': nwe_lower,
+        's_long': rng.choice([np.nan, 0., nwe_lower - 1, nwe_lower + 1]),
+        's_short': rng.choice([np.nan, 0., nwe_upper - 1, nwe_upper + 1]),
+    }
+    return pd.DataFrame([row, row], columns=PANEL_COLUMNS)
+
+
+class TestSignalPanel(TestCase):
+    def test_same_as_single_symbol_checks(self):
+        rng = np.random.default_rng(0)
+        market_data = {f'SYM{i}USDT': make_market_data(rng) for i in range(2000)}
+        market_data['EMPTYUSDT'] = None
+
+        long_symbols, short_symbols = evaluate_signal_panel(make_signal_panel(market_data))
+
+        expected_long = [symbol for symbol, data in market_data.items()
+                         if data is not None and Screener.check_to_long(data)]
+        expected_short = [symbol for symbol, data in market_data.items()
+                          if data is not None and not Screener.check_to_long(data) and Screener.check_to_short(data)]
+        self.assertTrue(expected_long and expected_short)
+        self.assertListEqual(long_symbols, expected_long)
+        self.assertListEqual(short_symbols, expected_short)
+
+    def test_empty_panel(self):
+        self.assertEqual(evaluate_signal_panel(make_signal_panel({'EMPTYUSDT': None})), ([], []))
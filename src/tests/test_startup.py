@@ -0,0 +1,23 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+from src.cryptach_screener.startup import StartupTimer
+
+
+class TestStartup(TestCase):
+    def test_report_lists_phases(self):
+        timer = StartupTimer()
+        with timer.measure('import screener'):
+            pass
+        with timer.measure('warm up indicators') as phase:
+            phase.note = 'numba kernels from disk cache: 1/1'
+        report = timer.report()
+        self.assertIn('import screener 0.00s', report)
+        self.assertIn('warm up indicators 0.00s (numba kernels from disk cache: 1/1)', report)
+
+    def test_screener_does_not_import_heavy_modules(self):
+        code = 'import sys; import src.cryptach_screener.screener.screener; ' \
+               'print(*[module in sys.modules for module in ("numba", "plotly.graph_objects", "ccxt")])'
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split(), ['False', 'False', 'False'])
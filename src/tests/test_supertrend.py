@@ -0,0 +1,94 @@
+import sys
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from src.cryptach_screener.indicators.supertrend import supertrend_batch, SupertrendState
+
+
+def reference_supertrend(high: pd.Series, low: pd.Series, close: pd.Series, length: int, multiplier: float):
+    """
+    Supertrend в том виде, как его считает pandas_ta (без talib), используется как эталон
+    """
+    high_low_range = high - low
+    if high_low_range.eq(0).any():
+        high_low_range += sys.float_info.epsilon
+    prev_close = close.shift(1)
+    true_range = pd.concat([high_low_range, high - prev_close, prev_close - low], axis=1).abs().max(axis=1)
+    true_range.iloc[:1] = np.nan
+    atr = true_range.ewm(alpha=1 / length, min_periods=length).mean()
+
+    hl2 = (high + low) / 2
+    upperband = (hl2 + multiplier * atr).to_numpy()
+    lowerband = (hl2 - multiplier * atr).to_numpy()
+    close = close.to_numpy()
+
+    m = close.size
+    dir_, trend = [1] * m, [0.] * m
+    long, short = [np.nan] * m, [np.nan] * m
+    for i in range(1, m):
+        if close[i] > upperband[i - 1]:
+            dir_[i] = 1
+        elif close[i] < lowerband[i - 1]:
+            dir_[i] = -1
+        else:
+            dir_[i] = dir_[i - 1]
+            if dir_[i] > 0 and lowerband[i] < lowerband[i - 1]:
+                lowerband[i] = lowerband[i - 1]
+            if dir_[i] < 0 and upperband[i] > upperband[i - 1]:
+                upperband[i] = upperband[i - 1]
+        if dir_[i] > 0:
+            trend[i] = long[i] = lowerband[i]
+        else:
+            trend[i] = short[i] = upperband[i]
+    return np.array(trend), np.array(dir_, dtype=np.float64), np.array(long), np.array(short)
+
+
+def make_ohlc(bars: int, seed: int):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    high = close * (1 + rng.uniform(0, 0.01, bars))
+    low = close * (1 - rng.uniform(0, 0.01, bars))
+    return high, low, close
+
+
+class TestSupertrend(TestCase):
+    def test_same_as_reference(self):
+        for seed in range(3):
+            high, low, close = make_ohlc(300, seed)
+            result = supertrend_batch(high, low, close, length=7, multiplier=3.0)
+            expected = reference_supertrend(pd.Series(high), pd.Series(low), pd.Series(close), 7, 3.0)
+            for column, expected_column in zip(result, expected):
+                np.testing.assert_allclose(column, expected_column, rtol=1e-12)
+
+    def test_zero_range_candle(self):
+        high, low, close = make_ohlc(100, seed=10)
+        high[50] = low[50] = close[50]
+        result = supertrend_batch(high, low, close, length=7, multiplier=3.0)
+        expected = reference_supertrend(pd.Series(high), pd.Series(low), pd.Series(close), 7, 3.0)
+        for column, expected_column in zip(result, expected):
+            np.testing.assert_allclose(column, expected_column, rtol=1e-12)
+
+    def test_stacked_symbols(self):
+        stacked = [np.stack(arrays) for arrays in zip(*[make_ohlc(200, seed) for seed in range(4)])]
+        result = supertrend_batch(*stacked)
+        for symbol in range(4):
+            single = supertrend_batch(*[array[symbol] for array in stacked])
+            for column, single_column in zip(result, single):
+                np.testing.assert_array_equal(column[symbol], single_column)
+
+    def test_incremental_update(self):
+        high, low, close = [np.stack(arrays) for arrays in zip(*[make_ohlc(200, seed) for seed in range(3)])]
+        full = supertrend_batch(high, low, close)
+
+        _, state = supertrend_batch(high[:, :-1], low[:, :-1], close[:, :-1], return_state=True)
+        last_bar = state.update(high[:, -1], low[:, -1], close[:, -1])
+        for column, full_column in zip(last_bar, full):
+            np.testing.assert_array_equal(column, full_column[:, -1])
+
+    def test_state_of_new_symbols(self):
+        state = SupertrendState(2)
+        trend, direction, long, short = state.update(np.array([2., 3.]), np.array([1., 2.]), np.array([1.5, 2.5]))
+        np.testing.assert_array_equal(trend, [0., 0.])
+        np.testing.assert_array_equal(direction, [1., 1.])
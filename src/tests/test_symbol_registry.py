@@ -0,0 +1,49 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from src.cryptach_screener.data_loader.rate_limiter import WeightRateLimiter
+from src.cryptach_screener.data_loader.symbol_registry import SymbolRegistry
+from src.cryptach_screener.loadtest.exchange_data import make_market
+from src.tests.fake_binance import FakeBinance
+
+
+class TestSymbolRegistry(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.fake_binance = FakeBinance()
+        await self.fake_binance.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.fake_binance.stop()
+
+    def make_registry(self, ttl: float) -> SymbolRegistry:
+        return SymbolRegistry(WeightRateLimiter(2400, 10), base_url=self.fake_binance.url, ttl=ttl)
+
+    async def test_only_trading_usdt_perpetuals(self):
+        registry = self.make_registry(ttl=60)
+        self.assertListEqual(await registry.get_symbols(), ['BTCUSDT', 'ETHUSDT'])
+
+    async def test_symbols_are_cached_until_ttl(self):
+        registry = self.make_registry(ttl=60)
+        for _ in range(5):
+            await registry.get_symbols()
+        self.assertEqual(self.fake_binance.exchange_info_requests, 1)
+
+    async def test_expired_symbols_are_refreshed_in_background(self):
+        registry = self.make_registry(ttl=0.05)
+        await registry.get_symbols()
+        self.fake_binance.markets.append(make_market('XRPUSDT'))
+        await asyncio.sleep(0.06)
+
+        # пока идёт обновление, проверка получает прежний список
+        self.assertListEqual(await registry.get_symbols(), ['BTCUSDT', 'ETHUSDT'])
+        await registry.refresh_task
+        self.assertListEqual(await registry.get_symbols(), ['BTCUSDT', 'ETHUSDT', 'XRPUSDT'])
+        self.assertEqual(self.fake_binance.exchange_info_requests, 2)
+
+    async def test_failed_refresh_keeps_known_symbols(self):
+        registry = self.make_registry(ttl=0)
+        await registry.get_symbols()
+        await self.fake_binance.stop()
+        await registry.refresh()
+        self.assertListEqual(registry.symbols, ['BTCUSDT', 'ETHUSDT'])
+        await self.fake_binance.start()
@@ -0,0 +1,68 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from aiogram.utils.exceptions import RetryAfter
+
+from src.cryptach_screener.telegram.outbox import TelegramOutbox
+
+
+class FakePoster(object):
+    def __init__(self, flood_waits: int = 0):
+        self.flood_waits = flood_waits
+        self.messages = []
+
+    async def send_message(self, channel_id, text):
+        if self.flood_waits:
+            self.flood_waits -= 1
+            raise RetryAfter(0)
+        self.messages.append((channel_id, text))
+
+    async def post_signal(self, channel_id, direction, symbol, timeframe, image=None):
+        await asyncio.sleep(0.05)
+        self.messages.append((channel_id, symbol))
+
+
+class TestTelegramOutbox(IsolatedAsyncioTestCase):
+    def make_outbox(self, poster: FakePoster, **kwargs) -> TelegramOutbox:
+        return TelegramOutbox(poster, admins=[1, 2], chat_interval=0, channel_interval=0, global_rate=1000,
+                              **kwargs)
+
+    async def test_enqueue_does_not_wait_for_delivery(self):
+        poster = FakePoster()
+        outbox = self.make_outbox(poster)
+        for i in range(5):
+            self.assertTrue(outbox.post_signal('-100', 'LONG', f'SYM{i}USDT', '1h'))
+        self.assertEqual(poster.messages, [])
+        self.assertEqual(outbox.depth, 5)
+
+        await outbox.stop()
+        self.assertEqual([symbol for _, symbol in poster.messages], [f'SYM{i}USDT' for i in range(5)])
+        self.assertEqual(outbox.get_metrics()['sent'], 5)
+
+    async def test_retry_after_is_retried(self):
+        poster = FakePoster(flood_waits=2)
+        outbox = self.make_outbox(poster)
+        outbox.send_message(1, 'text')
+        await outbox.stop()
+        self.assertEqual(poster.messages, [(1, 'text')])
+        self.assertEqual(outbox.get_metrics()['flood_waits'], 2)
+
+    async def test_full_queue_drops_messages(self):
+        outbox = self.make_outbox(FakePoster(), max_queue_size=1)
+        results = [outbox.post_signal('-100', 'LONG', f'SYM{i}USDT', '1h') for i in range(3)]
+        self.assertEqual(results, [True, False, False])
+        self.assertEqual(outbox.get_metrics()['dropped'], 2)
+        await outbox.stop()
+
+    async def test_errors_are_coalesced_into_digest(self):
+        poster = FakePoster()
+        outbox = self.make_outbox(poster)
+        for _ in range(10):
+            outbox.report_error('Error on handling BTCUSDT 1h: timeout')
+        outbox.report_error('Error on analyzer: boom')
+        await outbox.stop()
+
+        self.assertEqual(sorted(chat_id for chat_id, _ in poster.messages), [1, 2])
+        text = poster.messages[0][1]
+        self.assertIn('Error on handling BTCUSDT 1h: timeout (x10)', text)
+        self.assertIn('Error on analyzer: boom', text)